@@ -89,6 +89,18 @@ DATABASES = {
 }
 
 
+# Kesh (dashboard natijalari va ma'lumot versiyasi shu yerda saqlanadi).
+# Barcha worker jarayonlari bitta keshni ko'rishi shart, shuning uchun jarayon ichidagi LocMemCache emas,
+# umumiy baza keshi ishlatiladi: birinchi marta `python manage.py createcachetable` ni ishga tushiring.
+# Production'da Redis (django.core.cache.backends.redis.RedisCache) ga almashtirish mumkin.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'stock_cache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -148,4 +160,22 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1), # Ruxsatnoma 1 kun amal qiladi
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7), # Yangilash ruxsatnomasi 7 kun amal qiladi
-}
\ No newline at end of file
+    # Access token'ga foydalanuvchi guruhlari yoziladi (ruxsatlar uchun so'rov kerak emas)
+    "TOKEN_OBTAIN_SERIALIZER": "stock.serializers.RoleTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "stock.serializers.RoleTokenRefreshSerializer",
+}
+
+# Yuklangan va yaratilgan fayllar (fon vazifalari kiritgan/natija fayllari shu yerda saqlanadi)
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Fon vazifalari (python manage.py run_jobs)
+JOBS_WORKER_PROCESSES = 2   # Bir vaqtda bajariladigan vazifalar soni
+JOBS_LEASE_SECONDS = 300    # Shuncha vaqt tirik signal kelmasa, vazifa qayta navbatga qo'yiladi
+JOBS_MAX_ATTEMPTS = 3
+
+# E-mail bildirishnomalari (python manage.py dispatch_notifications)
+NOTIFICATIONS_BATCH_SIZE = 100
+NOTIFICATIONS_MAX_ATTEMPTS = 5
+NOTIFICATIONS_RETRY_SECONDS = 60     # Birinchi qayta urinishgacha kutish, keyin har safar 2 baravar
+NOTIFICATIONS_LEASE_SECONDS = 300    # Ishchi shu vaqt ichida yubora olmasa, xat qayta navbatga tushadi
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'  # `--backend file` uchun
@@ -1,5 +1,30 @@
 from django.contrib import admin
-from .models import Product, Customer, Sale, SaleItem, Payment, GoodsReceipt, ReturnedProduct  # <-- GoodsReceipt'ni import qildik
+from django.db import transaction
+from .models import Product, Customer, Sale, SaleItem, Payment, GoodsReceipt, ReturnedProduct, Job, Notification, StockMovement  # <-- GoodsReceipt'ni import qildik
+from .rollups import record_sale, record_payment, record_return
+from .ledger import sync_sale_entry, sync_payment_entry, forget_entry
+from .cache import bump_data_version
+from .movements import quantity_change_movements, record_movements
+
+# Admin orqali qilingan o'zgartirishlar ham kunlik yig'maga (DailySalesRollup) yetib borishi kerak.
+# Eski holat ayiriladi (sign=-1), yangi holat qo'shiladi; admin buni bitta tranzaksiyada bajaradi.
+# Mijoz hisobidagi (CustomerLedgerEntry) yozuv esa qayta hisoblanadi, eskirgan checkpoint'lar o'chiriladi.
+
+class DataVersionAdminMixin:
+    """ Admin orqali yozilgan o'zgartirishlardan keyin dashboard keshini eskirgan deb belgilaydi. """
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_data_version()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_data_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_data_version()
+
 
 # --- Sotuv uchun sozlamalar ---
 class SaleItemInline(admin.TabularInline):
@@ -8,8 +33,10 @@ class SaleItemInline(admin.TabularInline):
 
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
-    list_display = ('id', 'customer', 'seller', 'created_at')
+class SaleAdmin(DataVersionAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'customer', 'seller', 'created_at', 'total_amount', 'item_count')
+    # Qatorlar saqlangach sync_sale_entry qayta hisoblaydi - qo'lda tahrirlanmaydi
+    readonly_fields = ('total_amount', 'item_count')
     list_filter = ('created_at', 'seller')
     search_fields = ('customer__full_name',)
     inlines = [SaleItemInline]
@@ -17,42 +44,173 @@ class SaleAdmin(admin.ModelAdmin):
     class Media:
         js = ('admin/js/get_product_price.js',)
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            old_sale = Sale.objects.get(pk=obj.pk)
+            record_sale(old_sale, list(old_sale.items.all()), sign=-1)
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        sale = form.instance
+        record_sale(sale, list(sale.items.all()))
+        sync_sale_entry(sale)
+
+    def delete_model(self, request, obj):
+        record_sale(obj, list(obj.items.all()), sign=-1)
+        forget_entry(obj.customer_id, obj.created_at)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for sale in queryset.prefetch_related('items'):
+            record_sale(sale, list(sale.items.all()), sign=-1)
+            forget_entry(sale.customer_id, sale.created_at)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(SaleItem)
+class SaleItemAdmin(DataVersionAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'sale', 'product', 'quantity', 'price')
+    search_fields = ('product__name',)
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            old_item = SaleItem.objects.select_related('sale').get(pk=obj.pk)
+            record_sale(old_item.sale, [old_item], sign=-1, count_sale=False)
+        super().save_model(request, obj, form, change)
+        record_sale(obj.sale, [obj], count_sale=False)
+        if change and old_item.sale_id != obj.sale_id:
+            sync_sale_entry(old_item.sale)
+        sync_sale_entry(obj.sale)
+
+    def delete_model(self, request, obj):
+        record_sale(obj.sale, [obj], sign=-1, count_sale=False)
+        super().delete_model(request, obj)
+        sync_sale_entry(obj.sale)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        sales = {}
+        for item in queryset.select_related('sale'):
+            record_sale(item.sale, [item], sign=-1, count_sale=False)
+            sales[item.sale_id] = item.sale
+        super().delete_queryset(request, queryset)
+        for sale in sales.values():
+            sync_sale_entry(sale)
+
 
 # --- To'lov uchun sozlamalar ---
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(DataVersionAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'customer', 'amount', 'created_at')
     list_filter = ('created_at', 'customer')
     search_fields = ('customer__full_name',)
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            record_payment(Payment.objects.get(pk=obj.pk), sign=-1)
+        super().save_model(request, obj, form, change)
+        record_payment(obj)
+        sync_payment_entry(obj)
+
+    def delete_model(self, request, obj):
+        record_payment(obj, sign=-1)
+        forget_entry(obj.customer_id, obj.created_at)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for payment in queryset:
+            record_payment(payment, sign=-1)
+            forget_entry(payment.customer_id, payment.created_at)
+        super().delete_queryset(request, queryset)
+
 
 # --- Yuk kirimi uchun sozlamalar (YANGI QISM) ---
 @admin.register(GoodsReceipt)
-class GoodsReceiptAdmin(admin.ModelAdmin):
+class GoodsReceiptAdmin(DataVersionAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'product', 'quantity', 'created_at')
     list_filter = ('created_at', 'product')
     search_fields = ('product__name',)
 
 
 @admin.register(ReturnedProduct)
-class ReturnedProductAdmin(admin.ModelAdmin):
+class ReturnedProductAdmin(DataVersionAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'returned_at', 'customer', 'product', 'quantity', 'condition', 'recorded_by')
     list_filter = ('condition', 'returned_at', 'product')
     search_fields = ('customer__full_name', 'product__name', 'reason')
     autocomplete_fields = ('customer', 'product', 'recorded_by')
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            record_return(ReturnedProduct.objects.get(pk=obj.pk), sign=-1)
+        super().save_model(request, obj, form, change)
+        record_return(obj)
+
+    def delete_model(self, request, obj):
+        record_return(obj, sign=-1)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for returned_product in queryset:
+            record_return(returned_product, sign=-1)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'progress', 'total', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status', 'created_at')
+    readonly_fields = ('heartbeat_at', 'started_at', 'finished_at', 'worker', 'attempts')
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipient', 'audience', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'audience', 'created_at')
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('attempts', 'last_error', 'sent_at')
+
 
 # --- Qolgan modellarni ro'yxatdan o'tkazish ---
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(DataVersionAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'brand', 'category', 'price')
     search_fields = ('name', 'brand', 'category')
 
+    def save_model(self, request, obj, form, change):
+        # Qoldiqni qo'lda o'zgartirish ham ombor harakati sifatida yoziladi
+        old_healthy, old_defective = 0, 0
+        if change:
+            old_healthy, old_defective = (
+                Product.objects.select_for_update().values_list('quantity_healthy', 'quantity_defective').get(pk=obj.pk)
+            )
+        super().save_model(request, obj, form, change)
+        movement_type = StockMovement.TYPE_ADJUSTMENT if change else StockMovement.TYPE_OPENING
+        record_movements(quantity_change_movements(obj, old_healthy, old_defective, movement_type))
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """ Harakatlar faqat ko'rish uchun - jadval faqat qo'shiladigan (append-only). """
+    list_display = ('id', 'product', 'movement_type', 'condition', 'delta', 'document_type', 'document_id', 'created_at')
+    list_filter = ('movement_type', 'condition', 'created_at')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(DataVersionAdminMixin, admin.ModelAdmin):
     list_display = ('full_name', 'phone_number', 'debt')
     search_fields = ('full_name', 'phone_number')
-
-
-admin.site.register(SaleItem)
@@ -0,0 +1,103 @@
+"""
+Dashboard grafiklari uchun vaqt qatorlari (kun/hafta/oy bo'yicha).
+
+Guruhlash bazada (`Trunc`, PostgreSQL'da `date_trunc`) bajariladi: sotuvlar `Sale` jadvalidan
+saqlangan `total_amount` bo'yicha (SaleFilter filtrlari bilan), to'lov va qaytarishlar kunlik
+yig'ma jadvaldan olinadi - davr uzunligidan qat'i nazar ikki so'rov. Ma'lumot bo'lmagan
+davrlar pandas'da bitta `reindex` bilan nol qiymat oladi.
+"""
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+INTERVALS = ('day', 'week', 'month')
+# Hafta dushanbadan boshlanadi - date_trunc('week') bilan bir xil
+INTERVAL_FREQUENCIES = {'day': 'D', 'week': 'W-MON', 'month': 'MS'}
+# Sana oralig'i berilmasa, oxirgi shuncha kun ko'rsatiladi
+DEFAULT_PERIOD_DAYS = {'day': 30, 'week': 7 * 12, 'month': 365}
+TREND_MAX_BUCKETS = 1000
+
+TREND_COLUMNS = ('sales_amount', 'sales_count', 'payments_amount', 'returns_quantity')
+
+
+def bucket_start(day, interval):
+    """ Sana tushadigan davrning birinchi kuni. """
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_periods(interval, start_date, end_date):
+    """ Oraliqdagi barcha davrlar boshlari (bo'shlari ham). """
+    return pd.date_range(
+        bucket_start(start_date, interval), bucket_start(end_date, interval), freq=INTERVAL_FREQUENCIES[interval]
+    )
+
+
+def format_cents(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def sales_trend(sales, rollup, interval, start_date, end_date):
+    """
+    `sales` - filtrlangan Sale queryset'i, `rollup` - to'lov va qaytarishlar uchun DailySalesRollup
+    queryset'i. Natija - davrlar ro'yxati: [{'period', 'sales_amount', 'sales_count',
+    'payments_amount', 'returns_quantity'}, ...], sana tartibida.
+    """
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+
+    sales_rows = (
+        sales.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(period=Trunc('created_at', interval, output_field=DateField(), tzinfo=tz))
+        .values('period')
+        .annotate(sales_amount=Sum('total_amount'), sales_count=Count('id'))
+        .order_by()
+    )
+    # To'lov qatorlarida sotuvchi ham, mahsulot ham yo'q; qaytarish qatorlarida faqat mahsulot bor
+    rollup_rows = (
+        rollup.filter(day__gte=start_date, day__lte=end_date, seller__isnull=True)
+        .annotate(period=Trunc('day', interval, output_field=DateField()))
+        .values('period')
+        .annotate(
+            payments_amount=Sum('payments_amount', filter=Q(product__isnull=True)),
+            returns_healthy=Sum('returns_healthy_quantity', filter=Q(product__isnull=False)),
+            returns_defective=Sum('returns_defective_quantity', filter=Q(product__isnull=False)),
+        )
+        .order_by()
+    )
+
+    sales_frame = _frame(sales_rows, ('sales_amount', 'sales_count'))
+    rollup_frame = _frame(rollup_rows, ('payments_amount', 'returns_healthy', 'returns_defective'))
+    frame = sales_frame.join(rollup_frame, how='outer')
+    frame = frame.reindex(bucket_periods(interval, start_date, end_date)).fillna(0)
+
+    # Summalar tiyinlarda (int64) - javobda float qoldiqlari chiqmaydi
+    for column in ('sales_amount', 'payments_amount'):
+        frame[column] = (frame[column].astype(float) * 100).round().astype('int64')
+    frame['returns_quantity'] = frame['returns_healthy'].astype('int64') + frame['returns_defective'].astype('int64')
+    frame['sales_count'] = frame['sales_count'].astype('int64')
+
+    return [
+        {
+            'period': period.date().isoformat(),
+            'sales_amount': format_cents(int(sales_amount)),
+            'sales_count': int(sales_count),
+            'payments_amount': format_cents(int(payments_amount)),
+            'returns_quantity': int(returns_quantity),
+        }
+        for period, sales_amount, sales_count, payments_amount, returns_quantity
+        in frame[list(TREND_COLUMNS)].itertuples()
+    ]
+
+
+def _frame(rows, columns):
+    frame = pd.DataFrame(list(rows), columns=['period', *columns])
+    frame['period'] = pd.to_datetime(frame['period'])
+    return frame.set_index('period')
@@ -0,0 +1,374 @@
+"""
+API uchun qayta takrorlanadigan (reproducible) unumdorlik sinovlari.
+
+Har bir ssenariy haqiqiy URL'lar (core/urls.py -> stock/urls.py) orqali, JWT bilan
+autentifikatsiya qilingan test mijozi yordamida so'rov yuboradi. Har bir so'rov uchun kechikish
+va SQL so'rovlar soni o'lchanadi; natijalar JSON ko'rinishida saqlanib, commit'lar orasida
+solishtiriladi (`manage.py benchmark`).
+
+Ma'lumotlar `seed_data()` (stock/seeding.py) orqali belgilangan `seed` bilan yaratiladi -
+bir xil parametrlar bir xil bazani beradi.
+"""
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .exports import PRODUCT_EXPORT_HEADERS, write_csv, write_xlsx
+from .imports import PRODUCT_REQUIRED_COLUMNS, read_import_rows
+from .models import Customer, Product, ReturnedProduct, Sale
+from .seeding import seed_data
+
+BENCHMARK_PASSWORD = 'benchmark-pass'
+PRODUCT_STOCK = 10 ** 6
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """ Funksiyani `name` nomli ssenariy sifatida ro'yxatga oladi. """
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+# --- Ma'lumotlar to'plami --- #
+
+def generate_dataset(sales=10000, customers=None, products=None, days=365, seed=42):
+    """
+    `seed_data` orqali to'plam yaratadi. Sotuv ssenariylari qoldiq yetmasligiga urilmasligi
+    uchun mahsulotlarda katta qoldiq qoldiriladi.
+    """
+    ensure_benchmark_users()
+    counts = seed_data(
+        sales=sales, customers=customers, products=products, days=days, seed=seed,
+        leftover_min=PRODUCT_STOCK, leftover_max=PRODUCT_STOCK,
+    )
+    return {'days': days, 'seed': seed, **counts}
+
+
+def ensure_benchmark_users():
+    """ Admin va sotuvchi foydalanuvchilari (sotuvchi status o'zgartirganda omborchiga xabar boradi). """
+    sellers, _ = Group.objects.get_or_create(name='Sotuvchilar')
+    warehouse, _ = Group.objects.get_or_create(name='Omborchilar')
+
+    admin, created = User.objects.get_or_create(username='bench-admin', defaults={'is_staff': True})
+    if created:
+        admin.set_password(BENCHMARK_PASSWORD)
+        admin.save()
+    seller, created = User.objects.get_or_create(username='bench-seller')
+    if created:
+        seller.set_password(BENCHMARK_PASSWORD)
+        seller.save()
+        seller.groups.add(sellers)
+    keeper, created = User.objects.get_or_create(username='bench-keeper', defaults={'email': 'ombor@example.com'})
+    if created:
+        keeper.groups.add(warehouse)
+    return admin, seller
+
+
+def authenticated_client(user):
+    """ Haqiqiy JWT oqimi: token olinadi va har bir so'rovga Authorization sarlavhasi qo'shiladi. """
+    client = APIClient()
+    response = client.post(
+        reverse('token_obtain_pair'), {'username': user.username, 'password': BENCHMARK_PASSWORD}, format='json'
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    return client
+
+
+class BenchmarkContext:
+    """ Ssenariylar uchun umumiy holat: mijozlar, tasodifiy sonlar generatori va bazadagi id'lar. """
+
+    def __init__(self, seed=42):
+        admin, seller = ensure_benchmark_users()
+        self.client = authenticated_client(admin)
+        self.seller_client = authenticated_client(seller)
+        self.rng = random.Random(seed)
+        self.today = timezone.localdate()
+        self.customer_ids = list(Customer.objects.order_by('id').values_list('id', flat=True))
+        self.debtor_ids = list(Customer.objects.filter(debt__gte=1000).order_by('id').values_list('id', flat=True))
+        self.product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+        self.sale_ids = list(Sale.objects.order_by('-id').values_list('id', flat=True)[:10000])
+
+    def customer_id(self):
+        return self.rng.choice(self.customer_ids)
+
+    def product_id(self):
+        return self.rng.choice(self.product_ids)
+
+    def window(self, days=30):
+        """ Oxirgi bir yil ichidagi tasodifiy `days` kunlik oraliq. """
+        end = self.today - timedelta(days=self.rng.randrange(365))
+        return (end - timedelta(days=days)).isoformat(), end.isoformat()
+
+
+# --- Ssenariylar --- #
+
+@scenario('sale_create')
+def sale_create(ctx):
+    items = [
+        {'product': product_id, 'quantity': ctx.rng.randint(1, 3), 'price': '10.00'}
+        for product_id in ctx.rng.sample(ctx.product_ids, min(3, len(ctx.product_ids)))
+    ]
+    return ctx.client.post(reverse('sale-create'), {'customer': ctx.customer_id(), 'items': items}, format='json')
+
+
+@scenario('sale_batch_create')
+def sale_batch_create(ctx, size=50):
+    """ Offline terminal buferi: bitta so'rovda `size` ta sotuv (sotuv/s = so'rov/s x size). """
+    sales = []
+    for _ in range(size):
+        items = [
+            {'product': product_id, 'quantity': ctx.rng.randint(1, 3), 'price': '10.00'}
+            for product_id in ctx.rng.sample(ctx.product_ids, min(3, len(ctx.product_ids)))
+        ]
+        sales.append({'customer': ctx.customer_id(), 'items': items})
+    return ctx.client.post(reverse('sale-batch-create'), {'sales': sales}, format='json')
+
+
+@scenario('sale_status_update')
+def sale_status_update(ctx):
+    sale_id = ctx.rng.choice(ctx.sale_ids)
+    new_status = ctx.rng.choice(['omborga_yuborildi', 'bron_qilindi'])
+    return ctx.seller_client.patch(reverse('sale-update-status', args=[sale_id]), {'status': new_status}, format='json')
+
+
+@scenario('payment_create')
+def payment_create(ctx):
+    customer_id = ctx.rng.choice(ctx.debtor_ids or ctx.customer_ids)
+    return ctx.client.post(reverse('payment-create'), {'customer': customer_id, 'amount': '1.00'}, format='json')
+
+
+@scenario('receipt_create')
+def receipt_create(ctx):
+    return ctx.client.post(reverse('receipt-create'), {'product': ctx.product_id(), 'quantity': 5}, format='json')
+
+
+@scenario('return_create')
+def return_create(ctx):
+    payload = {
+        'customer': ctx.customer_id(), 'product': ctx.product_id(), 'quantity': 1,
+        'condition': ctx.rng.choice([ReturnedProduct.CONDITION_HEALTHY, ReturnedProduct.CONDITION_DEFECTIVE]),
+        'returned_at': ctx.today.isoformat(),
+    }
+    return ctx.client.post(reverse('returnedproduct-list'), payload, format='json')
+
+
+@scenario('sales_list')
+def sales_list(ctx):
+    return ctx.client.get(reverse('sales-list'))
+
+
+@scenario('sales_list_summary')
+def sales_list_summary(ctx):
+    return ctx.client.get(reverse('sales-list'), {'view': 'summary'})
+
+
+@scenario('sales_list_by_customer')
+def sales_list_by_customer(ctx):
+    return ctx.client.get(reverse('sales-list'), {'customer': ctx.customer_id()})
+
+
+@scenario('products_list')
+def products_list(ctx):
+    return ctx.client.get(reverse('product-list'))
+
+
+@scenario('product_search')
+def product_search(ctx):
+    # Sotuv formasidagi kabi: nomning boshidan 3-6 harf
+    name = Product.objects.filter(pk=ctx.product_id()).values_list('name', flat=True).first() or ''
+    return ctx.client.get(reverse('product-search'), {'q': name[:ctx.rng.randint(3, 6)]})
+
+
+@scenario('customers_list')
+def customers_list(ctx):
+    return ctx.client.get(reverse('customer-list'))
+
+
+@scenario('returns_list')
+def returns_list(ctx):
+    return ctx.client.get(reverse('returnedproduct-list'))
+
+
+@scenario('dashboard')
+def dashboard(ctx):
+    start_date, end_date = ctx.window(days=90)
+    return ctx.client.get(reverse('dashboard-stats'), {'start_date': start_date, 'end_date': end_date})
+
+
+@scenario('dashboard_cached')
+def dashboard_cached(ctx):
+    return ctx.client.get(reverse('dashboard-stats'))
+
+
+@scenario('dashboard_trends')
+def dashboard_trends(ctx):
+    # Bir yillik kunlik qator - 365 ta davr bitta so'rovda
+    start_date, end_date = ctx.window(days=365)
+    return ctx.client.get(reverse('dashboard-trends'), {'interval': 'day', 'start_date': start_date, 'end_date': end_date})
+
+
+@scenario('reconciliation')
+def reconciliation(ctx):
+    start_date, end_date = ctx.window(days=30)
+    url = reverse('customer-reconciliation', args=[ctx.customer_id()])
+    return ctx.client.get(url, {'start_date': start_date, 'end_date': end_date})
+
+
+@scenario('sales_export_csv')
+def sales_export_csv(ctx):
+    return ctx.client.get(reverse('sale-export'), {'format': 'csv', 'customer': ctx.customer_id()})
+
+
+@scenario('products_export')
+def products_export(ctx):
+    return ctx.client.get(reverse('product-export'))
+
+
+@scenario('customers_export')
+def customers_export(ctx):
+    return ctx.client.get(reverse('customer-export'))
+
+
+@scenario('products_export_csv')
+def products_export_csv(ctx):
+    return ctx.client.get(reverse('product-export'), HTTP_ACCEPT='text/csv')
+
+
+@scenario('customers_export_csv')
+def customers_export_csv(ctx):
+    return ctx.client.get(reverse('customer-export'), {'format': 'csv'})
+
+
+# --- O'lchash --- #
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _execute(func, ctx):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = func(ctx)
+        if response.streaming:
+            # Fayl/oqimli javoblar to'liq o'qilgandagina ish tugagan hisoblanadi
+            b''.join(response.streaming_content)
+        elapsed = time.perf_counter() - started
+    return response, elapsed, len(queries)
+
+
+def run_scenario(ctx, name, iterations=50, warmup=5):
+    func = SCENARIOS[name]
+    for _ in range(warmup):
+        _execute(func, ctx)
+
+    latencies, query_counts, errors = [], [], 0
+    total_started = time.perf_counter()
+    for _ in range(iterations):
+        response, elapsed, queries = _execute(func, ctx)
+        if response.status_code >= 400:
+            errors += 1
+        latencies.append(elapsed)
+        query_counts.append(queries)
+    total = time.perf_counter() - total_started
+
+    latencies.sort()
+    query_counts.sort()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0,
+        'throughput_rps': round(iterations / total, 2) if total else 0,
+        'queries_p50': percentile(query_counts, 0.50),
+        'queries_max': query_counts[-1] if query_counts else 0,
+    }
+
+
+def run_benchmark(names=None, iterations=50, warmup=5, seed=42, progress=None):
+    ctx = BenchmarkContext(seed=seed)
+    results = {}
+    for name in names or SCENARIOS:
+        results[name] = run_scenario(ctx, name, iterations=iterations, warmup=warmup)
+        if progress:
+            progress(name, results[name])
+    return results
+
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    Ikki natija faylini solishtiradi. p95 kechikish `threshold` ulushdan ko'proq oshgan yoki
+    so'rovlar soni ko'paygan ssenariylar "regression" deb belgilanadi.
+    """
+    rows = []
+    for name, result in current['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        change = (result['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0
+        rows.append({
+            'scenario': name,
+            'p95_before_ms': previous['p95_ms'],
+            'p95_after_ms': result['p95_ms'],
+            'p95_change': round(change, 4),
+            'queries_before': previous['queries_max'],
+            'queries_after': result['queries_max'],
+            'regression': change > threshold or result['queries_max'] > previous['queries_max'],
+        })
+    return rows
+
+
+# --- Fayl formatlari --- #
+
+def file_format_benchmark(rows=100000, seed=42):
+    """
+    Import/eksport fayl formatlarini bazasiz solishtiradi: `rows` qatorli mahsulotlar jadvali eksport
+    funksiyalari bilan CSV va XLSX'ga yoziladi, so'ng import o'quvchisi bilan qayta o'qiladi.
+    Natija: {format: {'write_seconds', 'read_seconds', 'bytes'}, 'speedup': {'write', 'read'}}.
+    """
+    rng = random.Random(seed)
+    table = [
+        [f'Brand {index % 50}', f'Category {index % 20}', f'Product {index}',
+         f'{rng.uniform(1, 500):.2f}', rng.randrange(1000), rng.randrange(10)]
+        for index in range(rows)
+    ]
+    writers = {
+        'csv': write_csv,
+        'xlsx': lambda headers, table_rows, output: write_xlsx(headers, table_rows, 'Mahsulotlar', output),
+    }
+
+    results = {}
+    for name, write in writers.items():
+        with tempfile.TemporaryFile() as output:
+            started = time.perf_counter()
+            write(PRODUCT_EXPORT_HEADERS, iter(table), output)
+            write_seconds = time.perf_counter() - started
+            size = output.seek(0, 2)
+            output.seek(0)
+
+            started = time.perf_counter()
+            read_rows = sum(1 for _ in read_import_rows(output, PRODUCT_REQUIRED_COLUMNS))
+            read_seconds = time.perf_counter() - started
+        if read_rows != rows:
+            raise ValueError(f"{name}: {rows} qator yozildi, {read_rows} qator o'qildi.")
+        results[name] = {'write_seconds': round(write_seconds, 3), 'read_seconds': round(read_seconds, 3), 'bytes': size}
+
+    results['speedup'] = {
+        operation: round(results['xlsx'][f'{operation}_seconds'] / max(results['csv'][f'{operation}_seconds'], 1e-6), 1)
+        for operation in ('write', 'read')
+    }
+    return results
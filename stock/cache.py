@@ -0,0 +1,137 @@
+"""
+Dashboard javoblari uchun versiyalangan kesh (Django cache framework ustida).
+
+Kesh kaliti so'rov parametrlari va umumiy "ma'lumot versiyasi"dan tuziladi. Har qanday yozuv
+(sotuv, to'lov, kirim, qaytarish, import) tranzaksiya muvaffaqiyatli yakunlangach versiyani
+o'zgartiradi - eski kalitlar shunchaki ishlatilmay qoladi, shuning uchun yozuvdan keyin
+eskirgan natija qaytmaydi. Eski yozuvlarni kesh TTL orqali o'zi tozalaydi.
+
+Mahsulot va mijoz jadvallarining alohida versiyalari ham bor: ular faqat shu jadvalga tegadigan
+yozuvlarda o'zgaradi va ro'yxat/detal javoblarining ETag'i shulardan tuziladi (javob tanasini
+hash qilish shart emas - `If-None-Match` mos kelsa, asosiy so'rov umuman bajarilmaydi).
+
+Hit/miss hisoblagichlari keshga emas, jarayon xotirasiga yoziladi: DatabaseCache'da `incr` -
+o'qib-yozish (atomar emas, har hit'ni yozuvga aylantiradi). Shuning uchun ular har bir ishchi
+jarayon uchun alohida va jarayon qayta ishga tushganda nolga qaytadi.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+DATA_VERSION_KEY = 'stock:data-version'
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+TABLE_VERSION_KEY = 'stock:table-version:{}'
+# ETag'lari jadval versiyasiga bog'langan jadvallar (model label'lari)
+VERSIONED_TABLE_KEYS = [TABLE_VERSION_KEY.format(label) for label in ('stock.product', 'stock.customer')]
+# Mahsulotlarning faqat nom/brend/kategoriya o'zgarishlari (qidiruv indeksi shunga bog'langan)
+CATALOGUE_VERSION_KEY = 'stock:catalogue-version'
+
+
+def _new_version():
+    # Kalit keshdan o'chib ketsa ham, yangi versiya avvalgilarining hech biri bilan to'qnashmaydi
+    return time.time_ns()
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def table_version_key(model):
+    return TABLE_VERSION_KEY.format(model._meta.label_lower)
+
+
+def get_data_version():
+    return _get_version(DATA_VERSION_KEY)
+
+
+def get_table_version(model):
+    return _get_version(table_version_key(model))
+
+
+def get_catalogue_version():
+    return _get_version(CATALOGUE_VERSION_KEY)
+
+
+def _bump_data_version(keys=None):
+    _bump_version(DATA_VERSION_KEY)
+    for key in [*VERSIONED_TABLE_KEYS, CATALOGUE_VERSION_KEY] if keys is None else keys:
+        _bump_version(key)
+
+
+def bump_data_version(*models, catalogue=False):
+    """
+    Ma'lumot o'zgarganini bildiradi. `models` - yozuv tekkan jadvallar (Product, Customer);
+    berilmasa, barcha jadval versiyalari (katalog versiyasi ham) o'zgaradi. `catalogue=True` -
+    mahsulot nomi, brendi yoki kategoriyasi ham o'zgargan. Tranzaksiya ichida bo'lsa, commit'dan keyin bajariladi.
+    """
+    keys = None
+    if models:
+        keys = [table_version_key(model) for model in models]
+        if catalogue:
+            keys.append(CATALOGUE_VERSION_KEY)
+    transaction.on_commit(lambda: _bump_data_version(keys))
+
+
+def table_etag(models, *parts):
+    """ Jadval versiyalaridan kuchli ETag: '"product-5-json-v1712..."'. """
+    versions = '-'.join(str(get_table_version(model)) for model in models)
+    return '"' + '-'.join([*(str(part) for part in parts), f'v{versions}']) + '"'
+
+
+_dashboard_counts = Counter()
+_dashboard_counts_lock = threading.Lock()
+
+
+def _increment(name):
+    with _dashboard_counts_lock:
+        _dashboard_counts[name] += 1
+
+
+def dashboard_cache_key(customer_id, start_date, end_date, today):
+    """ Filtrlarni normallashtiradi: bir xil ma'nodagi so'rovlar bitta kalitga tushadi. """
+    customer_id = str(customer_id or '').strip()
+    if customer_id.isdigit():
+        customer_id = str(int(customer_id))
+    parts = [
+        customer_id,
+        str(start_date or '').strip(),
+        str(end_date or '').strip(),
+        today.isoformat(),  # "bugungi qaytarishlar" kun almashganda yangilanishi uchun
+    ]
+    return f"stock:dashboard:v{get_data_version()}:{':'.join(parts)}"
+
+
+def get_cached_dashboard(key):
+    data = cache.get(key)
+    _increment('hits' if data is not None else 'misses')
+    return data
+
+
+def set_cached_dashboard(key, data):
+    cache.set(key, data, timeout=DASHBOARD_CACHE_TIMEOUT)
+
+
+def dashboard_cache_stats():
+    with _dashboard_counts_lock:
+        hits, misses = _dashboard_counts['hits'], _dashboard_counts['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0,
+        'data_version': get_data_version(),
+    }
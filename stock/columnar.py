@@ -0,0 +1,286 @@
+"""
+BI uchun ustunli (Parquet / Arrow IPC) eksport: sotuvlar, sotuv qatorlari, to'lovlar, yuk kirimlari
+va qaytarishlar.
+
+Qatorlar bazadan (created_at, id) bo'yicha keyset bo'laklari bilan o'qiladi va har bir bo'lak
+darhol bitta row group (record batch) sifatida yoziladi - xotira sarfi bo'lak hajmiga bog'liq,
+tarix uzunligiga emas. Fayllar oylar bo'yicha bo'linadi:
+
+    <katalog>/<dataset>/month=YYYY-MM/part-<ishga tushirish vaqti>.parquet
+
+Qatorlar vaqt tartibida kelgani uchun bir vaqtda faqat bitta oy fayli ochiq bo'ladi. Fayllar avval
+`.tmp` nomi bilan yoziladi va dataset to'liq tugagach ko'chiriladi; shundan keyingina katalogdagi
+`_state.json` ga shu dataset uchun yangi chegara (`until`) yoziladi. Keyingi ishga tushirish shu
+chegaradan davom etadi - har kecha faqat yangi yozuvlar ko'chiriladi.
+
+Eksport yozuvlarning yaratilish vaqtiga tayanadi: keyinroq o'zgartirilgan yozuvlar (masalan, sotuv
+statusi) qayta eksport qilinmaydi, ular uchun `--full` bilan to'liq eksport kerak.
+
+`pyarrow` ixtiyoriy bog'liqlik: u o'rnatilmagan bo'lsa, bo'laklarni o'qish ishlaydi, yozish esa
+`ColumnarExportError` beradi.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import GoodsReceipt, Payment, ReturnedProduct, Sale, SaleItem
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow o'rnatilmagan muhit
+    pa = pq = None
+
+COLUMNAR_BATCH_SIZE = 50000  # Bitta row group / record batch dagi qatorlar soni
+# Tranzaksiyasi hali yakunlanmagan yozuvlar chegaradan oldin qolib ketmasligi uchun
+COLUMNAR_SAFETY_LAG = timedelta(minutes=5)
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+STATE_FILE = '_state.json'
+
+COLUMNAR_DATASETS = {}
+
+
+class ColumnarExportError(Exception):
+    pass
+
+
+def arrow_type(kind):
+    return {
+        'int': pa.int64,
+        'string': pa.string,
+        'timestamp': lambda: pa.timestamp('us', tz='UTC'),
+        'date': pa.date32,
+        'money': lambda: pa.decimal128(14, 2),
+    }[kind]()
+
+
+class ColumnarDataset:
+    """
+    Eksport qilinadigan jadval: `columns` - [(ustun nomi, values_list maydoni, tur), ...].
+    Birinchi ikki ustun har doim yaratilish vaqti va id - ular bo'yicha bo'laklanadi va oylarga bo'linadi.
+    """
+
+    def __init__(self, name, model, columns, time_field='created_at'):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.time_field = time_field
+
+    @property
+    def column_names(self):
+        return [name for name, _, _ in self.columns]
+
+    def schema(self):
+        return pa.schema([(name, arrow_type(kind)) for name, _, kind in self.columns])
+
+    def queryset(self):
+        return self.model.objects.all()
+
+    def rows(self, since, until, batch_size):
+        """ [since, until) oralig'idagi qatorlar bo'laklari ((created_at, id) tartibida). """
+        time_field = self.time_field
+        queryset = self.queryset().filter(**{f'{time_field}__lt': until})
+        if since is not None:
+            queryset = queryset.filter(**{f'{time_field}__gte': since})
+        queryset = queryset.order_by(time_field, 'pk').values_list(*[field for _, field, _ in self.columns])
+
+        position = None
+        while True:
+            chunk = queryset
+            if position is not None:
+                moment, pk = position
+                chunk = chunk.filter(Q(**{f'{time_field}__gt': moment}) | Q(**{time_field: moment, 'pk__gt': pk}))
+            chunk = list(chunk[:batch_size])
+            if not chunk:
+                return
+            yield chunk
+            position = chunk[-1][0], chunk[-1][1]
+
+    def batches(self, since, until, batch_size=COLUMNAR_BATCH_SIZE):
+        """ (oy, {ustun: qiymatlar}) juftliklari: bo'lak oy chegarasida ikkiga bo'linadi. """
+        for chunk in self.rows(since, until, batch_size):
+            start = 0
+            months = [month_key(row[0]) for row in chunk]
+            for index in range(1, len(chunk) + 1):
+                if index == len(chunk) or months[index] != months[start]:
+                    yield months[start], dict(zip(self.column_names, map(list, zip(*chunk[start:index]))))
+                    start = index
+
+
+class SaleItemDataset(ColumnarDataset):
+    """ Sotuv qatorlari sotuv sarlavhasi bilan (mijoz, sotuvchi, status, sotuv vaqti) birga. """
+
+    def rows(self, since, until, batch_size):
+        sales = ColumnarDataset('sales', Sale, [('created_at', 'created_at', None), ('id', 'id', None)])
+        fields = [field for _, field, _ in self.columns]
+        # Bo'lak sotuvlar bo'yicha olinadi (Sale'ning created_at indeksi), qatorlar esa (sale, product) indeksi orqali
+        for sale_chunk in sales.rows(since, until, batch_size):
+            yield list(
+                SaleItem.objects.filter(sale__in=[sale_id for _, sale_id in sale_chunk])
+                .order_by('sale__created_at', 'sale_id', 'pk').values_list(*fields)
+            )
+
+
+def dataset(name, model, columns, dataset_class=ColumnarDataset):
+    COLUMNAR_DATASETS[name] = dataset_class(name, model, columns)
+
+
+dataset('sales', Sale, [
+    ('created_at', 'created_at', 'timestamp'),
+    ('id', 'id', 'int'),
+    ('customer_id', 'customer_id', 'int'),
+    ('seller_id', 'seller_id', 'int'),
+    ('status', 'status', 'string'),
+    ('total_amount', 'total_amount', 'money'),
+    ('item_count', 'item_count', 'int'),
+])
+dataset('sale_items', SaleItem, [
+    ('sale_created_at', 'sale__created_at', 'timestamp'),
+    ('sale_id', 'sale_id', 'int'),
+    ('id', 'id', 'int'),
+    ('customer_id', 'sale__customer_id', 'int'),
+    ('seller_id', 'sale__seller_id', 'int'),
+    ('status', 'sale__status', 'string'),
+    ('product_id', 'product_id', 'int'),
+    ('quantity', 'quantity', 'int'),
+    ('price', 'price', 'money'),
+], dataset_class=SaleItemDataset)
+dataset('payments', Payment, [
+    ('created_at', 'created_at', 'timestamp'),
+    ('id', 'id', 'int'),
+    ('customer_id', 'customer_id', 'int'),
+    ('amount', 'amount', 'money'),
+])
+dataset('receipts', GoodsReceipt, [
+    ('created_at', 'created_at', 'timestamp'),
+    ('id', 'id', 'int'),
+    ('product_id', 'product_id', 'int'),
+    ('quantity', 'quantity', 'int'),
+])
+dataset('returns', ReturnedProduct, [
+    ('created_at', 'created_at', 'timestamp'),
+    ('id', 'id', 'int'),
+    ('customer_id', 'customer_id', 'int'),
+    ('product_id', 'product_id', 'int'),
+    ('quantity', 'quantity', 'int'),
+    ('condition', 'condition', 'string'),
+    ('returned_at', 'returned_at', 'date'),
+    ('recorded_by_id', 'recorded_by_id', 'int'),
+])
+
+
+def month_key(moment):
+    return timezone.localtime(moment).strftime('%Y-%m')
+
+
+# --- Yozish --- #
+
+class PartitionWriter:
+    """ Oylar bo'yicha fayllar: yangi oy kelganda oldingi fayl yopiladi. """
+
+    def __init__(self, root, dataset, export_format, run_stamp):
+        self.root = root
+        self.dataset = dataset
+        self.extension = COLUMNAR_FORMATS[export_format]
+        self.export_format = export_format
+        self.run_stamp = run_stamp
+        self.schema = dataset.schema()
+        self.month = None
+        self.writer = None
+        self.sink = None
+        self.written = []  # [(vaqtinchalik yo'l, yakuniy yo'l), ...]
+
+    def write(self, month, columns):
+        if month != self.month:
+            self.close_file()
+            self.open_file(month)
+        self.writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=self.schema))
+
+    def open_file(self, month):
+        directory = os.path.join(self.root, self.dataset.name, f'month={month}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'part-{self.run_stamp}{self.extension}')
+        self.written.append((path + '.tmp', path))
+        if self.export_format == 'parquet':
+            self.writer = pq.ParquetWriter(path + '.tmp', self.schema, compression='zstd')
+        else:
+            self.sink = pa.OSFile(path + '.tmp', 'wb')
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+        self.month = month
+
+    def close_file(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+        self.writer = self.sink = None
+
+    def commit(self):
+        """ Barcha oylar yozib bo'lingach, fayllar yakuniy nomlariga ko'chiriladi. """
+        self.close_file()
+        for temporary, final in self.written:
+            os.replace(temporary, final)
+        return [final for _, final in self.written]
+
+    def abort(self):
+        self.close_file()
+        for temporary, _ in self.written:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+def read_state(root):
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as state_file:
+        return json.load(state_file)
+
+
+def write_state(root, state):
+    path = os.path.join(root, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as state_file:
+        json.dump(state, state_file, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def export_dataset(root, name, since=None, until=None, full=False, export_format='parquet',
+                   batch_size=COLUMNAR_BATCH_SIZE, progress=None):
+    """
+    Bitta datasetni [since, until) oralig'i bo'yicha eksport qiladi. `since` berilmasa, `_state.json`dagi
+    oxirgi chegaradan (u ham bo'lmasa - boshidan) davom etadi. `full=True` - butun tarix, faqat bo'sh
+    katalogga (oldingi fayllar bilan takrorlanmasligi uchun). Natija: {'rows', 'files', 'since', 'until'}.
+    """
+    if pa is None:
+        raise ColumnarExportError("Ustunli eksport uchun pyarrow kerak: pip install pyarrow")
+    dataset = COLUMNAR_DATASETS[name]
+    if full:
+        if os.path.isdir(os.path.join(root, name)) and os.listdir(os.path.join(root, name)):
+            raise ColumnarExportError(f"'{name}' katalogi bo'sh emas - to'liq eksport uchun yangi katalog bering.")
+        since = None
+    elif since is None and name in read_state(root):
+        since = datetime.fromisoformat(read_state(root)[name]['until'])
+    if until is None:
+        until = timezone.now() - COLUMNAR_SAFETY_LAG
+
+    writer = PartitionWriter(root, dataset, export_format, until.strftime('%Y%m%dT%H%M%S'))
+    rows = 0
+    try:
+        for month, columns in dataset.batches(since, until, batch_size):
+            writer.write(month, columns)
+            rows += len(columns['id'])
+            if progress:
+                progress(name, rows)
+        files = writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+
+    state = read_state(root)
+    state[name] = {'until': until.isoformat(), 'rows': rows}
+    write_state(root, state)
+    return {'rows': rows, 'files': files, 'since': since, 'until': until}
@@ -0,0 +1,122 @@
+"""
+Katta hajmdagi eksportlar uchun yordamchi funksiyalar.
+
+Qatorlar bitta JOIN'li so'rov bilan server tomonidagi kursor orqali bo'laklab (chunk)
+o'qiladi va darhol javob oqimiga yoziladi. Shu sababli xotira sarfi eksport qilinayotgan
+qatorlar soniga bog'liq emas.
+"""
+import csv
+import tempfile
+from io import StringIO
+
+from openpyxl import Workbook
+
+from .models import Customer, Product, SaleItem
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+
+EXPORT_CHUNK_SIZE = 2000  # Bazadan bir martada o'qiladigan qatorlar soni
+CSV_FLUSH_ROWS = 500      # Shuncha qator yig'ilgach, oqimga bitta bo'lak qilib yuboriladi
+
+PRODUCT_EXPORT_HEADERS = ['brand', 'category', 'name', 'price', 'quantity_healthy', 'quantity_defective']
+CUSTOMER_EXPORT_HEADERS = ['full_name', 'phone_number', 'address', 'debt']
+SALE_EXPORT_HEADERS = [
+    'Chek ID', 'Sana', 'Mijoz', 'Sotuvchi', 'Mahsulot', 'Soni', 'Narxi', 'Qator Summasi', 'Status',
+]
+
+
+def product_export_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """ Barcha mahsulotlarni eksport ustunlari tartibida qaytaradi (generator). """
+    products = Product.objects.order_by('id').values_list(*PRODUCT_EXPORT_HEADERS)
+    for row in products.iterator(chunk_size=chunk_size):
+        yield list(row)
+
+
+def customer_export_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """ Barcha mijozlarni eksport ustunlari tartibida qaytaradi (generator). """
+    customers = Customer.objects.order_by('id').values_list(*CUSTOMER_EXPORT_HEADERS)
+    for row in customers.iterator(chunk_size=chunk_size):
+        yield list(row)
+
+
+def sale_export_rows(sales_queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Filtrlangan sotuvlarning har bir mahsulot qatorini ro'yxat ko'rinishida qaytaradi (generator).
+    Mijoz, sotuvchi va mahsulot nomlari alohida so'rovlarsiz, JOIN orqali olinadi.
+    """
+    items = (
+        SaleItem.objects
+        .filter(sale__in=sales_queryset.values('pk'))
+        .order_by('-sale__created_at', 'sale_id', 'id')
+        .values_list(
+            'sale_id',
+            'sale__created_at',
+            'sale__customer__full_name',
+            'sale__seller__username',
+            'product__name',
+            'quantity',
+            'price',
+            'sale__status',
+        )
+    )
+    for sale_id, created_at, customer_name, seller_name, product_name, quantity, price, sale_status in items.iterator(chunk_size=chunk_size):
+        yield [
+            sale_id,
+            created_at.strftime('%Y-%m-%d %H:%M'),
+            customer_name,
+            seller_name,
+            product_name,
+            quantity,
+            price,
+            quantity * price,
+            sale_status,
+        ]
+
+
+def stream_csv(headers, rows):
+    """ Qatorlarni CSV matni sifatida bo'laklab qaytaradi (StreamingHttpResponse uchun). """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM - Excel UTF-8 faylni to'g'ri ochishi uchun
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    yield buffer.getvalue()
+
+
+def write_xlsx(headers, rows, sheet_name, output=None):
+    """
+    Qatorlarni "write-only" rejimidagi openpyxl kitobiga yozadi va faylni boshidan o'qishga tayyor
+    holda qaytaradi. `output` berilmasa, vaqtinchalik fayl ochiladi - butun jadval xotirada yig'ilmaydi.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=sheet_name)
+    worksheet.append(headers)
+    for row in rows:
+        worksheet.append(row)
+
+    if output is None:
+        output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def write_csv(headers, rows, output):
+    """ CSV matnini ochiq binar faylga (masalan, vaqtinchalik faylga) yozadi. """
+    for chunk in stream_csv(headers, rows):
+        output.write(chunk.encode('utf-8'))
+    output.seek(0)
+    return output
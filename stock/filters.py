@@ -7,11 +7,19 @@ class SaleFilter(filters.FilterSet):
     start_date = filters.DateFilter(field_name="created_at", lookup_expr='gte')  # ...dan katta yoki teng
     end_date = filters.DateFilter(field_name="created_at", lookup_expr='lte')    # ...dan kichik yoki teng
     status = filters.CharFilter(field_name="status")  # Status bo'yicha filtr
+    open = filters.BooleanFilter(method='filter_open')  # Faqat yakunlanmagan sotuvlar (?open=true)
 
     class Meta:
         model = Sale
-        # Mijoz va status bo'yicha filtrlar
-        fields = ['customer', 'status']
+        # Mijoz, sotuvchi va status bo'yicha filtrlar
+        fields = ['customer', 'seller', 'status']
+
+    def filter_open(self, queryset, name, value):
+        if value is None:
+            return queryset
+        if value:
+            return queryset.filter(status__in=Sale.OPEN_STATUSES)
+        return queryset.exclude(status__in=Sale.OPEN_STATUSES)
 
 
 class ReturnedProductFilter(filters.FilterSet):
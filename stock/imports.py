@@ -0,0 +1,350 @@
+"""
+Katta fayllarni import qilish uchun yordamchi funksiyalar.
+
+Fayl formati kengaytmasidan emas, mazmunidan aniqlanadi: ZIP imzosi - xlsx, OLE imzosi - eski xls
+(pandas), aks holda CSV. xlsx openpyxl'ning read-only rejimida, CSV esa standart `csv` moduli
+bilan qatorma-qator o'qiladi - fayl xotiraga to'liq yuklanmaydi.
+
+Qatorlar bo'laklarga (chunk) bo'linadi: har bir bo'lak uchun mavjud yozuvlar bitta so'rov bilan
+olinadi, so'ng `bulk_create` va `bulk_update` bilan yoziladi. Butun import bitta tranzaksiyada
+bajariladi - xatolik bo'lsa, hech narsa yarim-yorti saqlanib qolmaydi.
+"""
+import codecs
+import csv
+import math
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+
+import pandas as pd
+from django.db import transaction
+from openpyxl import load_workbook
+
+from .models import Customer, Product, StockMovement, customer_dedupe_key
+from .movements import quantity_change_movements, record_movements
+
+IMPORT_CHUNK_SIZE = 1000
+
+PRODUCT_IMPORT_FIELDS = ('brand', 'category', 'price', 'quantity_healthy', 'quantity_defective')
+PRODUCT_REQUIRED_COLUMNS = ('name', 'price', 'quantity_healthy')
+CUSTOMER_REQUIRED_COLUMNS = ('full_name', 'phone_number')
+
+
+CUSTOMER_IMPORT_FIELDS = ('full_name', 'phone_number', 'address', 'debt')
+
+# Excel fayllarining boshlanishi: xlsx - ZIP arxivi, eski xls - OLE hujjati
+XLSX_SIGNATURE = b'PK\x03\x04'
+XLS_SIGNATURE = b'\xd0\xcf\x11\xe0'
+CSV_DELIMITERS = (',', ';', '\t')
+
+
+class ImportFileError(ValueError):
+    """ Fayl tuzilishi noto'g'ri (masalan, majburiy ustun yo'q). """
+
+
+def sniff_format(file_obj):
+    head = file_obj.read(8)
+    file_obj.seek(0)
+    if head.startswith(XLSX_SIGNATURE):
+        return 'xlsx'
+    if head.startswith(XLS_SIGNATURE):
+        return 'xls'
+    return 'csv'
+
+
+def read_import_rows(file_obj, required_columns):
+    """
+    Fayl qatorlari (dict). xlsx va CSV uchun - oqim (fayl ochiq turgan paytda o'qib bo'linishi
+    kerak), eski xls uchun - ro'yxat. Ustunlar har doim darhol, qatorlarni o'qishdan oldin tekshiriladi.
+    """
+    file_format = sniff_format(file_obj)
+    if file_format == 'xlsx':
+        return read_xlsx_rows(file_obj, required_columns)
+    if file_format == 'xls':
+        return read_excel_rows(file_obj, required_columns)
+    return read_csv_rows(file_obj, required_columns)
+
+
+def read_xlsx_rows(file_obj, required_columns):
+    """
+    Birinchi varaq read-only rejimda. Sarlavha shu yerda tekshiriladi va kitob darhol yopiladi;
+    qatorlar `XlsxRows` ni aylanganda kitob qayta ochilib, XML'dan o'qilgan sari beriladi.
+    """
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        header = ['' if value is None else str(value).strip() for value in next(sheet.iter_rows(values_only=True), ())]
+        # Varaq o'lchami (dimension) bo'yicha - bo'sh qatorlar ham kiradi, shuning uchun taxminiy
+        total = max(sheet.max_row - 1, 0) if sheet.max_row else None
+    finally:
+        workbook.close()
+    for col in required_columns:
+        if col not in header:
+            raise ImportFileError(f"Excel faylda '{col}' ustuni topilmadi.")
+    return XlsxRows(file_obj, header, total)
+
+
+class XlsxRows:
+    """ xlsx qatorlari (dict): kitob faqat aylanish paytida ochiq turadi. `total` - taxminiy qatorlar soni. """
+
+    def __init__(self, file_obj, header, total):
+        self.file_obj = file_obj
+        self.header = header
+        self.total = total
+
+    def __iter__(self):
+        self.file_obj.seek(0)
+        workbook = load_workbook(self.file_obj, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            next(rows, None)
+            for values in rows:
+                row = {column: value for column, value in zip(self.header, values) if column and not is_blank(value)}
+                if row:
+                    yield row
+        finally:
+            workbook.close()
+
+
+def read_excel_rows(file_obj, required_columns):
+    """ Eski (xls) Excel faylni pandas bilan o'qiydi va qatorlarni dict ro'yxati sifatida qaytaradi. """
+    df = pd.read_excel(file_obj)
+    for col in required_columns:
+        if col not in df.columns:
+            raise ImportFileError(f"Excel faylda '{col}' ustuni topilmadi.")
+    return df.to_dict('records')
+
+
+def read_csv_rows(file_obj, required_columns):
+    """ CSV (UTF-8, BOM bilan yoki BOMsiz; ajratuvchi - vergul, nuqtali vergul yoki tab). """
+    lines = decoded_lines(file_obj)
+    first_line = next(lines, '')
+    delimiter = max(CSV_DELIMITERS, key=first_line.count)
+    reader = csv.reader(chain([first_line], lines), delimiter=delimiter)
+    header = [column.strip() for column in next(reader, [])]
+    for col in required_columns:
+        if col not in header:
+            raise ImportFileError(f"CSV faylda '{col}' ustuni topilmadi.")
+    return csv_records(reader, header)
+
+
+def decoded_lines(file_obj):
+    try:
+        yield from codecs.iterdecode(file_obj, 'utf-8-sig')
+    except UnicodeDecodeError:
+        raise ImportFileError("CSV fayl UTF-8 kodlashda bo'lishi kerak.")
+
+
+def csv_records(reader, header):
+    # Bo'sh kataklar qatorga kiritilmaydi - Excel'dagi bo'sh katak kabi standart qiymat oladi
+    for values in reader:
+        row = {column: value.strip() for column, value in zip(header, values) if column and value.strip()}
+        if row:
+            yield row
+
+
+def row_count(rows):
+    """ Qatorlar soni: xls uchun aniq, xlsx uchun varaq o'lchamidan (taxminiy), CSV oqimi uchun None. """
+    if isinstance(rows, list):
+        return len(rows)
+    return getattr(rows, 'total', None)
+
+
+def chunked(iterable, size):
+    """ Iterable'ni `size` o'lchamdagi ro'yxatlarga bo'lib beradi. """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def is_blank(value):
+    return value is None or (isinstance(value, float) and math.isnan(value)) or str(value).strip() == ''
+
+
+def clean_text(value):
+    return '' if is_blank(value) else str(value).strip()
+
+
+def clean_phone(value):
+    # Excel telefon raqamini son sifatida saqlagan bo'lishi mumkin (998901234567.0)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return clean_text(value)
+
+
+def clean_int(value, column):
+    if is_blank(value):
+        return 0
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"'{column}' ustunida noto'g'ri son: {value}")
+    if number < 0:
+        raise ValueError(f"'{column}' ustunida manfiy son: {value}")
+    return number
+
+
+def clean_decimal(value, column):
+    if is_blank(value):
+        return Decimal('0.00')
+    try:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"'{column}' ustunida noto'g'ri summa: {value}")
+
+
+def product_values(row):
+    """ Fayldagi bitta qatorni Product maydonlari qiymatlariga aylantiradi. """
+    return {
+        'brand': clean_text(row.get('brand')),
+        'category': clean_text(row.get('category')),
+        'price': clean_decimal(row.get('price'), 'price'),
+        'quantity_healthy': clean_int(row.get('quantity_healthy'), 'quantity_healthy'),
+        'quantity_defective': clean_int(row.get('quantity_defective'), 'quantity_defective'),
+    }
+
+
+def bulk_upsert_products(rows, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False, progress=None):
+    """
+    Mahsulotlarni `name` bo'yicha qo'shadi yoki yangilaydi.
+
+    `rows` - fayl qatorlari (dict). Bir xil nomli mahsulot bazada bir nechta bo'lsa, eng kichik
+    id'li yozuv yangilanadi; faylda takrorlangan nomlar uchun oxirgi qator hisobga olinadi.
+    `dry_run=True` bo'lsa, hech narsa yozilmaydi, faqat natija sonlari qaytariladi.
+    `progress` - har bir bo'lakdan keyin ishlangan qatorlar soni bilan chaqiriladi.
+    """
+    result = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    planned = {}  # dry_run rejimida "yaratilgan" deb hisoblangan mahsulotlar (keyingi bo'laklar uchun)
+    started = time.monotonic()
+
+    with transaction.atomic():
+        for chunk in chunked(rows, chunk_size):
+            result['rows'] += len(chunk)
+
+            by_name = {}
+            for row in chunk:
+                name = clean_text(row.get('name'))
+                if not name:
+                    result['skipped'] += 1
+                    continue
+                by_name[name] = product_values(row)
+
+            existing = {}
+            products = Product.objects.filter(name__in=list(by_name)).order_by('-id')
+            if not dry_run:
+                # Qoldiq farqi harakat sifatida yoziladi - o'qishdan yozishgacha qatorlar qulflanadi
+                products = products.select_for_update()
+            for product in products:
+                existing[product.name] = product  # eng kichik id oxirida yoziladi va qoladi
+
+            to_create, to_update, old_quantities = [], [], []
+            for name, values in by_name.items():
+                product = existing.get(name) or planned.get(name)
+                if product is None:
+                    product = Product(name=name, **values)
+                    to_create.append(product)
+                    if dry_run:
+                        planned[name] = product
+                    continue
+
+                changed = [field for field, value in values.items() if getattr(product, field) != value]
+                if not changed:
+                    result['unchanged'] += 1
+                    continue
+                if product.pk is not None:
+                    old_quantities.append((product, product.quantity_healthy, product.quantity_defective))
+                for field in changed:
+                    setattr(product, field, values[field])
+                if product.pk is not None:
+                    to_update.append(product)
+                result['updated'] += 1
+
+            result['created'] += len(to_create)
+            if not dry_run:
+                Product.objects.bulk_create(to_create, batch_size=chunk_size)
+                Product.objects.bulk_update(to_update, PRODUCT_IMPORT_FIELDS, batch_size=chunk_size)
+                record_movements(
+                    [item for product in to_create for item in quantity_change_movements(product, 0, 0, StockMovement.TYPE_IMPORT)]
+                    + [
+                        item for product, healthy, defective in old_quantities
+                        for item in quantity_change_movements(product, healthy, defective, StockMovement.TYPE_IMPORT)
+                    ]
+                )
+            if progress:
+                progress(result['rows'])
+
+    duration = time.monotonic() - started
+    result['duration_seconds'] = round(duration, 3)
+    result['rows_per_second'] = round(result['rows'] / duration) if duration > 0 else result['rows']
+    result['dry_run'] = dry_run
+    return result
+
+
+def customer_values(row):
+    """ Fayldagi bitta qatordan Customer maydonlari: faylda bo'lmagan (bo'sh) manzil va qarz o'zgartirilmaydi. """
+    values = {
+        'full_name': ' '.join(clean_text(row.get('full_name')).split()),
+        'phone_number': clean_phone(row.get('phone_number')),
+    }
+    if not is_blank(row.get('address')):
+        values['address'] = clean_text(row.get('address'))
+    if not is_blank(row.get('debt')):
+        values['debt'] = clean_decimal(row.get('debt'), 'debt')
+    return values
+
+
+def upsert_customers(rows, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Mijozlarni normallashgan telefon + ism kaliti (`Customer.dedupe_key`) bo'yicha qo'shadi yoki
+    yangilaydi. Qatorlar bo'laklab ishlanadi: bo'lak uchun mavjud mijozlar indeks bo'yicha bitta
+    so'rov bilan olinadi, so'ng `bulk_create`/`bulk_update` - xotira sarfi bo'lak hajmiga bog'liq.
+
+    Bir kalitli mijoz bazada bir nechta bo'lsa, eng kichik id'lisi yangilanadi; faylda takrorlangan
+    qatorlardan oxirgisi hisobga olinadi (keyingi bo'lakdagi takror oldingisi yaratgan mijozni topadi).
+    `duplicates` - bir bo'lak ichida keyingi qator bilan birlashtirilgan qatorlar soni.
+    """
+    result = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'duplicates': 0}
+
+    with transaction.atomic():
+        for chunk in chunked(rows, chunk_size):
+            result['rows'] += len(chunk)
+
+            by_key, skipped = {}, 0
+            for row in chunk:
+                values = customer_values(row)
+                if not values['full_name']:
+                    skipped += 1
+                    continue
+                by_key[customer_dedupe_key(values['full_name'], values['phone_number'])] = values
+            result['skipped'] += skipped
+            result['duplicates'] += len(chunk) - skipped - len(by_key)
+
+            existing = {}
+            for customer in Customer.objects.select_for_update().filter(dedupe_key__in=list(by_key)).order_by('-id'):
+                existing[customer.dedupe_key] = customer
+
+            to_create, to_update = [], []
+            for key, values in by_key.items():
+                customer = existing.get(key)
+                if customer is None:
+                    to_create.append(Customer(dedupe_key=key, **{'address': '', **values}))
+                    continue
+                changed = [field for field, value in values.items() if getattr(customer, field) != value]
+                if not changed:
+                    result['unchanged'] += 1
+                    continue
+                for field in changed:
+                    setattr(customer, field, values[field])
+                to_update.append(customer)
+
+            Customer.objects.bulk_create(to_create, batch_size=chunk_size)
+            Customer.objects.bulk_update(to_update, CUSTOMER_IMPORT_FIELDS, batch_size=chunk_size)
+            result['created'] += len(to_create)
+            result['updated'] += len(to_update)
+            if progress:
+                progress(result['rows'])
+
+    return result
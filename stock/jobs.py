@@ -0,0 +1,226 @@
+"""
+Fon vazifalari (import/eksport) uchun navbat va bajaruvchi funksiyalar.
+
+Vazifalar `Job` jadvalida saqlanadi, shuning uchun ishchi (worker) qayta ishga tushsa ham
+yo'qolmaydi: navbatdagilar kutib turadi, "bajarilmoqda" holatida qolib ketganlari esa
+tirik signal (heartbeat) muddati o'tgach qaytadan navbatga qo'yiladi.
+"""
+import os
+import socket
+import tempfile
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .exports import (
+    PRODUCT_EXPORT_HEADERS, CUSTOMER_EXPORT_HEADERS, SALE_EXPORT_HEADERS,
+    product_export_rows, customer_export_rows, sale_export_rows, write_csv, write_xlsx
+)
+from .filters import SaleFilter
+from .imports import (
+    PRODUCT_REQUIRED_COLUMNS, CUSTOMER_REQUIRED_COLUMNS,
+    read_import_rows, row_count, bulk_upsert_products, upsert_customers
+)
+from .models import Job, Product, Customer, Sale, SaleItem
+
+PROGRESS_EVERY = 1000  # Shuncha qatordan keyin progress bazaga yoziladi
+
+# Har bir vazifa turi uchun foydalanuvchi yubora oladigan parametrlar
+JOB_PARAMS = {
+    Job.KIND_PRODUCT_IMPORT: ('dry_run',),
+    Job.KIND_CUSTOMER_IMPORT: (),
+    Job.KIND_PRODUCT_EXPORT: ('format',),
+    Job.KIND_CUSTOMER_EXPORT: ('format',),
+    Job.KIND_SALE_EXPORT: ('format', 'customer', 'status', 'start_date', 'end_date'),
+}
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """ Funksiyani berilgan turdagi vazifalar bajaruvchisi sifatida ro'yxatga oladi. """
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# --- Navbatni boshqarish --- #
+
+def claim_jobs(worker_id, limit):
+    """
+    Navbatdagi `limit` ta vazifani shu ishchiga biriktiradi. PostgreSQL'da SKIP LOCKED tufayli
+    bir nechta ishchi bir xil vazifani ikki marta olmaydi.
+    """
+    if limit <= 0:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        job_ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_PENDING)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=job_ids).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker_id,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return job_ids
+
+
+def heartbeat(job_ids):
+    """ Ishchi hali ham bu vazifalarni bajarayotganini bildiradi. """
+    if job_ids:
+        Job.objects.filter(id__in=list(job_ids), status=Job.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale_jobs(lease_seconds=None, max_attempts=None):
+    """
+    Tirik signali `lease_seconds` dan beri kelmagan (ishchisi o'chib qolgan) vazifalarni
+    qayta navbatga qo'yadi; urinishlar tugagan bo'lsa, xatolik bilan yakunlaydi.
+    """
+    lease_seconds = lease_seconds or settings.JOBS_LEASE_SECONDS
+    max_attempts = max_attempts or settings.JOBS_MAX_ATTEMPTS
+    stale = Job.objects.filter(
+        status=Job.STATUS_RUNNING,
+        heartbeat_at__lt=timezone.now() - timedelta(seconds=lease_seconds),
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=Job.STATUS_FAILED,
+        error="Ishchi javob bermay qoldi, urinishlar soni tugadi.",
+        finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status=Job.STATUS_PENDING, worker='')
+    return requeued, failed
+
+
+def report_progress(job, done, total=None):
+    job.progress = done
+    fields = {'progress': done, 'heartbeat_at': timezone.now()}
+    if total is not None:
+        job.total = total
+        fields['total'] = total
+    Job.objects.filter(pk=job.pk).update(**fields)
+
+
+def track_progress(job, rows, every=PROGRESS_EVERY):
+    """ Qatorlar generatorini o'rab, har `every` qatorda progressni yangilab boradi. """
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % every == 0:
+            report_progress(job, done)
+    report_progress(job, done)
+
+
+# --- Vazifani bajarish --- #
+
+def run_job(job_id):
+    """
+    Bitta vazifani bajaradi. Ishchi jarayonlar (process pool) ichida ham, to'g'ridan-to'g'ri
+    ham chaqirilishi mumkin. Bajaruvchidagi xatolik vazifani `failed` holatiga o'tkazadi.
+    """
+    try:
+        job = Job.objects.get(pk=job_id)
+        handler = JOB_HANDLERS[job.kind]
+        try:
+            result = handler(job)
+        except Exception as exc:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_FAILED,
+                error=f"{exc}\n\n{traceback.format_exc()}",
+                finished_at=timezone.now(),
+            )
+            return Job.STATUS_FAILED
+
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_SUCCEEDED,
+            result=result,
+            result_file=job.result_file.name or '',
+            error='',
+            finished_at=timezone.now(),
+        )
+        return Job.STATUS_SUCCEEDED
+    finally:
+        # Jarayon uzoq yashaydi - ulanishlar vazifalar orasida ochiq qolib ketmasin
+        if not connections['default'].in_atomic_block:
+            connections.close_all()
+
+
+def save_result_file(job, headers, rows, sheet_name, filename):
+    export_format = 'csv' if job.params.get('format') == 'csv' else 'xlsx'
+    with tempfile.TemporaryFile() as output:
+        if export_format == 'csv':
+            write_csv(headers, rows, output)
+        else:
+            write_xlsx(headers, rows, sheet_name=sheet_name, output=output)
+        job.result_file.save(f"{filename}.{export_format}", File(output), save=False)
+
+
+def is_truthy(value):
+    return str(value or '').lower() in ('1', 'true', 'yes')
+
+
+@job_handler(Job.KIND_PRODUCT_IMPORT)
+def run_product_import(job):
+    dry_run = is_truthy(job.params.get('dry_run'))
+    # CSV qatorlari fayldan o'qilgan sari ishlanadi - fayl import tugaguncha ochiq turadi
+    with job.input_file.open('rb') as file_obj:
+        rows = read_import_rows(file_obj, PRODUCT_REQUIRED_COLUMNS)
+        report_progress(job, 0, total=row_count(rows))
+        result = bulk_upsert_products(rows, dry_run=dry_run, progress=lambda done: report_progress(job, done))
+    if not dry_run:
+        bump_data_version(Product, catalogue=True)
+    return result
+
+
+@job_handler(Job.KIND_CUSTOMER_IMPORT)
+def run_customer_import(job):
+    with job.input_file.open('rb') as file_obj:
+        rows = read_import_rows(file_obj, CUSTOMER_REQUIRED_COLUMNS)
+        report_progress(job, 0, total=row_count(rows))
+        result = upsert_customers(rows, progress=lambda done: report_progress(job, done))
+    report_progress(job, result['rows'])
+    bump_data_version(Customer)
+    return result
+
+
+@job_handler(Job.KIND_PRODUCT_EXPORT)
+def run_product_export(job):
+    report_progress(job, 0, total=Product.objects.count())
+    rows = track_progress(job, product_export_rows())
+    save_result_file(job, PRODUCT_EXPORT_HEADERS, rows, 'Mahsulotlar', 'mahsulotlar')
+    return {'rows': job.progress}
+
+
+@job_handler(Job.KIND_CUSTOMER_EXPORT)
+def run_customer_export(job):
+    report_progress(job, 0, total=Customer.objects.count())
+    rows = track_progress(job, customer_export_rows())
+    save_result_file(job, CUSTOMER_EXPORT_HEADERS, rows, 'Mijozlar', 'mijozlar')
+    return {'rows': job.progress}
+
+
+@job_handler(Job.KIND_SALE_EXPORT)
+def run_sale_export(job):
+    sales = SaleFilter(job.params, queryset=Sale.objects.all()).qs
+    report_progress(job, 0, total=SaleItem.objects.filter(sale__in=sales.values('pk')).count())
+    rows = track_progress(job, sale_export_rows(sales))
+    save_result_file(job, SALE_EXPORT_HEADERS, rows, 'Sotuvlar', 'sotuvlar_tarixi')
+    return {'rows': job.progress}
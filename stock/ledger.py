@@ -0,0 +1,196 @@
+"""
+Mijoz hisobi (ledger) va qoldiq checkpoint'lari.
+
+Har bir sotuv debet, har bir to'lov kredit yozuvi sifatida `CustomerLedgerEntry` jadvaliga
+o'sha tranzaksiya ichida qo'shiladi. Davr boshidagi qoldiq oxirgi `CustomerBalanceCheckpoint`
+va undan keyingi yozuvlar yig'indisidan, davr harakatlari esa (mijoz, sana, id) indeksi
+bo'yicha bitta tartiblangan so'rovdan olinadi.
+
+Eski hujjat o'zgartirilsa yoki o'chirilsa (admin orqali), uning sanasidan keyingi
+checkpoint'lar o'chiriladi - ular `customer_ledger --checkpoint` buyrug'i bilan qayta hisoblanadi.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import CustomerBalanceCheckpoint, CustomerLedgerEntry, Payment, Sale
+from .rollups import insert_from_select
+from .sale_totals import AMOUNT_FIELD, refresh_sale_totals
+
+LEDGER_CHUNK_SIZE = 2000
+
+
+def invalidate_checkpoints(customer_id, moment):
+    """ `moment` dan keyingi checkpoint'lar endi noto'g'ri - o'chiramiz. """
+    CustomerBalanceCheckpoint.objects.filter(customer_id=customer_id, as_of__gt=moment).delete()
+
+
+def sale_entry(sale, amount):
+    """ Saqlanmagan yozuv - ko'p sotuvlar uchun bulk_create bilan yoziladi. """
+    return CustomerLedgerEntry(
+        customer_id=sale.customer_id,
+        entry_type=CustomerLedgerEntry.ENTRY_SALE,
+        sale=sale,
+        debit=amount,
+        created_at=sale.created_at,
+    )
+
+
+def record_sale_entry(sale, amount):
+    entry = sale_entry(sale, amount)
+    entry.save()
+    return entry
+
+
+def payment_entry(payment):
+    return CustomerLedgerEntry(
+        customer_id=payment.customer_id,
+        entry_type=CustomerLedgerEntry.ENTRY_PAYMENT,
+        payment=payment,
+        credit=payment.amount,
+        created_at=payment.created_at,
+    )
+
+
+def record_payment_entry(payment):
+    entry = payment_entry(payment)
+    entry.save()
+    return entry
+
+
+def sync_sale_entry(sale):
+    """
+    Sotuv (yoki uning qatorlari) o'zgartirilgandan keyin saqlangan jami summani va yozuvni
+    qayta hisoblaydi.
+    """
+    refresh_sale_totals([sale.pk])
+    sale.refresh_from_db(fields=['total_amount', 'item_count'])
+    old = CustomerLedgerEntry.objects.filter(sale=sale).first()
+    if old is not None:
+        invalidate_checkpoints(old.customer_id, old.created_at)
+        old.delete()
+    invalidate_checkpoints(sale.customer_id, sale.created_at)
+    return record_sale_entry(sale, sale.total_amount)
+
+
+def sync_payment_entry(payment):
+    old = CustomerLedgerEntry.objects.filter(payment=payment).first()
+    if old is not None:
+        invalidate_checkpoints(old.customer_id, old.created_at)
+        old.delete()
+    invalidate_checkpoints(payment.customer_id, payment.created_at)
+    return record_payment_entry(payment)
+
+
+def forget_entry(customer_id, created_at):
+    """ Hujjat o'chirilganda chaqiriladi (yozuvning o'zi CASCADE bilan o'chadi). """
+    invalidate_checkpoints(customer_id, created_at)
+
+
+# --- Qoldiqlar --- #
+
+def _entries_sum(entries):
+    totals = entries.aggregate(
+        debit=Coalesce(Sum('debit'), Value(Decimal('0'))),
+        credit=Coalesce(Sum('credit'), Value(Decimal('0'))),
+    )
+    return totals['debit'] - totals['credit']
+
+
+def balance_before(customer_id, moment):
+    """ Mijozning `moment` gacha (u kirmaydi) bo'lgan qoldig'i: checkpoint + qisqa delta. """
+    checkpoint = (
+        CustomerBalanceCheckpoint.objects
+        .filter(customer_id=customer_id, as_of__lte=moment)
+        .order_by('-as_of')
+        .first()
+    )
+    entries = CustomerLedgerEntry.objects.filter(customer_id=customer_id, created_at__lt=moment)
+    if checkpoint is None:
+        return _entries_sum(entries)
+    return checkpoint.balance + _entries_sum(entries.filter(created_at__gte=checkpoint.as_of))
+
+
+def entries_between(customer_id, start, end):
+    return (
+        CustomerLedgerEntry.objects
+        .filter(customer_id=customer_id, created_at__gte=start, created_at__lt=end)
+        .order_by('created_at', 'id')
+    )
+
+
+def create_checkpoints(as_of):
+    """
+    Hisobida yozuvi bor har bir mijoz uchun `as_of` holatidagi qoldiqni saqlaydi.
+    Bir mijoz uchun ikki so'rov (oldingi checkpoint va undan keyingi delta), mijozlar bo'lib-bo'lib olinadi.
+    """
+    customer_ids = (
+        CustomerLedgerEntry.objects.filter(created_at__lt=as_of)
+        .values_list('customer_id', flat=True).distinct().order_by('customer_id')
+    )
+    created = 0
+    batch = []
+    for customer_id in customer_ids.iterator(chunk_size=LEDGER_CHUNK_SIZE):
+        batch.append(CustomerBalanceCheckpoint(
+            customer_id=customer_id, as_of=as_of, balance=balance_before(customer_id, as_of)
+        ))
+        if len(batch) >= LEDGER_CHUNK_SIZE:
+            created += _save_checkpoints(batch, as_of)
+            batch = []
+    return created + _save_checkpoints(batch, as_of)
+
+
+@transaction.atomic
+def _save_checkpoints(batch, as_of):
+    if not batch:
+        return 0
+    CustomerBalanceCheckpoint.objects.filter(
+        as_of=as_of, customer_id__in=[checkpoint.customer_id for checkpoint in batch]
+    ).delete()
+    CustomerBalanceCheckpoint.objects.bulk_create(batch)
+    return len(batch)
+
+
+# --- To'liq qayta qurish (backfill) --- #
+
+LEDGER_COLUMNS = ('customer', 'entry_type', 'sale', 'payment', 'created_at', 'debit', 'credit')
+
+
+def _ledger_querysets():
+    """ Hisob yozuvlarini LEDGER_COLUMNS tartibida tanlaydigan so'rovlar. """
+    opts = CustomerLedgerEntry._meta
+    yield Sale.objects.values(
+        l_customer=F('customer_id'),
+        l_type=Value(CustomerLedgerEntry.ENTRY_SALE, output_field=opts.get_field('entry_type')),
+        l_sale=F('id'),
+        l_payment=Value(None, output_field=opts.get_field('payment').target_field),
+        l_created=F('created_at'),
+        l_debit=F('total_amount'),
+        l_credit=Value(Decimal('0'), output_field=AMOUNT_FIELD),
+    ).order_by()
+
+    yield Payment.objects.values(
+        l_customer=F('customer_id'),
+        l_type=Value(CustomerLedgerEntry.ENTRY_PAYMENT, output_field=opts.get_field('entry_type')),
+        l_sale=Value(None, output_field=opts.get_field('sale').target_field),
+        l_payment=F('id'),
+        l_created=F('created_at'),
+        l_debit=Value(Decimal('0'), output_field=AMOUNT_FIELD),
+        l_credit=F('amount'),
+    ).order_by()
+
+
+@transaction.atomic
+def rebuild_ledger():
+    """
+    Hisob jadvalini sotuv va to'lovlardan qaytadan quradi (INSERT ... SELECT, baza ichida);
+    checkpoint'lar o'chiriladi.
+    """
+    CustomerBalanceCheckpoint.objects.all().delete()
+    CustomerLedgerEntry.objects.all().delete()
+    return sum(
+        insert_from_select(CustomerLedgerEntry, LEDGER_COLUMNS, queryset)
+        for queryset in _ledger_querysets()
+    )
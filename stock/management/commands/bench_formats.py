@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stock.benchmarks import file_format_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Import/eksport fayl formatlarini solishtiradi: berilgan qatorli mahsulotlar jadvalini CSV va XLSX'ga "
+        "yozish hamda import o'quvchisi bilan qayta o'qish vaqti va fayl hajmi. Bazaga murojaat qilmaydi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Jadvaldagi qatorlar soni.")
+        parser.add_argument('--seed', type=int, default=42, help="Tasodifiy sonlar generatori uchun boshlang'ich qiymat.")
+
+    def handle(self, *args, **options):
+        if options['rows'] <= 0:
+            raise CommandError("--rows musbat bo'lishi kerak.")
+
+        results = file_format_benchmark(rows=options['rows'], seed=options['seed'])
+        for name in ('csv', 'xlsx'):
+            result = results[name]
+            self.stdout.write(
+                f"{name:<5} yozish {result['write_seconds']:>8.3f} s  o'qish {result['read_seconds']:>8.3f} s  "
+                f"hajm {result['bytes'] / 1024 / 1024:>7.1f} MB"
+            )
+        speedup = results['speedup']
+        self.stdout.write(self.style.SUCCESS(
+            f"CSV tezroq: yozish {speedup['write']}x, o'qish {speedup['read']}x ({options['rows']} qator)"
+        ))
@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Sum
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from stock.cache import bump_data_version
+from stock.models import Customer, Product, SaleItem
+from stock.views import SaleCreateAPIView
+
+
+class Command(BaseCommand):
+    help = (
+        "SaleCreateAPIView'ni N ta parallel mijoz (thread) bilan sinaydi: sekundiga sotuvlar soni, "
+        "kechikishlar va qoldiq manfiyga tushmaganini (oversell yo'qligini) tekshiradi. "
+        "Sozlangan bazada vaqtinchalik mahsulot/mijoz/foydalanuvchi yaratadi va oxirida o'chiradi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8, help="Parallel mijozlar (thread) soni.")
+        parser.add_argument('--sales', type=int, default=50, help="Har bir mijoz urinadigan sotuvlar soni.")
+        parser.add_argument('--quantity', type=int, default=1, help="Har bir sotuvdagi mahsulot soni.")
+        parser.add_argument('--stock', type=int, default=200, help="Mahsulotning boshlang'ich qoldig'i.")
+        parser.add_argument('--keep', action='store_true', help="Yaratilgan ma'lumotlarni o'chirmaslik.")
+
+    def handle(self, *args, **options):
+        clients, sales, quantity, stock = options['clients'], options['sales'], options['quantity'], options['stock']
+        if min(clients, sales, quantity) <= 0 or stock < 0:
+            raise CommandError("--clients, --sales va --quantity musbat, --stock manfiy bo'lmasligi kerak.")
+
+        tag = f"bench-sales-{uuid.uuid4().hex[:8]}"
+        user = User.objects.create_user(username=tag, is_staff=True)
+        customer = Customer.objects.create(full_name=tag, phone_number='-', address='-')
+        product = Product.objects.create(brand=tag, category=tag, name=tag, price=1, quantity_healthy=stock)
+        payload = {'customer': customer.pk, 'items': [{'product': product.pk, 'quantity': quantity, 'price': '1.00'}]}
+
+        results = {'created': 0, 'rejected': 0, 'errors': 0}
+        latencies = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(clients)
+
+        def client_loop():
+            factory = APIRequestFactory()
+            view = SaleCreateAPIView.as_view()
+            outcome = {'created': 0, 'rejected': 0, 'errors': 0}
+            timings = []
+            try:
+                start_barrier.wait()
+                for _ in range(sales):
+                    request = factory.post('/api/sales/create/', payload, format='json')
+                    force_authenticate(request, user=user)
+                    started = time.perf_counter()
+                    try:
+                        response = view(request)
+                    except Exception:  # masalan, SQLite'da "database is locked"
+                        outcome['errors'] += 1
+                        continue
+                    finally:
+                        timings.append(time.perf_counter() - started)
+                    if response.status_code == 201:
+                        outcome['created'] += 1
+                    elif response.status_code == 400:
+                        outcome['rejected'] += 1
+                    else:
+                        outcome['errors'] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    for key, value in outcome.items():
+                        results[key] += value
+                    latencies.extend(timings)
+
+        threads = [threading.Thread(target=client_loop) for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        product.refresh_from_db()
+        sold = SaleItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+        consistent = (
+            product.quantity_healthy >= 0
+            and product.quantity_healthy + sold == stock
+            and sold == results['created'] * quantity
+        )
+
+        latencies.sort()
+
+        def percentile(value):
+            if not latencies:
+                return 0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * value))] * 1000
+
+        self.stdout.write(
+            f"Mijozlar: {clients}, urinishlar: {clients * sales}, vaqt: {elapsed:.2f} s\n"
+            f"Sotuvlar: {results['created']} ({results['created'] / elapsed:.1f} sotuv/s), "
+            f"qoldiq yetmagani uchun rad etildi: {results['rejected']}, xatolar: {results['errors']}\n"
+            f"Kechikish p50/p95/p99: {percentile(0.50):.1f} / {percentile(0.95):.1f} / {percentile(0.99):.1f} ms\n"
+            f"Qoldiq: {stock} -> {product.quantity_healthy}, sotilgan: {sold}"
+        )
+
+        if not options['keep']:
+            # Sotuvlar, hisob va yig'ma qatorlari CASCADE orqali o'chadi
+            customer.delete()
+            product.delete()
+            user.delete()
+            bump_data_version()
+
+        if not consistent:
+            raise CommandError("Qoldiq sotuvlar bilan mos emas - oversell aniqlandi!")
+        self.stdout.write(self.style.SUCCESS("Oversell yo'q: qoldiq va sotuvlar mos."))
@@ -0,0 +1,124 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from stock.benchmarks import SCENARIOS, compare_results, generate_dataset, run_benchmark
+from stock.models import Sale
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Command(BaseCommand):
+    help = (
+        "API ssenariylari bo'yicha unumdorlik sinovi. Alohida test bazasi yaratiladi, unga berilgan "
+        "hajmdagi ma'lumot yoziladi va har bir ssenariy uchun p50/p95/p99 kechikish, o'tkazuvchanlik "
+        "va SQL so'rovlar soni o'lchanadi. Natijani JSON'ga yozish va oldingisi bilan solishtirish mumkin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=10000, help="Sotuvlar soni (masalan 10000 yoki 1000000).")
+        parser.add_argument('--customers', type=int, help="Mijozlar soni (standart: sotuvlar/50).")
+        parser.add_argument('--products', type=int, help="Mahsulotlar soni (standart: sotuvlar/100, ko'pi bilan 5000).")
+        parser.add_argument('--days', type=int, default=365, help="Sotuvlar tarqatiladigan kunlar soni.")
+        parser.add_argument('--seed', type=int, default=42, help="Tasodifiy sonlar generatori uchun boshlang'ich qiymat.")
+        parser.add_argument('--iterations', type=int, default=50, help="Har bir ssenariy uchun o'lchanadigan so'rovlar.")
+        parser.add_argument('--warmup', type=int, default=5, help="O'lchovdan oldingi \"qizdirish\" so'rovlari.")
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS), dest='scenarios',
+            help="Faqat shu ssenariy(lar)ni ishga tushirish. Bir necha marta berish mumkin.",
+        )
+        parser.add_argument('--output', help="Natijalarni yoziladigan JSON fayl.")
+        parser.add_argument('--compare', help="Solishtirish uchun oldingi natija (JSON fayl).")
+        parser.add_argument('--threshold', type=float, default=0.2, help="p95 o'sishi shu ulushdan oshsa - regression.")
+        parser.add_argument('--fail-on-regression', action='store_true', help="Regression bo'lsa, xatolik bilan chiqish.")
+        parser.add_argument('--keepdb', action='store_true', help="Test bazasini saqlab qolish va qayta ishlatish.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Solishtirish faylini o'qib bo'lmadi: {exc}")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            dataset = self.prepare_dataset(options)
+            results = run_benchmark(
+                names=options['scenarios'], iterations=options['iterations'], warmup=options['warmup'],
+                seed=options['seed'], progress=self.print_result,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': current_commit(),
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'dataset': dataset,
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+            self.stdout.write(f"Natijalar yozildi: {options['output']}")
+
+        if baseline is not None:
+            self.print_comparison(baseline, report, options)
+
+    def prepare_dataset(self, options):
+        dataset = {
+            'sales': options['sales'], 'customers': options['customers'], 'products': options['products'],
+            'days': options['days'], 'seed': options['seed'],
+        }
+        if options['keepdb'] and Sale.objects.exists():
+            self.stdout.write(f"Mavjud test bazasi ishlatilmoqda ({Sale.objects.count()} sotuv).")
+            return dataset
+        self.stdout.write(f"Ma'lumotlar yaratilmoqda: {options['sales']} sotuv...")
+        return generate_dataset(
+            sales=options['sales'], customers=options['customers'], products=options['products'],
+            days=options['days'], seed=options['seed'],
+        )
+
+    def print_result(self, name, result):
+        self.stdout.write(
+            f"{name:<24} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+            f"p99 {result['p99_ms']:>9.2f} ms  {result['throughput_rps']:>8.1f} so'rov/s  "
+            f"SQL {result['queries_p50']}/{result['queries_max']}  xato {result['errors']}"
+        )
+
+    def print_comparison(self, baseline, report, options):
+        rows = compare_results(baseline, report, threshold=options['threshold'])
+        self.stdout.write(f"\nSolishtirish: {baseline.get('meta', {}).get('commit') or '?'} -> {report['meta']['commit'] or '?'}")
+        for row in rows:
+            line = (
+                f"{row['scenario']:<24} p95 {row['p95_before_ms']:>9.2f} -> {row['p95_after_ms']:>9.2f} ms "
+                f"({row['p95_change']:+.1%})  SQL {row['queries_before']} -> {row['queries_after']}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['regression'] else line)
+
+        if options['fail_on_regression'] and any(row['regression'] for row in rows):
+            raise CommandError("Unumdorlik regressiyasi aniqlandi.")
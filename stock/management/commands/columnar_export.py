@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from stock.columnar import COLUMNAR_BATCH_SIZE, COLUMNAR_DATASETS, COLUMNAR_FORMATS, ColumnarExportError, export_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Sotuvlar, sotuv qatorlari, to'lovlar, yuk kirimlari va qaytarishlarni oylar bo'yicha bo'lingan "
+        "Parquet/Arrow fayllariga eksport qiladi. Har bir ishga tushirish oldingisi to'xtagan joydan davom etadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Natija katalogi (oldingi eksportlar va _state.json shu yerda).")
+        parser.add_argument(
+            '--dataset', action='append', choices=sorted(COLUMNAR_DATASETS),
+            help="Faqat shu dataset(lar) (bir necha marta berish mumkin). Standart: hammasi.",
+        )
+        parser.add_argument('--format', choices=sorted(COLUMNAR_FORMATS), default='parquet')
+        parser.add_argument(
+            '--since', help="Shu vaqtdan (ISO, masalan 2026-01-01 yoki 2026-01-01T00:00) boshlab; _state.json'dagi chegara e'tiborsiz qoladi.",
+        )
+        parser.add_argument('--full', action='store_true', help="Butun tarix (faqat bo'sh katalogga).")
+        parser.add_argument('--batch-size', type=int, default=COLUMNAR_BATCH_SIZE, help="Bitta row group'dagi qatorlar soni.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size musbat bo'lishi kerak.")
+        if options['full'] and options['since']:
+            raise CommandError("--full va --since birga berilmaydi.")
+        since = self.parse_since(options['since']) if options['since'] else None
+
+        for name in options['dataset'] or list(COLUMNAR_DATASETS):
+            try:
+                result = export_dataset(
+                    options['output'], name, since=since, full=options['full'], export_format=options['format'],
+                    batch_size=options['batch_size'], progress=self.report_progress,
+                )
+            except ColumnarExportError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {result['rows']} qator, {len(result['files'])} fayl (gacha: {result['until']:%Y-%m-%d %H:%M})"
+            ))
+
+    def parse_since(self, value):
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Noto'g'ri --since: {value}")
+        return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+    def report_progress(self, name, rows):
+        if self.verbosity >= 2:
+            self.stdout.write(f"{name}: {rows}")
@@ -0,0 +1,47 @@
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from stock.cache import bump_data_version
+from stock.ledger import create_checkpoints, rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = "Mijoz hisobini (CustomerLedgerEntry) qayta quradi va/yoki qoldiq checkpoint'larini hisoblaydi."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Hisob yozuvlarini sotuv va to'lovlardan qaytadan qurish (checkpoint'lar ham o'chadi).",
+        )
+        parser.add_argument(
+            '--checkpoint', action='store_true',
+            help="Har bir mijoz uchun qoldiq checkpoint'ini saqlash (masalan, har kecha cron orqali).",
+        )
+        parser.add_argument(
+            '--as-of', help="Checkpoint sanasi (YYYY-MM-DD, shu kun boshidagi qoldiq). Standart: bugun.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['rebuild'] and not options['checkpoint']:
+            raise CommandError("--rebuild yoki --checkpoint dan kamida bittasini bering.")
+
+        as_of_day = timezone.localdate()
+        if options['as_of']:
+            try:
+                as_of_day = date.fromisoformat(options['as_of'])
+            except ValueError:
+                raise CommandError("--as-of YYYY-MM-DD ko'rinishida bo'lishi kerak.")
+        # Kun boshi: hali yakunlanmagan tranzaksiyalar checkpoint'dan keyingi vaqtga tushadi
+        as_of = timezone.make_aware(datetime.combine(as_of_day, time.min))
+        if as_of > timezone.now():
+            raise CommandError("Checkpoint sanasi kelajakda bo'lishi mumkin emas.")
+
+        if options['rebuild']:
+            created = rebuild_ledger()
+            bump_data_version()
+            self.stdout.write(self.style.SUCCESS(f"Mijoz hisobi qayta qurildi: {created} yozuv."))
+        if options['checkpoint']:
+            created = create_checkpoints(as_of)
+            self.stdout.write(self.style.SUCCESS(f"{as_of_day} uchun {created} ta checkpoint saqlandi."))
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from stock.notifications import EMAIL_BACKENDS, dispatch_notifications, email_connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Navbatdagi e-mail bildirishnomalarini (outbox) yuboradi: bir qabul qiluvchiga tegishli xatlar "
+        "bitta xatga jamlanadi, yuborilmaganlari kutish vaqti oshib boradigan tarzda qayta uriladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            help=f"E-mail backend: {', '.join(EMAIL_BACKENDS)} yoki to'liq yo'l (standart: settings.EMAIL_BACKEND).",
+        )
+        parser.add_argument('--file-path', help="`file` backend uchun xatlar yoziladigan papka (standart: EMAIL_FILE_PATH).")
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.NOTIFICATIONS_BATCH_SIZE,
+            help="Bir partiyada olinadigan bildirishnomalar soni.",
+        )
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Navbatni tekshirish oralig'i (soniya).")
+        parser.add_argument('--once', action='store_true', help="Navbatdagi xatlarni yuborib, chiqib ketadi.")
+
+    def handle(self, *args, **options):
+        connection_kwargs = {'file_path': options['file_path']} if options['file_path'] else {}
+        self.stdout.write("Bildirishnomalar ishchisi ishga tushdi.")
+        try:
+            while True:
+                connection = email_connection(options['backend'], **connection_kwargs)
+                result = dispatch_notifications(connection=connection, batch_size=options['batch_size'])
+                if result['claimed']:
+                    self.stdout.write(
+                        f"Olindi: {result['claimed']}, xatlar: {result['emails']}, yuborildi: {result['sent']}, "
+                        f"qayta urinish: {result['retry']}, xatolik: {result['failed']}"
+                    )
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Ishchi to'xtatildi.")
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock.rollups import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = "Kunlik sotuv yig'masini (DailySalesRollup) sotuv, to'lov va qaytarishlardan qaytadan quradi."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', help="Faqat shu kundan (YYYY-MM-DD) boshlab qayta qurish. Berilmasa, butun tarix.",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since YYYY-MM-DD ko'rinishida bo'lishi kerak.")
+
+        created = rebuild_rollup(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Yig'ma qayta qurildi: {created} qator."))
@@ -0,0 +1,104 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from stock.jobs import claim_jobs, default_worker_id, heartbeat, requeue_stale_jobs, run_job
+from stock.models import Job
+
+
+class Command(BaseCommand):
+    help = "Navbatdagi fon vazifalarini (import/eksport) jarayonlar havzasida (process pool) bajaradi."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS_WORKER_PROCESSES,
+            help="Parallel ishlaydigan jarayonlar soni. 0 - vazifalar shu jarayonning o'zida bajariladi.",
+        )
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Navbatni tekshirish oralig'i (soniya).")
+        parser.add_argument('--once', action='store_true', help="Navbatdagi vazifalarni bajarib, chiqib ketadi.")
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        self.poll_interval = options['poll_interval']
+        self.once = options['once']
+        self.worker_id = default_worker_id()
+
+        self.stdout.write(f"Ishchi {self.worker_id} ishga tushdi ({processes or 'inline'} jarayon).")
+        if processes <= 0:
+            self.run_inline()
+            return
+
+        self.processes = processes
+        self.executor = self.make_executor()
+        inflight = {}
+        try:
+            self.run_pool(inflight)
+        except KeyboardInterrupt:
+            # Tugallanmagan vazifalar boshqa ishchi tomonidan qayta olinishi uchun navbatga qaytadi
+            Job.objects.filter(id__in=list(inflight.values()), status=Job.STATUS_RUNNING).update(
+                status=Job.STATUS_PENDING, worker=''
+            )
+            self.stdout.write("Ishchi to'xtatildi.")
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def make_executor(self):
+        # Har bir jarayon o'z ulanishini ochadi; "spawn" tufayli ota jarayon ulanishi meros qolmaydi
+        connections.close_all()
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+
+    def run_inline(self):
+        while True:
+            requeue_stale_jobs()
+            job_ids = claim_jobs(self.worker_id, 1)
+            for job_id in job_ids:
+                self.report(job_id, run_job(job_id))
+            if not job_ids:
+                if self.once:
+                    return
+                time.sleep(self.poll_interval)
+
+    def run_pool(self, inflight):
+        while True:
+            requeue_stale_jobs()
+            for job_id in claim_jobs(self.worker_id, self.processes - len(inflight)):
+                inflight[self.executor.submit(run_job, job_id)] = job_id
+
+            if not inflight:
+                if self.once:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+
+            heartbeat(inflight.values())
+            done, _ = wait(inflight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                job_id = inflight.pop(future)
+                try:
+                    self.report(job_id, future.result())
+                except Exception as exc:
+                    # Jarayon kutilmaganda o'lgan bo'lsa (masalan, xotira yetmay)
+                    Job.objects.filter(pk=job_id, status=Job.STATUS_RUNNING).update(
+                        status=Job.STATUS_FAILED, error=f"Ishchi jarayon xatosi: {exc}"
+                    )
+                    self.stderr.write(f"Vazifa #{job_id}: ishchi jarayon xatosi: {exc}")
+                    broken = broken or isinstance(exc, BrokenProcessPool)
+
+            if broken:
+                # Buzilgan havza yangi vazifa qabul qilmaydi - uni qayta yaratamiz
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self.make_executor()
+
+    def report(self, job_id, job_status):
+        self.stdout.write(f"Vazifa #{job_id}: {job_status}")
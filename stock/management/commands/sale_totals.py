@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stock.cache import bump_data_version
+from stock.sale_totals import SALE_TOTALS_CHUNK_SIZE, backfill_sale_totals, verify_sale_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Sale.total_amount va Sale.item_count ustunlarini sotuv qatorlaridan qayta hisoblaydi (--backfill) "
+        "va/yoki ularni qatorlar bilan butun jadval bo'yicha bo'laklab solishtiradi (--verify)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help="Barcha sotuvlar uchun qiymatlarni qayta hisoblash (har bir bo'lak alohida tranzaksiyada).",
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Saqlangan qiymatlarni qatorlar bilan solishtirish; farq bo'lsa, xatolik bilan chiqadi.",
+        )
+        parser.add_argument('--chunk-size', type=int, default=SALE_TOTALS_CHUNK_SIZE, help="Bir bo'lakdagi sotuvlar soni.")
+        parser.add_argument('--show', type=int, default=20, help="Ko'rsatiladigan farqlar soni.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if not options['backfill'] and not options['verify']:
+            raise CommandError("--backfill yoki --verify dan kamida bittasini bering.")
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size musbat bo'lishi kerak.")
+
+        if options['backfill']:
+            updated = backfill_sale_totals(chunk_size=options['chunk_size'], progress=self.report_backfill)
+            # total_amount'ni dashboard, trendlar, yig'ma va mijoz hisobi o'qiydi
+            bump_data_version()
+            self.stdout.write(self.style.SUCCESS(f"{updated} ta sotuv qayta hisoblandi."))
+            self.stdout.write(
+                "Jami summalar o'zgargan bo'lsa, yig'ma va mijoz hisobini ham qayta quring: "
+                "manage.py rebuild_sales_rollup && manage.py customer_ledger --rebuild"
+            )
+
+        if options['verify']:
+            checked, mismatches = verify_sale_totals(chunk_size=options['chunk_size'], progress=self.report_verify)
+            for sale_id, stored, actual in mismatches[:options['show']]:
+                self.stdout.write(
+                    f"Sotuv #{sale_id}: saqlangan {stored[0]} / {stored[1]} qator, qatorlar bo'yicha {actual[0]} / {actual[1]} qator"
+                )
+            if mismatches:
+                raise CommandError(f"{checked} ta sotuvdan {len(mismatches)} tasida jami summa qatorlarga mos emas.")
+            self.stdout.write(self.style.SUCCESS(f"{checked} ta sotuv tekshirildi: jami summalar qatorlarga mos."))
+
+    def report_backfill(self, updated):
+        if self.verbosity >= 2:
+            self.stdout.write(f"Yangilandi: {updated}")
+
+    def report_verify(self, checked, mismatched):
+        if self.verbosity >= 2:
+            self.stdout.write(f"Tekshirildi: {checked}, farqlar: {mismatched}")
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock.models import Sale
+from stock.seeding import SEED_DEFAULTS, seed_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Sun'iy ma'lumot yaratadi: sotuvlar, sotuv qatorlari, to'lovlar, kirimlar va qaytarishlar. "
+        "PostgreSQL'da COPY, boshqa bazalarda bo'laklangan bulk_create ishlatiladi. Mijoz qarzlari va "
+        "mahsulot qoldiqlari yaratilgan tarixga mos bo'ladi. Mavjud ma'lumotlar o'chirilmaydi - yangilari qo'shiladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=SEED_DEFAULTS['sales'], help="Sotuvlar (cheklar) soni.")
+        parser.add_argument('--customers', type=int, help="Mijozlar soni (standart: sotuvlar/50).")
+        parser.add_argument('--products', type=int, help="Mahsulotlar soni (standart: sotuvlar/100, 20..5000).")
+        parser.add_argument('--sellers', type=int, default=SEED_DEFAULTS['sellers'], help="Sotuvchilar soni.")
+        parser.add_argument('--days', type=int, default=SEED_DEFAULTS['days'], help="Tarix uzunligi (kun).")
+        parser.add_argument('--basket-mean', type=float, default=SEED_DEFAULTS['basket_mean'], help="Chekdagi o'rtacha mahsulot turlari.")
+        parser.add_argument('--max-quantity', type=int, default=SEED_DEFAULTS['max_quantity'], help="Bir qatordagi eng ko'p dona.")
+        parser.add_argument('--seasonality', type=float, default=SEED_DEFAULTS['seasonality'], help="Yillik mavsumiylik amplitudasi (0..1).")
+        parser.add_argument('--weekend-factor', type=float, default=SEED_DEFAULTS['weekend_factor'], help="Dam olish kunlari savdo koeffitsienti.")
+        parser.add_argument('--seller-skew', type=float, default=SEED_DEFAULTS['seller_skew'], help="Sotuvchilar ulushi notekisligi (0 - teng).")
+        parser.add_argument('--product-skew', type=float, default=SEED_DEFAULTS['product_skew'], help="Mahsulot ommabopligi notekisligi (0 - teng).")
+        parser.add_argument('--payment-ratio', type=float, default=SEED_DEFAULTS['payment_ratio'], help="Sotuvlarning to'langan o'rtacha ulushi.")
+        parser.add_argument('--return-rate', type=float, default=SEED_DEFAULTS['return_rate'], help="Qaytariladigan qatorlar ulushi.")
+        parser.add_argument('--defect-rate', type=float, default=SEED_DEFAULTS['defect_rate'], help="Qaytarishlardagi brak ulushi.")
+        parser.add_argument('--receipts-per-product', type=int, default=SEED_DEFAULTS['receipts_per_product'], help="Har bir mahsulot uchun kirimlar soni.")
+        parser.add_argument('--leftover-min', type=int, default=SEED_DEFAULTS['leftover_min'], help="Omborda qoladigan eng kam qoldiq.")
+        parser.add_argument('--leftover-max', type=int, default=SEED_DEFAULTS['leftover_max'], help="Omborda qoladigan eng ko'p qoldiq.")
+        parser.add_argument('--seed', type=int, default=SEED_DEFAULTS['seed'], help="Tasodifiy sonlar generatori boshlang'ich qiymati.")
+        parser.add_argument('--chunk-size', type=int, default=SEED_DEFAULTS['chunk_size'], help="Bir martada yoziladigan qatorlar.")
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help="Kunlik yig'ma va mijoz hisobini qayta qurmaslik (keyin alohida buyruqlar bilan quriladi).",
+        )
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help="Tasdiq so'ramaslik.",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['sales'] <= 0 or options['days'] <= 0 or options['sellers'] <= 0:
+            raise CommandError("--sales, --days va --sellers musbat bo'lishi kerak.")
+        if options['leftover_min'] < 0 or options['leftover_max'] < options['leftover_min']:
+            raise CommandError("--leftover-min/--leftover-max oralig'i noto'g'ri.")
+
+        if options['interactive'] and Sale.objects.exists():
+            answer = input(
+                "Bazada allaqachon sotuvlar bor. Sun'iy ma'lumotlar ularga qo'shiladi. Davom etilsinmi? [yes/no]: "
+            )
+            if answer.strip().lower() != 'yes':
+                raise CommandError("Bekor qilindi.")
+
+        params = {key: options[key] for key in SEED_DEFAULTS if key in options}
+        params['rebuild_derived'] = not options['skip_derived']
+
+        started = time.perf_counter()
+        counts = seed_data(progress=self.report_progress, **params)
+        elapsed = time.perf_counter() - started
+
+        summary = ', '.join(f"{name}: {count}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Tayyor ({elapsed:.1f} s). {summary}"))
+
+    def report_progress(self, stage, done, total):
+        if self.verbosity >= 1 and (stage != 'sales' or done == total or done % 100000 < 10000):
+            self.stdout.write(f"  {stage}: {done}/{total}")
@@ -0,0 +1,64 @@
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from stock.movements import STOCK_CHUNK_SIZE, create_snapshots, verify_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Ombor harakatlari (StockMovement) bo'yicha qoldiq snapshot'larini saqlaydi va/yoki harakatlar "
+        "yig'indisini Product hisoblagichlari bilan butun katalog bo'yicha bo'laklab solishtiradi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--snapshot', action='store_true',
+            help="Har bir mahsulot uchun qoldiq snapshot'ini saqlash (masalan, har kecha cron orqali).",
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Harakatlar yig'indisi va Product qoldiqlarini solishtirish; farq bo'lsa, xatolik bilan chiqadi.",
+        )
+        parser.add_argument(
+            '--as-of', help="Snapshot sanasi (YYYY-MM-DD, shu kun boshidagi qoldiq). Standart: bugun.",
+        )
+        parser.add_argument('--chunk-size', type=int, default=STOCK_CHUNK_SIZE, help="Bir bo'lakdagi mahsulotlar soni.")
+        parser.add_argument('--show', type=int, default=20, help="Ko'rsatiladigan farqlar soni.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if not options['snapshot'] and not options['verify']:
+            raise CommandError("--snapshot yoki --verify dan kamida bittasini bering.")
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size musbat bo'lishi kerak.")
+
+        if options['snapshot']:
+            as_of_day = timezone.localdate()
+            if options['as_of']:
+                try:
+                    as_of_day = date.fromisoformat(options['as_of'])
+                except ValueError:
+                    raise CommandError("--as-of YYYY-MM-DD ko'rinishida bo'lishi kerak.")
+            # Kun boshi: hali yakunlanmagan tranzaksiyalar snapshot'dan keyingi vaqtga tushadi
+            as_of = timezone.make_aware(datetime.combine(as_of_day, time.min))
+            if as_of > timezone.now():
+                raise CommandError("Snapshot sanasi kelajakda bo'lishi mumkin emas.")
+            created = create_snapshots(as_of, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f"{as_of_day} uchun {created} ta snapshot saqlandi."))
+
+        if options['verify']:
+            checked, mismatches = verify_stock(chunk_size=options['chunk_size'], progress=self.report_progress)
+            for product_id, counters, ledger in mismatches[:options['show']]:
+                self.stdout.write(
+                    f"Mahsulot #{product_id}: Product (sog'lom/brak) {counters[0]}/{counters[1]}, "
+                    f"harakatlar bo'yicha {ledger[0]}/{ledger[1]}"
+                )
+            if mismatches:
+                raise CommandError(f"{checked} ta mahsulotdan {len(mismatches)} tasida qoldiq harakatlarga mos emas.")
+            self.stdout.write(self.style.SUCCESS(f"{checked} ta mahsulot tekshirildi: qoldiqlar harakatlarga mos."))
+
+    def report_progress(self, checked, mismatched):
+        if self.verbosity >= 2:
+            self.stdout.write(f"Tekshirildi: {checked}, farqlar: {mismatched}")
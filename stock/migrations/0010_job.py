@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0009_returnedproduct'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product_import', 'Mahsulotlar importi'), ('customer_import', 'Mijozlar importi'), ('product_export', 'Mahsulotlar eksporti'), ('customer_export', 'Mijozlar eksporti'), ('sale_export', 'Sotuvlar eksporti')], max_length=32, verbose_name='Vazifa turi')),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('running', 'Bajarilmoqda'), ('succeeded', 'Bajarildi'), ('failed', 'Xatolik')], default='pending', max_length=16, verbose_name='Holati')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parametrlar')),
+                ('input_file', models.FileField(blank=True, upload_to='jobs/inputs/%Y/%m/', verbose_name='Yuklangan fayl')),
+                ('result_file', models.FileField(blank=True, upload_to='jobs/results/%Y/%m/', verbose_name='Natija fayli')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Natija')),
+                ('error', models.TextField(blank=True, verbose_name='Xatolik matni')),
+                ('progress', models.PositiveIntegerField(default=0, verbose_name='Bajarilgan qatorlar')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Jami qatorlar')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Urinishlar soni')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Ishchi (worker)')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='Oxirgi tirik signal')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan sana')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Boshlangan vaqt')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Tugagan vaqt')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='Yaratgan foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Fon vazifasi',
+                'verbose_name_plural': 'Fon vazifalari',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='stock_job_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0010_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Kun')),
+                ('sales_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Sotuv summasi')),
+                ('sales_quantity', models.IntegerField(default=0, verbose_name='Sotilgan miqdor')),
+                ('sales_count', models.IntegerField(default=0, verbose_name='Cheklar soni')),
+                ('payments_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="To'lovlar summasi")),
+                ('payments_count', models.IntegerField(default=0, verbose_name="To'lovlar soni")),
+                ('returns_healthy_quantity', models.IntegerField(default=0, verbose_name="Qaytgan sog'lom miqdor")),
+                ('returns_defective_quantity', models.IntegerField(default=0, verbose_name='Qaytgan brak miqdor')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stock.customer', verbose_name='Mijoz')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='stock.product', verbose_name='Mahsulot')),
+                ('seller', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Sotuvchi')),
+            ],
+            options={
+                'verbose_name': "Kunlik sotuv yig'masi",
+                'verbose_name_plural': "Kunlik sotuv yig'malari",
+                'indexes': [models.Index(fields=['day', 'customer'], name='stock_rollup_day_cust_idx'), models.Index(fields=['customer', 'day'], name='stock_rollup_cust_day_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+
+def fill_ledger(apps, schema_editor):
+    # Mavjud sotuv va to'lovlar uchun hisob yozuvlari (keyinchalik: `customer_ledger --rebuild`)
+    Sale = apps.get_model('stock', 'Sale')
+    Payment = apps.get_model('stock', 'Payment')
+    CustomerLedgerEntry = apps.get_model('stock', 'CustomerLedgerEntry')
+
+    line_total = ExpressionWrapper(
+        F('items__quantity') * F('items__price'), output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+    # Yozuvlar 2000 tadan yoziladi - xotira sarfi tarix uzunligiga bog'liq emas
+    entries = []
+
+    def add(entry):
+        entries.append(entry)
+        if len(entries) >= 2000:
+            CustomerLedgerEntry.objects.bulk_create(entries)
+            entries.clear()
+
+    for sale in Sale.objects.annotate(total=Sum(line_total)).iterator(chunk_size=2000):
+        add(CustomerLedgerEntry(
+            customer_id=sale.customer_id, entry_type='sale', sale_id=sale.id,
+            debit=sale.total or 0, created_at=sale.created_at,
+        ))
+    for payment in Payment.objects.iterator(chunk_size=2000):
+        add(CustomerLedgerEntry(
+            customer_id=payment.customer_id, entry_type='payment', payment_id=payment.id,
+            credit=payment.amount, created_at=payment.created_at,
+        ))
+    CustomerLedgerEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0011_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerBalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField(verbose_name='Qoldiq sanasi')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Qoldiq')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Hisoblangan vaqt')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to='stock.customer', verbose_name='Mijoz')),
+            ],
+            options={
+                'verbose_name': "Mijoz qoldig'i (checkpoint)",
+                'verbose_name_plural': 'Mijoz qoldiqlari (checkpoint)',
+                'constraints': [models.UniqueConstraint(fields=('customer', 'as_of'), name='stock_checkpoint_cust_asof_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('sale', 'Sotuv'), ('payment', "To'lov")], max_length=16, verbose_name='Turi')),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Debet')),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Kredit')),
+                ('created_at', models.DateTimeField(verbose_name='Hujjat sanasi')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='stock.customer', verbose_name='Mijoz')),
+                ('payment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entry', to='stock.payment', verbose_name="To'lov")),
+                ('sale', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entry', to='stock.sale', verbose_name='Sotuv')),
+            ],
+            options={
+                'verbose_name': 'Mijoz hisobi yozuvi',
+                'verbose_name_plural': 'Mijoz hisobi yozuvlari',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['customer', 'created_at', 'id'], name='stock_ledger_cust_created_idx')],
+            },
+        ),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0012_customer_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='customer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='stock.customer', verbose_name='Mijoz'),
+        ),
+        migrations.AlterField(
+            model_name='returnedproduct',
+            name='customer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='stock.customer', verbose_name='Mijoz'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='customer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='stock.customer', verbose_name='Mijoz'),
+        ),
+        migrations.AlterField(
+            model_name='saleitem',
+            name='sale',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='stock.sale', verbose_name='Tegishli sotuv'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['customer', 'created_at'], name='stock_payment_cust_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name'], name='stock_product_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='returnedproduct',
+            index=models.Index(fields=['-returned_at', '-id'], name='stock_return_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='returnedproduct',
+            index=models.Index(fields=['condition', '-returned_at', '-id'], name='stock_return_cond_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='returnedproduct',
+            index=models.Index(fields=['customer', '-returned_at', '-id'], name='stock_return_cust_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['-created_at', '-id'], name='stock_sale_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='stock_sale_cust_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='stock_sale_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(condition=models.Q(('status__in', ('yaratildi', 'omborga_yuborildi', 'yigildi', 'bron_qilindi'))), fields=['-created_at', '-id'], name='stock_sale_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['sale', 'product'], name='stock_saleitem_sale_prod_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0013_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audience', models.CharField(blank=True, max_length=150, verbose_name='Guruh')),
+                ('recipient', models.EmailField(blank=True, max_length=254, verbose_name='Qabul qiluvchi')),
+                ('subject', models.CharField(max_length=255, verbose_name='Mavzu')),
+                ('body', models.TextField(verbose_name='Matn')),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('sent', 'Yuborildi'), ('failed', 'Xatolik')], default='pending', max_length=16, verbose_name='Holati')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Urinishlar soni')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Keyingi urinish')),
+                ('last_error', models.TextField(blank=True, verbose_name='Oxirgi xatolik')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan sana')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Yuborilgan vaqt')),
+            ],
+            options={
+                'verbose_name': 'Bildirishnoma',
+                'verbose_name_plural': 'Bildirishnomalar',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='stock_notif_status_next_idx')],
+            },
+        ),
+    ]
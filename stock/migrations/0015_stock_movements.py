@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.utils import timezone
+
+
+def open_balances(apps, schema_editor):
+    # Tarix yo'q - mavjud qoldiqlar "boshlang'ich qoldiq" harakati bo'ladi. stock.movements.open_balances
+    # kabi INSERT ... SELECT bilan: qatorlar Python'ga olib kelinmaydi
+    Product = apps.get_model('stock', 'Product')
+    StockMovement = apps.get_model('stock', 'StockMovement')
+
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    opts = StockMovement._meta
+    columns = ('product', 'movement_type', 'condition', 'delta', 'document_type', 'document_id', 'created_at')
+    column_sql = ', '.join(quote(opts.get_field(name).column) for name in columns)
+    now = timezone.now()
+    for condition, field_name in (('healthy', 'quantity_healthy'), ('defective', 'quantity_defective')):
+        queryset = Product.objects.filter(**{f'{field_name}__gt': 0}).values(
+            m_product=F('id'),
+            m_type=Value('opening', output_field=opts.get_field('movement_type')),
+            m_condition=Value(condition, output_field=opts.get_field('condition')),
+            m_delta=F(field_name),
+            m_document_type=Value('', output_field=opts.get_field('document_type')),
+            m_document_id=Value(None, output_field=opts.get_field('document_id')),
+            m_created=Value(now, output_field=opts.get_field('created_at')),
+        ).order_by()
+        select_sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {quote(opts.db_table)} ({column_sql}) {select_sql}", params)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0014_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_type', models.CharField(choices=[('opening', "Boshlang'ich qoldiq"), ('receipt', 'Kirim'), ('sale', 'Sotuv'), ('return', 'Qaytarish'), ('transfer', "Holat o'zgarishi"), ('import', 'Import'), ('adjustment', "Qo'lda tuzatish")], max_length=16, verbose_name='Harakat turi')),
+                ('condition', models.CharField(choices=[('healthy', "Sog'lom"), ('defective', 'Brak')], max_length=16, verbose_name='Holati')),
+                ('delta', models.IntegerField(verbose_name="O'zgarish (dona)")),
+                ('document_type', models.CharField(blank=True, max_length=16, verbose_name='Hujjat turi')),
+                ('document_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Hujjat raqami')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Sana')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='stock.product', verbose_name='Mahsulot')),
+            ],
+            options={
+                'verbose_name': 'Ombor harakati',
+                'verbose_name_plural': 'Ombor harakatlari',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['product', 'created_at'], name='stock_move_prod_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField(verbose_name='Qoldiq sanasi')),
+                ('quantity_healthy', models.IntegerField(verbose_name="Sog'lom qoldiq")),
+                ('quantity_defective', models.IntegerField(verbose_name='Brak qoldiq')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Hisoblangan vaqt')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='stock.product', verbose_name='Mahsulot')),
+            ],
+            options={
+                'verbose_name': "Qoldiq snapshot'i",
+                'verbose_name_plural': "Qoldiq snapshot'lari",
+                'constraints': [models.UniqueConstraint(fields=('product', 'as_of'), name='stock_snapshot_prod_asof_uniq')],
+            },
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
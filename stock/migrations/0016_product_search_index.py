@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# stock/search.py dagi SEARCH_DOCUMENT_SQL bilan bir xil bo'lishi kerak - aks holda indeks ishlatilmaydi
+SEARCH_DOCUMENT_SQL = "lower(name || ' ' || brand || ' ' || category)"
+
+
+def create_search_index(apps, schema_editor):
+    # Faqat PostgreSQL: boshqa bazalarda qidiruv xotiradagi indeks bilan ishlaydi
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS stock_product_search_trgm_idx "
+        f"ON stock_product USING gin (({SEARCH_DOCUMENT_SQL}) gin_trgm_ops)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS stock_product_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0015_stock_movements'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:25
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_totals(apps, schema_editor):
+    # Mavjud sotuvlar qatorlaridan, id bo'yicha bo'laklab (katta jadvalda ham qisqa UPDATE'lar)
+    Sale = apps.get_model('stock', 'Sale')
+    SaleItem = apps.get_model('stock', 'SaleItem')
+
+    amount = DecimalField(max_digits=14, decimal_places=2)
+    items = SaleItem.objects.filter(sale=OuterRef('pk')).order_by().values('sale')
+    totals = {
+        'total_amount': Coalesce(Subquery(items.annotate(
+            value=Sum(ExpressionWrapper(F('quantity') * F('price'), output_field=amount))
+        ).values('value')), Value(0), output_field=amount),
+        'item_count': Coalesce(Subquery(items.annotate(value=Count('id')).values('value')), Value(0), output_field=IntegerField()),
+    }
+    last_id = 0
+    while True:
+        ids = list(Sale.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:5000])
+        if not ids:
+            return
+        Sale.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(**totals)
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0016_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Qatorlar soni'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Jami summa (USDda)'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
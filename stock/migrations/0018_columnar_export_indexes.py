@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0017_sale_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goodsreceipt',
+            index=models.Index(fields=['created_at', 'id'], name='stock_receipt_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['created_at', 'id'], name='stock_payment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='returnedproduct',
+            index=models.Index(fields=['created_at', 'id'], name='stock_return_created_idx'),
+        ),
+    ]
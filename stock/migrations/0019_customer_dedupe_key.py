@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+def dedupe_key(full_name, phone_number):
+    # stock.models.customer_dedupe_key bilan bir xil (migratsiya model kodiga bog'lanmasligi uchun nusxa)
+    digits = ''.join(filter(str.isdigit, phone_number or ''))
+    if len(digits) == 9:
+        digits = f'998{digits}'
+    return f"{digits}|{' '.join((full_name or '').lower().split())}"[:300]
+
+
+def fill_dedupe_keys(apps, schema_editor):
+    # Mavjud mijozlar id bo'yicha bo'laklab (kalit Python'da hisoblanadi)
+    Customer = apps.get_model('stock', 'Customer')
+    last_id = 0
+    while True:
+        chunk = list(Customer.objects.filter(pk__gt=last_id).order_by('pk').only('id', 'full_name', 'phone_number')[:5000])
+        if not chunk:
+            return
+        for customer in chunk:
+            customer.dedupe_key = dedupe_key(customer.full_name, customer.phone_number)
+        Customer.objects.bulk_update(chunk, ['dedupe_key'], batch_size=1000)
+        last_id = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0018_columnar_export_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='dedupe_key',
+            field=models.CharField(default='', editable=False, max_length=300, verbose_name='Takrorlanish kaliti'),
+        ),
+        migrations.RunPython(fill_dedupe_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['dedupe_key'], name='stock_customer_dedupe_idx'),
+        ),
+    ]
@@ -22,6 +22,25 @@ class Product(models.Model):
     class Meta:
         verbose_name = "Mahsulot"
         verbose_name_plural = "Mahsulotlar"
+        indexes = [
+            # Import mahsulotlarni nom bo'yicha topadi (name__in)
+            models.Index(fields=['name'], name='stock_product_name_idx'),
+        ]
+
+
+CUSTOMER_DEDUPE_KEY_LENGTH = 300
+
+
+def normalize_phone_number(value):
+    """ Faqat raqamlar qoladi; 9 xonali mahalliy raqamga 998 kodi qo'shiladi ("90 123-45-67" -> "998901234567"). """
+    digits = ''.join(filter(str.isdigit, str(value or '')))
+    return f'998{digits}' if len(digits) == 9 else digits
+
+
+def customer_dedupe_key(full_name, phone_number):
+    """ Import mijozni shu kalit bo'yicha topadi: normallashgan telefon + kichik harfli, bo'shliqlari tekislangan ism. """
+    name = ' '.join(str(full_name or '').lower().split())
+    return f"{normalize_phone_number(phone_number)}|{name}"[:CUSTOMER_DEDUPE_KEY_LENGTH]
 
 
 class Customer(models.Model):
@@ -32,13 +51,30 @@ class Customer(models.Model):
     phone_number = models.CharField(max_length=20, verbose_name="Telefon raqami")
     address = models.TextField(verbose_name="Manzili")
     debt = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Qarzdorligi (USDda)")
+    # Ism va telefondan hisoblanadi (customer_dedupe_key) - saqlashda yangilanadi, ommaviy yozuvlar uni o'zi beradi
+    dedupe_key = models.CharField(max_length=CUSTOMER_DEDUPE_KEY_LENGTH, default='', editable=False, verbose_name="Takrorlanish kaliti")
 
     def __str__(self):
         return self.full_name
 
+    def save(self, *args, **kwargs):
+        self.dedupe_key = customer_dedupe_key(self.full_name, self.phone_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'full_name', 'phone_number'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'dedupe_key'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Mijoz"
         verbose_name_plural = "Mijozlar"
+        indexes = [
+            # Import mijozlarni shu kalit bo'yicha topadi (dedupe_key__in)
+            models.Index(fields=['dedupe_key'], name='stock_customer_dedupe_idx'),
+        ]
+
+
+# Hali yakunlanmagan (ombor/sotuvchi ishlashi kerak bo'lgan) sotuvlar
+SALE_OPEN_STATUSES = ('yaratildi', 'omborga_yuborildi', 'yigildi', 'bron_qilindi')
 
 
 class Sale(models.Model):
@@ -65,9 +101,15 @@ class Sale(models.Model):
     )
     # --- YANGI QISM TUGADI ---
 
+    OPEN_STATUSES = SALE_OPEN_STATUSES
+
     seller = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Sotuvchi (Menejer)")
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, verbose_name="Mijoz")
+    # Alohida indeks kerak emas: (customer, created_at, id) indeksi uning o'rnini bosadi
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, db_index=False, verbose_name="Mijoz")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Sotuv sanasi")
+    # Qatorlardan hisoblangan qiymatlar (stock/sale_totals.py): hisobotlar qatorlarni qayta yig'maydi
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Jami summa (USDda)")
+    item_count = models.PositiveIntegerField(default=0, verbose_name="Qatorlar soni")
 
     def __str__(self):
         return f"{self.id}-sonli sotuv - {self.customer} ({self.created_at.strftime('%Y-%m-%d')})"
@@ -75,13 +117,27 @@ class Sale(models.Model):
     class Meta:
         verbose_name = "Sotuv (Chek)"
         verbose_name_plural = "Sotuvlar (Cheklar)"
+        # Indekslar ro'yxat tartibi (-created_at, -id) bilan tugaydi: filtr + saralash + keyset sahifalash
+        # bitta indeks bo'ylab, saralashsiz bajariladi.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='stock_sale_created_idx'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='stock_sale_cust_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='stock_sale_status_created_idx'),
+            # Ochiq sotuvlar (?open=true) jami sotuvlarning kichik qismi - qisman (partial) indeks kichik
+            # va tartiblangan. PostgreSQL ishlatadi; SQLite parametrli IN shartida qisman indeksni tanlamaydi.
+            models.Index(
+                fields=['-created_at', '-id'], name='stock_sale_open_created_idx',
+                condition=models.Q(status__in=SALE_OPEN_STATUSES),
+            ),
+        ]
 
 
 class SaleItem(models.Model):
     """
     Bitta sotuv ("chek") ichidagi har bir mahsulotni alohida saqlaydi.
     """
-    sale = models.ForeignKey(Sale, related_name='items', on_delete=models.CASCADE, verbose_name="Tegishli sotuv")
+    # Alohida indeks kerak emas: (sale, product) indeksi uning o'rnini bosadi
+    sale = models.ForeignKey(Sale, related_name='items', on_delete=models.CASCADE, db_index=False, verbose_name="Tegishli sotuv")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Mahsulot")
     quantity = models.PositiveIntegerField(verbose_name="Soni")
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Sotuv narxi (1 dona)")
@@ -92,13 +148,17 @@ class SaleItem(models.Model):
     class Meta:
         verbose_name = "Sotilgan mahsulot"
         verbose_name_plural = "Sotilgan mahsulotlar"
+        indexes = [
+            models.Index(fields=['sale', 'product'], name='stock_saleitem_sale_prod_idx'),
+        ]
 
 
 class Payment(models.Model):
     """
     Mijozlardan kelib tushgan to'lovlarni saqlaydi.
     """
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, verbose_name="Mijoz")
+    # Alohida indeks kerak emas: (customer, created_at) indeksi uning o'rnini bosadi
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, db_index=False, verbose_name="Mijoz")
     amount = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="To'lov summasi (USDda)")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="To'lov sanasi")
 
@@ -108,6 +168,11 @@ class Payment(models.Model):
     class Meta:
         verbose_name = "To'lov"
         verbose_name_plural = "To'lovlar"
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='stock_payment_cust_created_idx'),
+            # Ustunli eksportning (created_at, id) keyset bo'laklari uchun (stock/columnar.py)
+            models.Index(fields=['created_at', 'id'], name='stock_payment_created_idx'),
+        ]
 
 
 class GoodsReceipt(models.Model):
@@ -124,6 +189,9 @@ class GoodsReceipt(models.Model):
     class Meta:
         verbose_name = "Yuk kirimi"
         verbose_name_plural = "Yuk kirimlari"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='stock_receipt_created_idx'),
+        ]
 
 
 class ReturnedProduct(models.Model):
@@ -138,7 +206,8 @@ class ReturnedProduct(models.Model):
         (CONDITION_DEFECTIVE, "Brak"),
     ]
 
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, verbose_name="Mijoz")
+    # Alohida indeks kerak emas: (customer, returned_at, id) indeksi uning o'rnini bosadi
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, db_index=False, verbose_name="Mijoz")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Mahsulot")
     quantity = models.PositiveIntegerField(verbose_name="Soni")
     condition = models.CharField(max_length=16, choices=CONDITION_CHOICES, verbose_name="Mahsulot holati")
@@ -158,6 +227,271 @@ class ReturnedProduct(models.Model):
         verbose_name = "Qaytarilgan mahsulot"
         verbose_name_plural = "Qaytarilgan mahsulotlar"
         ordering = ['-returned_at', '-id']
+        indexes = [
+            models.Index(fields=['-returned_at', '-id'], name='stock_return_returned_idx'),
+            models.Index(fields=['condition', '-returned_at', '-id'], name='stock_return_cond_returned_idx'),
+            models.Index(fields=['customer', '-returned_at', '-id'], name='stock_return_cust_returned_idx'),
+            models.Index(fields=['created_at', 'id'], name='stock_return_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.customer} -> {self.product} ({self.quantity})"
+
+
+class Job(models.Model):
+    """
+    Uzoq davom etadigan import/eksport vazifasi. So'rov faqat vazifani navbatga qo'yadi,
+    uni `python manage.py run_jobs` ishchisi (worker) fon rejimida bajaradi.
+    """
+    KIND_PRODUCT_IMPORT = 'product_import'
+    KIND_CUSTOMER_IMPORT = 'customer_import'
+    KIND_PRODUCT_EXPORT = 'product_export'
+    KIND_CUSTOMER_EXPORT = 'customer_export'
+    KIND_SALE_EXPORT = 'sale_export'
+    KIND_CHOICES = [
+        (KIND_PRODUCT_IMPORT, "Mahsulotlar importi"),
+        (KIND_CUSTOMER_IMPORT, "Mijozlar importi"),
+        (KIND_PRODUCT_EXPORT, "Mahsulotlar eksporti"),
+        (KIND_CUSTOMER_EXPORT, "Mijozlar eksporti"),
+        (KIND_SALE_EXPORT, "Sotuvlar eksporti"),
+    ]
+    IMPORT_KINDS = {KIND_PRODUCT_IMPORT, KIND_CUSTOMER_IMPORT}
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Navbatda"),
+        (STATUS_RUNNING, "Bajarilmoqda"),
+        (STATUS_SUCCEEDED, "Bajarildi"),
+        (STATUS_FAILED, "Xatolik"),
+    ]
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES, verbose_name="Vazifa turi")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Holati")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parametrlar")
+    input_file = models.FileField(upload_to='jobs/inputs/%Y/%m/', blank=True, verbose_name="Yuklangan fayl")
+    result_file = models.FileField(upload_to='jobs/results/%Y/%m/', blank=True, verbose_name="Natija fayli")
+    result = models.JSONField(null=True, blank=True, verbose_name="Natija")
+    error = models.TextField(blank=True, verbose_name="Xatolik matni")
+    progress = models.PositiveIntegerField(default=0, verbose_name="Bajarilgan qatorlar")
+    total = models.PositiveIntegerField(null=True, blank=True, verbose_name="Jami qatorlar")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Urinishlar soni")
+    worker = models.CharField(max_length=100, blank=True, verbose_name="Ishchi (worker)")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Oxirgi tirik signal")
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="jobs",
+        verbose_name="Yaratgan foydalanuvchi",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan sana")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Boshlangan vaqt")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Tugagan vaqt")
+
+    class Meta:
+        verbose_name = "Fon vazifasi"
+        verbose_name_plural = "Fon vazifalari"
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='stock_job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.get_kind_display()} ({self.get_status_display()})"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Dashboard uchun kunlik yig'ma (rollup) jadval, kaliti - (kun, mijoz, sotuvchi, mahsulot).
+    Sotuv, to'lov va qaytarish yozilganda shu tranzaksiyaning o'zida yangilanadi (stock/rollups.py).
+
+    Qator turlari bir-biri bilan aralashmaydi:
+      - sotuvchi va mahsulot bor: sotilgan summa va miqdor;
+      - sotuvchi bor, mahsulot yo'q: cheklar soni;
+      - sotuvchi yo'q, mahsulot bor: qaytarilgan mahsulotlar;
+      - ikkalasi ham yo'q: to'lovlar.
+    """
+    day = models.DateField(verbose_name="Kun")
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, verbose_name="Mijoz")
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name="Sotuvchi")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name="Mahsulot")
+    sales_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Sotuv summasi")
+    sales_quantity = models.IntegerField(default=0, verbose_name="Sotilgan miqdor")
+    sales_count = models.IntegerField(default=0, verbose_name="Cheklar soni")
+    payments_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="To'lovlar summasi")
+    payments_count = models.IntegerField(default=0, verbose_name="To'lovlar soni")
+    returns_healthy_quantity = models.IntegerField(default=0, verbose_name="Qaytgan sog'lom miqdor")
+    returns_defective_quantity = models.IntegerField(default=0, verbose_name="Qaytgan brak miqdor")
+
+    class Meta:
+        verbose_name = "Kunlik sotuv yig'masi"
+        verbose_name_plural = "Kunlik sotuv yig'malari"
+        indexes = [
+            models.Index(fields=['day', 'customer'], name='stock_rollup_day_cust_idx'),
+            models.Index(fields=['customer', 'day'], name='stock_rollup_cust_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / mijoz #{self.customer_id}"
+
+
+class CustomerLedgerEntry(models.Model):
+    """
+    Mijoz hisobidagi har bir harakat: sotuv - debet, to'lov - kredit.
+    Sotuv yoki to'lov yozilgan tranzaksiyaning o'zida qo'shiladi (stock/ledger.py).
+    """
+    ENTRY_SALE = 'sale'
+    ENTRY_PAYMENT = 'payment'
+    ENTRY_CHOICES = [
+        (ENTRY_SALE, "Sotuv"),
+        (ENTRY_PAYMENT, "To'lov"),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='ledger_entries', verbose_name="Mijoz")
+    entry_type = models.CharField(max_length=16, choices=ENTRY_CHOICES, verbose_name="Turi")
+    sale = models.OneToOneField(Sale, on_delete=models.CASCADE, null=True, blank=True, related_name='ledger_entry', verbose_name="Sotuv")
+    payment = models.OneToOneField(Payment, on_delete=models.CASCADE, null=True, blank=True, related_name='ledger_entry', verbose_name="To'lov")
+    debit = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Debet")
+    credit = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Kredit")
+    created_at = models.DateTimeField(verbose_name="Hujjat sanasi")
+
+    class Meta:
+        verbose_name = "Mijoz hisobi yozuvi"
+        verbose_name_plural = "Mijoz hisobi yozuvlari"
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['customer', 'created_at', 'id'], name='stock_ledger_cust_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} - {self.get_entry_type_display()} ({self.debit - self.credit})"
+
+
+class CustomerBalanceCheckpoint(models.Model):
+    """
+    Mijozning `as_of` vaqtigacha (shu vaqt kirmaydi) bo'lgan qoldig'i. Boshlang'ich qoldiq
+    oxirgi checkpoint va undan keyingi qisqa oraliqdagi yozuvlar yig'indisidan olinadi.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='balance_checkpoints', verbose_name="Mijoz")
+    as_of = models.DateTimeField(verbose_name="Qoldiq sanasi")
+    balance = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Qoldiq")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Hisoblangan vaqt")
+
+    class Meta:
+        verbose_name = "Mijoz qoldig'i (checkpoint)"
+        verbose_name_plural = "Mijoz qoldiqlari (checkpoint)"
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'as_of'], name='stock_checkpoint_cust_asof_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} @ {self.as_of:%Y-%m-%d}: {self.balance}"
+
+
+class Notification(models.Model):
+    """
+    Yuborilishi kerak bo'lgan e-mail xabari (outbox). So'rov faqat shu jadvalga qator yozadi
+    (o'z tranzaksiyasi ichida), xatni `python manage.py dispatch_notifications` ishchisi yuboradi.
+    `audience` (guruh nomi) bilan yozilgan qator yuborishdan oldin guruh a'zolari bo'yicha
+    alohida `recipient` qatorlariga ajratiladi.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Navbatda"),
+        (STATUS_SENT, "Yuborildi"),
+        (STATUS_FAILED, "Xatolik"),
+    ]
+
+    audience = models.CharField(max_length=150, blank=True, verbose_name="Guruh")
+    recipient = models.EmailField(blank=True, verbose_name="Qabul qiluvchi")
+    subject = models.CharField(max_length=255, verbose_name="Mavzu")
+    body = models.TextField(verbose_name="Matn")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Holati")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Urinishlar soni")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Keyingi urinish")
+    last_error = models.TextField(blank=True, verbose_name="Oxirgi xatolik")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan sana")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Yuborilgan vaqt")
+
+    class Meta:
+        verbose_name = "Bildirishnoma"
+        verbose_name_plural = "Bildirishnomalar"
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='stock_notif_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient or self.audience}: {self.subject}"
+
+
+class StockMovement(models.Model):
+    """
+    Ombor qoldig'ining har bir o'zgarishi (faqat qo'shiladi, o'zgartirilmaydi/o'chirilmaydi).
+    `Product.quantity_healthy`/`quantity_defective` - shu yozuvlar yig'indisining keshi.
+    Hujjat (sotuv, kirim, qaytarish) FK emas, tur + id ko'rinishida saqlanadi - hujjat
+    o'chirilsa ham harakat tarixi qoladi.
+    """
+    TYPE_OPENING = 'opening'
+    TYPE_RECEIPT = 'receipt'
+    TYPE_SALE = 'sale'
+    TYPE_RETURN = 'return'
+    TYPE_TRANSFER = 'transfer'
+    TYPE_IMPORT = 'import'
+    TYPE_ADJUSTMENT = 'adjustment'
+    TYPE_CHOICES = [
+        (TYPE_OPENING, "Boshlang'ich qoldiq"),
+        (TYPE_RECEIPT, "Kirim"),
+        (TYPE_SALE, "Sotuv"),
+        (TYPE_RETURN, "Qaytarish"),
+        (TYPE_TRANSFER, "Holat o'zgarishi"),
+        (TYPE_IMPORT, "Import"),
+        (TYPE_ADJUSTMENT, "Qo'lda tuzatish"),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False, related_name='movements', verbose_name="Mahsulot")
+    movement_type = models.CharField(max_length=16, choices=TYPE_CHOICES, verbose_name="Harakat turi")
+    condition = models.CharField(max_length=16, choices=ReturnedProduct.CONDITION_CHOICES, verbose_name="Holati")
+    delta = models.IntegerField(verbose_name="O'zgarish (dona)")
+    document_type = models.CharField(max_length=16, blank=True, verbose_name="Hujjat turi")
+    document_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Hujjat raqami")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Sana")
+
+    class Meta:
+        verbose_name = "Ombor harakati"
+        verbose_name_plural = "Ombor harakatlari"
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='stock_move_prod_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} {self.get_movement_type_display()}: {self.delta:+d} ({self.condition})"
+
+
+class StockSnapshot(models.Model):
+    """
+    Mahsulotning `as_of` vaqtigacha (shu vaqt kirmaydi) bo'lgan qoldig'i. Istalgan paytdagi qoldiq
+    oxirgi snapshot va undan keyingi qisqa oraliqdagi harakatlar yig'indisidan olinadi.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots', verbose_name="Mahsulot")
+    as_of = models.DateTimeField(verbose_name="Qoldiq sanasi")
+    quantity_healthy = models.IntegerField(verbose_name="Sog'lom qoldiq")
+    quantity_defective = models.IntegerField(verbose_name="Brak qoldiq")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Hisoblangan vaqt")
+
+    class Meta:
+        verbose_name = "Qoldiq snapshot'i"
+        verbose_name_plural = "Qoldiq snapshot'lari"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'as_of'], name='stock_snapshot_prod_asof_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} @ {self.as_of:%Y-%m-%d}: {self.quantity_healthy}/{self.quantity_defective}"
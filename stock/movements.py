@@ -0,0 +1,191 @@
+"""
+Ombor harakatlari (StockMovement) va qoldiq snapshot'lari.
+
+Qoldiqni o'zgartiradigan har bir joy (sotuv, kirim, qaytarish, holat o'zgarishi, import,
+qo'lda tahrirlash) `Product` hisoblagichini o'zgartirish bilan bir tranzaksiyada harakat yozuvini
+ham qo'shadi. Istalgan paytdagi qoldiq oxirgi `StockSnapshot` va undan keyingi harakatlar
+yig'indisidan tiklanadi; `stock_ledger --verify` esa butun katalog bo'yicha harakatlar
+yig'indisini `Product` hisoblagichlari bilan solishtiradi.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.utils import timezone
+
+from .models import Product, ReturnedProduct, StockMovement, StockSnapshot
+from .rollups import insert_from_select
+
+STOCK_CHUNK_SIZE = 2000
+
+HEALTHY = ReturnedProduct.CONDITION_HEALTHY
+DEFECTIVE = ReturnedProduct.CONDITION_DEFECTIVE
+QUANTITY_FIELDS = {HEALTHY: 'quantity_healthy', DEFECTIVE: 'quantity_defective'}
+
+
+def movement(product_id, movement_type, condition, delta, document_type='', document_id=None):
+    return StockMovement(
+        product_id=product_id, movement_type=movement_type, condition=condition, delta=delta,
+        document_type=document_type, document_id=document_id,
+    )
+
+
+def record_movements(movements):
+    """ Nol bo'lmagan harakatlarni bitta INSERT bilan yozadi. """
+    return StockMovement.objects.bulk_create([item for item in movements if item.delta])
+
+
+def change_stock(product_id, condition, delta, movement_type, document_type='', document_id=None):
+    """
+    Qoldiqni shartli UPDATE bilan o'zgartiradi va harakatni yozadi. Kamaytirishda qoldiq yetmasa,
+    hech narsa o'zgarmaydi va False qaytadi - qoldiq hech qachon manfiy bo'lmaydi.
+    """
+    field_name = QUANTITY_FIELDS[condition]
+    products = Product.objects.filter(pk=product_id)
+    if delta < 0:
+        products = products.filter(**{f'{field_name}__gte': -delta})
+    if not products.update(**{field_name: F(field_name) + delta}):
+        return False
+    record_movements([movement(product_id, movement_type, condition, delta, document_type, document_id)])
+    return True
+
+
+def transfer_stock(product_id, from_condition, to_condition, quantity):
+    """ Mahsulotni bir holatdan boshqasiga o'tkazadi (masalan, sog'lomdan brakka). """
+    from_field, to_field = QUANTITY_FIELDS[from_condition], QUANTITY_FIELDS[to_condition]
+    updated = Product.objects.filter(pk=product_id, **{f'{from_field}__gte': quantity}).update(
+        **{from_field: F(from_field) - quantity, to_field: F(to_field) + quantity}
+    )
+    if not updated:
+        return False
+    record_movements([
+        movement(product_id, StockMovement.TYPE_TRANSFER, from_condition, -quantity),
+        movement(product_id, StockMovement.TYPE_TRANSFER, to_condition, quantity),
+    ])
+    return True
+
+
+def quantity_change_movements(product, old_healthy, old_defective, movement_type):
+    """ Hisoblagichlar to'g'ridan-to'g'ri yozilganda (import, tahrirlash) farqni harakatga aylantiradi. """
+    return [
+        movement(product.pk, movement_type, HEALTHY, product.quantity_healthy - old_healthy),
+        movement(product.pk, movement_type, DEFECTIVE, product.quantity_defective - old_defective),
+    ]
+
+
+def open_balances(products=None):
+    """
+    Tanlangan mahsulotlarning joriy hisoblagichlarini "boshlang'ich qoldiq" harakati sifatida
+    yozadi (INSERT ... SELECT). Harakatlar tarixi bo'lmagan mahsulotlar uchun ishlatiladi.
+    """
+    products = Product.objects.all() if products is None else products
+    now = timezone.now()
+    opts = StockMovement._meta
+    columns = ('product', 'movement_type', 'condition', 'delta', 'document_type', 'document_id', 'created_at')
+    written = 0
+    for condition, field_name in QUANTITY_FIELDS.items():
+        queryset = products.filter(**{f'{field_name}__gt': 0}).values(
+            m_product=F('id'),
+            m_type=Value(StockMovement.TYPE_OPENING, output_field=opts.get_field('movement_type')),
+            m_condition=Value(condition, output_field=opts.get_field('condition')),
+            m_delta=F(field_name),
+            m_document_type=Value('', output_field=opts.get_field('document_type')),
+            m_document_id=Value(None, output_field=opts.get_field('document_id')),
+            m_created=Value(now, output_field=opts.get_field('created_at')),
+        ).order_by()
+        written += insert_from_select(StockMovement, columns, queryset)
+    return written
+
+
+# --- Qoldiqni tiklash --- #
+
+def stock_levels(product_ids, at=None):
+    """
+    Mahsulotlarning harakatlar bo'yicha qoldig'i: {id: (sog'lom, brak)}. `at` berilsa - shu
+    paytgacha (u kirmaydi), aks holda hozirgi. Ikki so'rov: oxirgi snapshot'lar va ulardan
+    keyingi harakatlar yig'indisi.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    latest = StockSnapshot.objects.filter(product=OuterRef('product'))
+    if at is not None:
+        latest = latest.filter(as_of__lte=at)
+    snapshots = {
+        snapshot.product_id: snapshot
+        for snapshot in StockSnapshot.objects.filter(
+            product_id__in=product_ids, id=Subquery(latest.order_by('-as_of').values('id')[:1])
+        )
+    }
+
+    levels, since = {}, defaultdict(list)
+    for product_id in product_ids:
+        snapshot = snapshots.get(product_id)
+        if snapshot is None:
+            levels[product_id] = [0, 0]
+            since[None].append(product_id)
+        else:
+            levels[product_id] = [snapshot.quantity_healthy, snapshot.quantity_defective]
+            since[snapshot.as_of].append(product_id)
+
+    # Snapshot'lar odatda bir vaqtda olinadi - shart bir nechta (mahsulotlar, vaqt) bo'lagidan iborat
+    condition = Q()
+    for as_of, ids in since.items():
+        condition |= Q(product_id__in=ids, created_at__gte=as_of) if as_of else Q(product_id__in=ids)
+    movements = StockMovement.objects.filter(condition)
+    if at is not None:
+        movements = movements.filter(created_at__lt=at)
+    totals = movements.values('product_id', 'condition').annotate(total=Sum('delta')).order_by()
+    for row in totals:
+        levels[row['product_id']][0 if row['condition'] == HEALTHY else 1] += row['total']
+    return {product_id: tuple(values) for product_id, values in levels.items()}
+
+
+def product_chunks(chunk_size=STOCK_CHUNK_SIZE):
+    """ Katalogni id bo'yicha keyset usulida bo'laklab o'qiydi: [(id, sog'lom, brak), ...]. """
+    last_id = 0
+    while True:
+        chunk = list(
+            Product.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'quantity_healthy', 'quantity_defective')[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1][0]
+
+
+def create_snapshots(as_of, chunk_size=STOCK_CHUNK_SIZE):
+    """ Har bir mahsulot uchun `as_of` holatidagi qoldiqni saqlaydi (bo'lak uchun 2 o'qish + 2 yozish). """
+    created = 0
+    for chunk in product_chunks(chunk_size):
+        levels = stock_levels([row[0] for row in chunk], at=as_of)
+        created += _save_snapshots([
+            StockSnapshot(product_id=product_id, as_of=as_of, quantity_healthy=healthy, quantity_defective=defective)
+            for product_id, (healthy, defective) in levels.items()
+        ], as_of)
+    return created
+
+
+@transaction.atomic
+def _save_snapshots(batch, as_of):
+    StockSnapshot.objects.filter(as_of=as_of, product_id__in=[snapshot.product_id for snapshot in batch]).delete()
+    StockSnapshot.objects.bulk_create(batch)
+    return len(batch)
+
+
+def verify_stock(chunk_size=STOCK_CHUNK_SIZE, progress=None):
+    """
+    Harakatlar yig'indisini `Product` hisoblagichlari bilan solishtiradi. Natija: tekshirilgan
+    mahsulotlar soni va farqlar ro'yxati [(id, hisoblagich, harakatlar bo'yicha), ...].
+    """
+    checked, mismatches = 0, []
+    for chunk in product_chunks(chunk_size):
+        levels = stock_levels([row[0] for row in chunk])
+        for product_id, healthy, defective in chunk:
+            if levels[product_id] != (healthy, defective):
+                mismatches.append((product_id, (healthy, defective), levels[product_id]))
+        checked += len(chunk)
+        if progress:
+            progress(checked, len(mismatches))
+    return checked, mismatches
@@ -0,0 +1,176 @@
+"""
+E-mail bildirishnomalari uchun outbox.
+
+API so'rovi xatni o'zi yubormaydi: `queue_group_notification` faqat `Notification` qatorini
+(hujjat o'zgarishi bilan bitta tranzaksiyada) yozadi. `dispatch_notifications` buyrug'i esa
+navbatdagi xatlarni oladi, bir qabul qiluvchiga tegishlilarini bitta xatga jamlab yuboradi,
+muvaffaqiyatsiz bo'lsa, kutish vaqtini ikki baravardan oshirib (exponential backoff) qayta uradi.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification
+
+# `--backend` uchun qisqa nomlar; boshqa qiymat to'liq yo'l (dotted path) deb olinadi
+EMAIL_BACKENDS = {
+    'smtp': 'django.core.mail.backends.smtp.EmailBackend',
+    'console': 'django.core.mail.backends.console.EmailBackend',
+    'file': 'django.core.mail.backends.filebased.EmailBackend',
+    'locmem': 'django.core.mail.backends.locmem.EmailBackend',
+}
+
+
+def queue_group_notification(group_name, subject, body):
+    """ Guruh a'zolariga xat navbatga qo'yiladi; a'zolar ro'yxati yuborish paytida olinadi. """
+    return Notification.objects.create(audience=group_name, subject=subject, body=body)
+
+
+def email_connection(backend=None, **kwargs):
+    """ `backend` - EMAIL_BACKENDS dagi qisqa nom, to'liq yo'l yoki None (settings.EMAIL_BACKEND). """
+    return get_connection(EMAIL_BACKENDS.get(backend, backend), **kwargs)
+
+
+# --- Navbatni boshqarish --- #
+
+def expand_audiences(limit=None):
+    """
+    Guruhga yozilgan qatorlarni har bir a'zo uchun alohida qatorga ajratadi (guruh uchun
+    bitta so'rov). Email'i bor a'zo topilmasa, qator xatolik bilan yopiladi.
+    """
+    limit = limit or settings.NOTIFICATIONS_BATCH_SIZE
+    with transaction.atomic():
+        rows = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status=Notification.STATUS_PENDING, recipient='')
+            .exclude(audience='')
+            .order_by('id')[:limit]
+        )
+        emails = {
+            audience: sorted(set(
+                User.objects.filter(groups__name=audience, is_active=True)
+                .exclude(email='').values_list('email', flat=True)
+            ))
+            for audience in {row.audience for row in rows}
+        }
+
+        expanded, orphaned = [], []
+        for row in rows:
+            if emails[row.audience]:
+                expanded.extend(
+                    Notification(audience=row.audience, recipient=email, subject=row.subject, body=row.body)
+                    for email in emails[row.audience]
+                )
+            else:
+                orphaned.append(row.id)
+
+        Notification.objects.bulk_create(expanded)
+        Notification.objects.filter(id__in=orphaned).update(
+            status=Notification.STATUS_FAILED, last_error="Guruhda email manzili bor foydalanuvchi topilmadi."
+        )
+        Notification.objects.filter(id__in=[row.id for row in rows if row.id not in orphaned]).delete()
+    return len(expanded)
+
+
+def claim_notifications(limit=None, lease_seconds=None):
+    """
+    Vaqti kelgan `limit` ta xatni oladi. Ularning keyingi urinish vaqti lease muddatiga
+    suriladi - boshqa ishchi ularni olmaydi, bu ishchi o'chib qolsa esa lease'dan keyin qayta yuboriladi.
+    """
+    limit = limit or settings.NOTIFICATIONS_BATCH_SIZE
+    lease_seconds = lease_seconds or settings.NOTIFICATIONS_LEASE_SECONDS
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status=Notification.STATUS_PENDING, next_attempt_at__lte=now)
+            .exclude(recipient='')
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        Notification.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + timedelta(seconds=lease_seconds)
+        )
+    return list(Notification.objects.filter(id__in=ids).order_by('id'))
+
+
+def retry_delay(attempts, base_seconds=None):
+    """ 1-urinishdan keyin `base`, keyin 2x, 4x, ... (ko'pi bilan 64x). """
+    base_seconds = base_seconds or settings.NOTIFICATIONS_RETRY_SECONDS
+    return timedelta(seconds=base_seconds * 2 ** min(max(attempts - 1, 0), 6))
+
+
+def build_message(recipient, rows):
+    """ Bitta qabul qiluvchiga yig'ilgan xatlar bitta xatga jamlanadi. """
+    if len(rows) == 1:
+        return EmailMessage(rows[0].subject, rows[0].body, None, [recipient])
+    body = "\n\n----------\n\n".join(f"{row.subject}\n\n{row.body}" for row in rows)
+    return EmailMessage(f"{len(rows)} ta yangi bildirishnoma", body, None, [recipient])
+
+
+def mark_sent(rows):
+    Notification.objects.filter(id__in=[row.id for row in rows]).update(
+        status=Notification.STATUS_SENT, sent_at=timezone.now(), last_error=''
+    )
+
+
+def mark_failed(rows, error, max_attempts=None):
+    """ Urinishlar tugagan xatlar `failed`, qolganlari keyinroq qayta yuboriladi. """
+    max_attempts = max_attempts or settings.NOTIFICATIONS_MAX_ATTEMPTS
+    now = timezone.now()
+    for row in rows:
+        row.last_error = str(error)
+        if row.attempts >= max_attempts:
+            row.status = Notification.STATUS_FAILED
+        else:
+            row.next_attempt_at = now + retry_delay(row.attempts)
+    Notification.objects.bulk_update(rows, ['status', 'next_attempt_at', 'last_error'])
+    return sum(row.status == Notification.STATUS_FAILED for row in rows)
+
+
+def dispatch_notifications(connection=None, batch_size=None):
+    """
+    Bitta partiyani yuboradi: guruhlarni ajratadi, vaqti kelgan xatlarni oladi va har bir
+    qabul qiluvchiga bitta xat jo'natadi. Natija - hisob-kitob lug'ati.
+    """
+    expand_audiences(batch_size)
+    rows = claim_notifications(batch_size)
+    result = {'claimed': len(rows), 'emails': 0, 'sent': 0, 'retry': 0, 'failed': 0}
+    if not rows:
+        return result
+
+    by_recipient = defaultdict(list)
+    for row in rows:
+        by_recipient[row.recipient].append(row)
+
+    connection = connection or email_connection()
+    try:
+        connection.open()
+    except Exception as exc:  # masalan, SMTP server ishlamayapti
+        failed = mark_failed(rows, exc)
+        result.update(failed=failed, retry=len(rows) - failed)
+        return result
+
+    try:
+        for recipient, recipient_rows in by_recipient.items():
+            message = build_message(recipient, recipient_rows)
+            message.connection = connection
+            try:
+                message.send()
+            except Exception as exc:
+                failed = mark_failed(recipient_rows, exc)
+                result['failed'] += failed
+                result['retry'] += len(recipient_rows) - failed
+                continue
+            mark_sent(recipient_rows)
+            result['emails'] += 1
+            result['sent'] += len(recipient_rows)
+    finally:
+        connection.close()
+    return result
@@ -0,0 +1,148 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    `ordering` maydonlari (masalan `(created_at, id)`) bo'yicha "keyset" (cursor) sahifalash.
+
+    OFFSET ishlatilmaydi: keyingi sahifa oldingi sahifaning oxirgi qatori qiymatlaridan
+    keyin keladigan qatorlar sifatida WHERE orqali olinadi, shuning uchun chuqur sahifalarda
+    ham tezlik o'zgarmaydi. Umumiy COUNT(*) so'rovi bajarilmaydi.
+
+    Mijoz `?page_size=` orqali sahifa hajmini tanlashi mumkin, u `max_page_size` bilan cheklanadi.
+    Oxirgi maydon yagona (unique) bo'lishi kerak - odatda `id`.
+    """
+    ordering = ('id',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = "Cursor noto'g'ri."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request, queryset.model)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+
+        # Bitta ortiqcha qator keyingi sahifa bor-yo'qligini COUNT'siz bilish uchun olinadi
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        self.next_position = None
+        if self.has_next:
+            last = results[-1]
+            self.next_position = [self._position_value(getattr(last, name)) for name in self.field_names]
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    @property
+    def field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                requested = int(request.query_params[self.page_size_query_param])
+            except (KeyError, ValueError):
+                return self.page_size
+            if requested > 0:
+                return min(requested, self.max_page_size)
+        return self.page_size
+
+    def get_keyset_filter(self, position):
+        """
+        (a, b) > (x, y) shartini indeks ishlata oladigan ko'rinishda quradi:
+        a > x OR (a = x AND b > y). Kamayish tartibidagi maydonlar uchun `<` ishlatiladi.
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{name}__{lookup}': position[index]})
+            for previous_name, previous_value in zip(self.field_names[:index], position[:index]):
+                clause &= Q(**{previous_name: previous_value})
+            condition |= clause
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Qiymatlar ORM filtriga tushishidan oldin maydon turiga keltiriladi - tahrirlangan cursor 500 bermasin
+        try:
+            position = [
+                model._meta.get_field(name).to_python(value) for name, value in zip(self.field_names, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _position_value(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+
+
+class IdCursorPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class SaleCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class ReturnedProductCursorPagination(KeysetPagination):
+    ordering = ('-returned_at', '-id')
+
+
+class JobCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,190 @@
+"""
+Bank ko'chirmasidan (CSV/XLSX) to'lovlarni ommaviy import qilish.
+
+Fayl pandas bilan o'qiladi, summa va mijoz ustunlari butun ustun bo'yicha (vektorli) tekshiriladi:
+summalar tiyinlarda (int64) hisoblanadi, har bir mijoz uchun fayl tartibidagi yig'indi (cumsum)
+uning qarzi bilan solishtiriladi. Qabul qilingan to'lovlar, qarz kamayishi, kunlik yig'ma va
+mijoz hisobi yozuvlari satrlar soniga bog'liq bo'lmagan miqdordagi so'rovlar bilan, bitta
+tranzaksiyada yoziladi. Rad etilgan qatorlar uchun fayldagi qator raqami va sabablar qaytadi.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .imports import ImportFileError
+from .ledger import payment_entry
+from .models import Customer, CustomerLedgerEntry, Payment
+from .rollups import apply_rollup_deltas, bulk_increment
+
+AMOUNT_COLUMN = 'amount'
+# Mijoz shu tartibda qidiriladi: qatorda birinchi to'ldirilgan ustun ishlatiladi
+MATCH_COLUMNS = ('customer_id', 'phone_number', 'full_name')
+STATEMENT_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+
+def read_statement(file_obj):
+    """ Ko'chirmani matn ustunlari bilan o'qiydi (telefon raqamlari songa aylanib ketmasligi uchun). """
+    name = (getattr(file_obj, 'name', '') or '').lower()
+    if not name.endswith(STATEMENT_EXTENSIONS):
+        raise ImportFileError("Faqat CSV yoki Excel (.xlsx) fayl qabul qilinadi.")
+    if name.endswith('.csv'):
+        df = pd.read_csv(file_obj, dtype=str, keep_default_na=False, skipinitialspace=True)
+    else:
+        df = pd.read_excel(file_obj, dtype=str).fillna('')
+    df.columns = [str(column).strip().lower() for column in df.columns]
+
+    if AMOUNT_COLUMN not in df.columns:
+        raise ImportFileError(f"Faylda '{AMOUNT_COLUMN}' ustuni topilmadi.")
+    if not any(column in df.columns for column in MATCH_COLUMNS):
+        raise ImportFileError(f"Faylda mijoz ustuni topilmadi ({', '.join(MATCH_COLUMNS)}).")
+    for column in (AMOUNT_COLUMN, *MATCH_COLUMNS):
+        df[column] = df[column].astype(str).str.strip() if column in df.columns else ''
+    # Sarlavha 1-qator, ma'lumotlar 2-qatordan boshlanadi
+    df.index = pd.RangeIndex(2, len(df) + 2)
+    return df
+
+
+def normalize_phone(series):
+    return series.str.replace(r'\D', '', regex=True)
+
+
+def normalize_name(series):
+    return series.str.lower().str.split().str.join(' ')
+
+
+def parse_cents(series):
+    """
+    Summani tiyinlarga aylantiradi ("1 250,50" va "1,250.50" ham qabul qilinadi).
+    Noto'g'ri, musbat bo'lmagan yoki 2 xonadan ko'p kasrli summa NaN bo'ladi.
+    """
+    text = series.str.replace(r'\s', '', regex=True)
+    thousands = text.str.contains(',', regex=False) & text.str.contains('.', regex=False)
+    text = text.where(~thousands, text.str.replace(',', '', regex=False)).str.replace(',', '.', regex=False)
+    amount = pd.to_numeric(text, errors='coerce')
+    cents = (amount * 100).round()
+    valid = (amount > 0) & ((amount * 100 - cents).abs() < 1e-6)
+    return cents.where(valid)
+
+
+def match_customers(df):
+    """
+    Har bir qatorga mijoz id'sini topadi: id bo'yicha bitta so'rov, telefon/ism bo'yicha esa
+    mijozlar jadvalining bitta o'qilishi (ular bazada erkin formatda saqlanadi). Natija -
+    (id'lar seriyasi, {qator: xato}).
+    """
+    errors = {}
+    matched = pd.Series(pd.NA, index=df.index, dtype='Int64')
+
+    ids = pd.to_numeric(df['customer_id'], errors='coerce')
+    ids = ids.where(ids % 1 == 0)
+    by_id = df['customer_id'] != ''
+    for row in df.index[by_id & ids.isna()]:
+        errors[row] = f"Noto'g'ri mijoz id: {df.at[row, 'customer_id']}"
+    wanted = {int(value) for value in ids[by_id].dropna()}
+    existing = set(Customer.objects.filter(pk__in=wanted).values_list('pk', flat=True)) if wanted else set()
+    matched[by_id] = ids[by_id].where(ids[by_id].isin(existing)).astype('Int64')
+
+    phones = normalize_phone(df['phone_number'])
+    names = normalize_name(df['full_name'])
+    by_phone = ~by_id & (phones != '')
+    by_name = ~by_id & ~by_phone & (names != '')
+    if by_phone.any() or by_name.any():
+        phone_index, name_index = defaultdict(set), defaultdict(set)
+        for pk, phone, full_name in Customer.objects.values_list('pk', 'phone_number', 'full_name').iterator():
+            phone_index[''.join(filter(str.isdigit, phone))].add(pk)
+            name_index[' '.join(full_name.lower().split())].add(pk)
+        for mask, keys, index, label in (
+            (by_phone, phones, phone_index, 'telefon'), (by_name, names, name_index, 'ism'),
+        ):
+            for row in df.index[mask]:
+                candidates = index.get(keys[row], ())
+                if len(candidates) == 1:
+                    matched[row] = next(iter(candidates))
+                elif candidates:
+                    errors[row] = f"Bu {label} bo'yicha bir nechta mijoz topildi."
+
+    for row in df.index[matched.isna()]:
+        if row in errors:
+            continue
+        if by_id[row] or by_phone[row] or by_name[row]:
+            errors[row] = "Mijoz topilmadi."
+        else:
+            errors[row] = "Mijoz ko'rsatilmagan."
+    return matched, errors
+
+
+def import_payments(file_obj, dry_run=False):
+    """
+    Ko'chirmani tekshiradi va (dry_run bo'lmasa) qabul qilingan qatorlarni saqlaydi.
+    Natija: {'rows', 'created', 'rejected', 'total_amount', 'errors': [{'row', 'errors'}, ...]}.
+    """
+    df = read_statement(file_obj)
+    errors = defaultdict(list)
+
+    cents = parse_cents(df[AMOUNT_COLUMN])
+    for row in df.index[cents.isna()]:
+        errors[row].append(f"Noto'g'ri summa: '{df.at[row, AMOUNT_COLUMN]}'")
+    customer_ids, match_errors = match_customers(df)
+    for row, message in match_errors.items():
+        errors[row].append(message)
+
+    with transaction.atomic():
+        candidates = df.index[cents.notna() & customer_ids.notna()]
+        locked = Customer.objects.filter(pk__in={int(pk) for pk in customer_ids[candidates]}).order_by('pk')
+        if not dry_run:
+            locked = locked.select_for_update()
+        debts = {pk: int(debt * 100) for pk, debt in locked.values_list('pk', 'debt')}
+
+        # Avval o'zi qarzdan katta summalar chiqariladi (odatda kiritishdagi xato), so'ng qolganlarining
+        # mijoz bo'yicha fayl tartibidagi yig'indisi qarz bilan solishtiriladi: qarzdan oshgan
+        # qatordan boshlab shu mijozning keyingi qatorlari ham rad etiladi
+        lines = pd.DataFrame({'customer': customer_ids[candidates], 'cents': cents[candidates].astype('int64')})
+        debt = lines['customer'].map(debts).astype('int64')
+        running = lines['cents'].where(lines['cents'] > debt)
+        fits = running.isna()
+        running[fits] = lines[fits].groupby('customer')['cents'].cumsum()
+        over = running > debt
+        for row in lines.index[over]:
+            errors[row].append(
+                f"To'lovlar yig'indisi ({Decimal(int(running[row])) / 100:.2f}) mijoz qarzidan "
+                f"({Decimal(int(debt[row])) / 100:.2f}) oshib ketadi."
+            )
+        accepted = lines[~over]
+
+        if not dry_run and not accepted.empty:
+            write_payments(accepted)
+            bump_data_version(Customer)
+
+    return {
+        'rows': len(df),
+        'created': len(accepted),
+        'rejected': len(errors),
+        'total_amount': f"{Decimal(int(accepted['cents'].sum())) / 100:.2f}",
+        'errors': [{'row': int(row), 'errors': messages} for row, messages in sorted(errors.items())],
+    }
+
+
+def write_payments(accepted):
+    """ To'lovlar va ularning ta'sirlari: INSERT, mijozlar uchun bitta UPDATE, yig'ma va hisob yozuvlari. """
+    amounts = [Decimal(int(value)).scaleb(-2) for value in accepted['cents']]
+    payments = Payment.objects.bulk_create([
+        Payment(customer_id=int(customer_id), amount=amount)
+        for customer_id, amount in zip(accepted['customer'], amounts)
+    ])
+
+    debt = defaultdict(int)
+    rollup = defaultdict(lambda: defaultdict(int))
+    for payment in payments:
+        debt[payment.customer_id] -= payment.amount
+        key = (timezone.localdate(payment.created_at), payment.customer_id, None, None)
+        rollup[key]['payments_amount'] += payment.amount
+        rollup[key]['payments_count'] += 1
+
+    bulk_increment(Customer, {customer_id: {'debt': delta} for customer_id, delta in debt.items()})
+    apply_rollup_deltas(rollup)
+    CustomerLedgerEntry.objects.bulk_create([payment_entry(payment) for payment in payments])
+    return payments
@@ -1,5 +1,40 @@
 from rest_framework import permissions
 
+# Access token ichidagi guruhlar claim'i (stock.serializers.RoleTokenObtainPairSerializer qo'shadi)
+GROUPS_CLAIM = 'groups'
+
+
+def group_names(user):
+    """ Foydalanuvchi guruhlari nomlari - token yaratishda bazadan bir marta olinadi. """
+    return sorted(user.groups.values_list('name', flat=True))
+
+
+def user_groups(request):
+    """
+    So'rov egasining guruhlari (frozenset). Avval JWT'dagi `groups` claim'idan olinadi - bazaga
+    murojaat yo'q. Claim bo'lmasa (eski token, sessiya yoki force_authenticate), bitta so'rov bilan
+    olinib, shu so'rov davomida eslab qolinadi.
+    """
+    cached = getattr(request, '_user_groups', None)
+    if cached is not None:
+        return cached
+
+    user = request.user
+    claims = request.auth if hasattr(request.auth, 'get') else None
+    if not user or not user.is_authenticated:
+        groups = frozenset()
+    elif claims is not None and claims.get(GROUPS_CLAIM) is not None:
+        groups = frozenset(claims.get(GROUPS_CLAIM))
+    else:
+        groups = frozenset(group_names(user))
+    request._user_groups = groups
+    return groups
+
+
+def in_group(request, *names):
+    return not user_groups(request).isdisjoint(names)
+
+
 class IsAdminUser(permissions.BasePermission):
     """ Faqat admin (is_staff=True) foydalanuvchilarga ruxsat beradi. """
     def has_permission(self, request, view):
@@ -10,17 +45,17 @@ class IsAdminUser(permissions.BasePermission):
 class IsSotuvchi(permissions.BasePermission):
     """ Foydalanuvchi "Sotuvchilar" guruhiga a'zoligini tekshiradi. """
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Sotuvchilar').exists()
+        return in_group(request, 'Sotuvchilar')
 
 class IsOmborchi(permissions.BasePermission):
     """ Foydalanuvchi "Omborchilar" guruhiga a'zoligini tekshiradi. """
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Omborchilar').exists()
+        return in_group(request, 'Omborchilar')
 
 class IsBuxgalter(permissions.BasePermission):
     """ Foydalanuvchi "Buxgalterlar" guruhiga a'zoligini tekshiradi. """
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Buxgalterlar').exists()
+        return in_group(request, 'Buxgalterlar')
 
 
 class IsProductManager(permissions.BasePermission):
@@ -32,4 +67,4 @@ class IsProductManager(permissions.BasePermission):
             return False
         if user.is_staff:
             return True
-        return user.groups.filter(name__in=['Omborchilar', 'Buxgalterlar']).exists()
+        return in_group(request, 'Omborchilar', 'Buxgalterlar')
@@ -0,0 +1,23 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class FileExportRenderer(BaseRenderer):
+    """
+    Eksport view'lari faylni o'zlari (HttpResponse/StreamingHttpResponse) qaytaradi.
+    Bu renderer faqat DRF `?format=csv` kabi parametrlarni qabul qilishi va
+    xato xabarlarini JSON ko'rinishida qaytarishi uchun kerak.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+class CSVRenderer(FileExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class XLSXRenderer(FileExportRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
@@ -0,0 +1,226 @@
+"""
+Kunlik sotuv yig'masini (DailySalesRollup) yuritish.
+
+Har bir yozuv (sotuv, to'lov, qaytarish) yig'ma qatorlariga "delta" sifatida qo'shiladi:
+o'zgartirishda eski qiymatlar `sign=-1` bilan ayiriladi, yangilari qo'shiladi. Funksiyalar
+chaqiruvchi tranzaksiyasi ichida ishlaydi, shuning uchun yig'ma asosiy jadvallar bilan
+birga saqlanadi yoki birga bekor bo'ladi.
+
+Bir xil kalitli ikki qator paydo bo'lib qolsa ham (parallel yozuvlarda) yig'indilar to'g'ri
+qoladi - dashboard faqat SUM ishlatadi. `rebuild_sales_rollup` buyrug'i jadvalni qayta quradi.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .models import DailySalesRollup, Payment, ReturnedProduct, Sale, SaleItem
+
+ROLLUP_FIELDS = (
+    'sales_amount', 'sales_quantity', 'sales_count', 'payments_amount', 'payments_count',
+    'returns_healthy_quantity', 'returns_defective_quantity',
+)
+ROLLUP_COLUMNS = ('day', 'customer', 'seller', 'product') + ROLLUP_FIELDS
+
+
+def apply_rollup_deltas(deltas):
+    """
+    `deltas` - {(kun, mijoz_id, sotuvchi_id, mahsulot_id): {maydon: delta}}.
+    Mavjud qatorlar bitta so'rov bilan qulflab olinadi, so'ng bulk_increment/bulk_create qilinadi.
+    """
+    deltas = {
+        key: {field: value for field, value in changes.items() if value}
+        for key, changes in deltas.items()
+    }
+    deltas = {key: changes for key, changes in deltas.items() if changes}
+    if not deltas:
+        return
+
+    # Aniq kalitlar bo'yicha katta OR o'rniga (kun, mijoz) bo'yicha olib, kalitni Python'da tekshiramiz:
+    # paket sotuvlarda yuzlab kalit bo'ladi, bu shart esa ularning sonidan qat'i nazar ikki IN'dan iborat
+    days = {key[0] for key in deltas}
+    customer_ids = {key[1] for key in deltas}
+    condition = Q(customer_id__in=[customer_id for customer_id in customer_ids if customer_id is not None])
+    if None in customer_ids:
+        condition |= Q(customer__isnull=True)
+
+    existing = {}
+    for row in DailySalesRollup.objects.select_for_update().filter(condition, day__in=days).order_by('id'):
+        key = (row.day, row.customer_id, row.seller_id, row.product_id)
+        if key in deltas:
+            existing.setdefault(key, row)
+
+    to_create, increments = [], {}
+    for key, changes in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            day, customer_id, seller_id, product_id = key
+            to_create.append(DailySalesRollup(
+                day=day, customer_id=customer_id, seller_id=seller_id, product_id=product_id, **changes
+            ))
+            continue
+        increments[row.pk] = changes
+
+    bulk_increment(DailySalesRollup, increments)
+    if to_create:
+        DailySalesRollup.objects.bulk_create(to_create)
+
+
+def sale_deltas(sale, items, sign=1, count_sale=True):
+    day = timezone.localdate(sale.created_at)
+    deltas = defaultdict(lambda: defaultdict(int))
+    for item in items:
+        key = (day, sale.customer_id, sale.seller_id, item.product_id)
+        deltas[key]['sales_amount'] += sign * item.quantity * item.price
+        deltas[key]['sales_quantity'] += sign * item.quantity
+    if count_sale:
+        deltas[(day, sale.customer_id, sale.seller_id, None)]['sales_count'] += sign
+    return deltas
+
+
+def record_sale(sale, items, sign=1, count_sale=True):
+    """ Sotuv (yoki uning ayrim qatorlari, `count_sale=False`) ta'sirini yig'maga qo'shadi/ayiradi. """
+    apply_rollup_deltas(sale_deltas(sale, items, sign=sign, count_sale=count_sale))
+
+
+def record_payment(payment, sign=1):
+    key = (timezone.localdate(payment.created_at), payment.customer_id, None, None)
+    apply_rollup_deltas({key: {'payments_amount': sign * payment.amount, 'payments_count': sign}})
+
+
+def record_return(returned_product, sign=1):
+    field = (
+        'returns_healthy_quantity'
+        if returned_product.condition == ReturnedProduct.CONDITION_HEALTHY
+        else 'returns_defective_quantity'
+    )
+    key = (returned_product.returned_at, returned_product.customer_id, None, returned_product.product_id)
+    apply_rollup_deltas({key: {field: sign * int(returned_product.quantity)}})
+
+
+# --- To'liq qayta qurish (backfill) --- #
+
+def insert_from_select(model, columns, queryset):
+    """
+    `INSERT INTO <model> (columns) SELECT ...` - qatorlar Python'ga olib kelinmasdan baza ichida
+    yoziladi. `queryset` ustunlarni aynan `columns` tartibida tanlashi kerak (values(**ifodalar)
+    va undan keyingi annotate'lar qo'shilish tartibida tanlanadi).
+    """
+    select_sql, params = queryset.query.sql_with_params()
+    quote = connection.ops.quote_name
+    column_sql = ', '.join(quote(model._meta.get_field(name).column) for name in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {quote(model._meta.db_table)} ({column_sql}) {select_sql}", params)
+        return cursor.rowcount
+
+
+def bulk_increment(model, increments, batch_size=500):
+    """
+    `increments` - {pk: {maydon: delta}}. Qatorlar `WITH v AS (VALUES ...) UPDATE ... FROM v` bilan
+    bitta so'rovda oshiriladi - bulk_update har bir qator uchun quradigan CASE WHEN ifodalarisiz.
+    PostgreSQL va SQLite (3.33+) qo'llaydi; boshqa bazalarda har bir qator alohida F() bilan yangilanadi.
+    """
+    fields = sorted({field for changes in increments.values() for field in changes})
+    if not fields:
+        return
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        for pk, changes in increments.items():
+            model.objects.filter(pk=pk).update(**{field: F(field) + value for field, value in changes.items()})
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [quote(model._meta.get_field(field).column) for field in fields]
+    aliases = ', '.join(f'd{index}' for index in range(len(fields)))
+    assignments = ', '.join(f'{column} = {table}.{column} + v.d{index}' for index, column in enumerate(columns))
+    rows = list(increments.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            values = ', '.join(['(' + ', '.join(['%s'] * (len(fields) + 1)) + ')'] * len(chunk))
+            params = [value for pk, changes in chunk for value in (pk, *(changes.get(field, 0) for field in fields))]
+            cursor.execute(
+                f"WITH v (k, {aliases}) AS (VALUES {values}) "
+                f"UPDATE {table} SET {assignments} FROM v WHERE {table}.{quote(model._meta.pk.column)} = v.k",
+                params,
+            )
+
+
+def _zero(field_name):
+    return Value(0, output_field=DailySalesRollup._meta.get_field(field_name))
+
+
+def _null(field_name):
+    return Value(None, output_field=DailySalesRollup._meta.get_field(field_name).target_field)
+
+
+def _rollup_querysets(since=None):
+    """ Asosiy jadvallardan yig'ma qatorlarini ROLLUP_COLUMNS tartibida tanlaydigan so'rovlar. """
+    line_total = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+    items = SaleItem.objects.all()
+    sales = Sale.objects.all()
+    payments = Payment.objects.all()
+    returns = ReturnedProduct.objects.all()
+    if since:
+        items = items.filter(sale__created_at__date__gte=since)
+        sales = sales.filter(created_at__date__gte=since)
+        payments = payments.filter(created_at__date__gte=since)
+        returns = returns.filter(returned_at__gte=since)
+
+    yield items.values(
+        r_day=TruncDate('sale__created_at'), r_customer=F('sale__customer_id'),
+        r_seller=F('sale__seller_id'), r_product=F('product_id'),
+    ).annotate(
+        r_sales_amount=Sum(line_total), r_sales_quantity=Sum('quantity'), r_sales_count=_zero('sales_count'),
+        r_payments_amount=_zero('payments_amount'), r_payments_count=_zero('payments_count'),
+        r_healthy=_zero('returns_healthy_quantity'), r_defective=_zero('returns_defective_quantity'),
+    ).order_by()
+
+    yield sales.values(
+        r_day=TruncDate('created_at'), r_customer=F('customer_id'), r_seller=F('seller_id'), r_product=_null('product'),
+    ).annotate(
+        r_sales_amount=_zero('sales_amount'), r_sales_quantity=_zero('sales_quantity'), r_sales_count=Count('id'),
+        r_payments_amount=_zero('payments_amount'), r_payments_count=_zero('payments_count'),
+        r_healthy=_zero('returns_healthy_quantity'), r_defective=_zero('returns_defective_quantity'),
+    ).order_by()
+
+    yield payments.values(
+        r_day=TruncDate('created_at'), r_customer=F('customer_id'), r_seller=_null('seller'), r_product=_null('product'),
+    ).annotate(
+        r_sales_amount=_zero('sales_amount'), r_sales_quantity=_zero('sales_quantity'), r_sales_count=_zero('sales_count'),
+        r_payments_amount=Sum('amount'), r_payments_count=Count('id'),
+        r_healthy=_zero('returns_healthy_quantity'), r_defective=_zero('returns_defective_quantity'),
+    ).order_by()
+
+    yield returns.values(
+        r_day=F('returned_at'), r_customer=F('customer_id'), r_seller=_null('seller'), r_product=F('product_id'),
+    ).annotate(
+        r_sales_amount=_zero('sales_amount'), r_sales_quantity=_zero('sales_quantity'), r_sales_count=_zero('sales_count'),
+        r_payments_amount=_zero('payments_amount'), r_payments_count=_zero('payments_count'),
+        r_healthy=Sum('quantity', filter=Q(condition=ReturnedProduct.CONDITION_HEALTHY), default=0),
+        r_defective=Sum('quantity', filter=Q(condition=ReturnedProduct.CONDITION_DEFECTIVE), default=0),
+    ).order_by()
+
+
+@transaction.atomic
+def rebuild_rollup(since=None):
+    """
+    Yig'mani (yoki `since` kunidan boshlab qismini) asosiy jadvallardan qaytadan quradi.
+    Agregatsiya va yozish bitta INSERT ... SELECT bilan baza ichida bajariladi.
+    """
+    existing = DailySalesRollup.objects.all()
+    if since:
+        existing = existing.filter(day__gte=since)
+    existing.delete()
+
+    created = sum(
+        insert_from_select(DailySalesRollup, ROLLUP_COLUMNS, queryset)
+        for queryset in _rollup_querysets(since)
+    )
+    # Dashboard keshidagi qayta qurishdan oldingi natijalar ishlatilmasin
+    bump_data_version()
+    return created
@@ -0,0 +1,133 @@
+"""
+Sotuvlarni paket bo'lib yaratish (offline terminallar buferini bitta so'rovda yuborish uchun).
+
+Paketdagi barcha mahsulot va mijozlar bitta so'rov bilan (id tartibida) qulflanadi, sotuvlar
+navbat bilan xotirada tekshiriladi (har bir sotuv oldingilaridan qolgan qoldiqni ko'radi),
+so'ng qabul qilinganlari `bulk_create` bilan yoziladi. Qoldiq, qarz, kunlik yig'ma, mijoz
+hisobi va ombor harakatlari sotuvlar soniga bog'liq bo'lmagan miqdordagi so'rovlar bilan yangilanadi.
+Yaroqsiz sotuv rad etiladi, qolganlari saqlanadi - javobda har bir sotuv uchun natija bor.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .cache import bump_data_version
+from .ledger import sale_entry
+from .models import Customer, CustomerLedgerEntry, Product, ReturnedProduct, Sale, SaleItem, StockMovement
+from .movements import movement, record_movements
+from .rollups import apply_rollup_deltas, bulk_increment, sale_deltas
+from .sale_totals import lines_totals
+from .serializers import BatchSaleSerializer
+
+
+def rejected(index, errors):
+    return {'index': index, 'status': 'rejected', 'errors': errors}
+
+
+def merge_deltas(target, deltas):
+    for key, changes in deltas.items():
+        for field, value in changes.items():
+            target[key][field] += value
+
+
+def create_sale_batch(entries, seller):
+    """
+    `entries` - sotuvlar (dict) ro'yxati, `seller` - sotuvchi. Natija har bir sotuv uchun
+    {'index', 'status': 'created', 'id', 'total'} yoki {'index', 'status': 'rejected', 'errors'}.
+    """
+    results = [None] * len(entries)
+    valid = []
+    for index, entry in enumerate(entries):
+        serializer = BatchSaleSerializer(data=entry)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = rejected(index, serializer.errors)
+
+    product_ids = sorted({item['product'] for _, data in valid for item in data['items']})
+    customer_ids = sorted({data['customer'] for _, data in valid})
+
+    with transaction.atomic():
+        # Qulflar yakka sotuvdagi kabi tartibda olinadi: avval mahsulotlar, keyin mijozlar (id bo'yicha)
+        products = {
+            product.pk: product
+            for product in Product.objects.select_for_update().filter(pk__in=product_ids)
+            .only('id', 'name', 'quantity_healthy').order_by('pk')
+        }
+        customers = {
+            customer.pk: customer
+            for customer in Customer.objects.select_for_update().filter(pk__in=customer_ids)
+            .only('id', 'debt').order_by('pk')
+        }
+
+        accepted = []
+        for index, data in valid:
+            needed = defaultdict(int)
+            for item in data['items']:
+                needed[item['product']] += item['quantity']
+            error = check_sale(data, needed, products, customers)
+            if error:
+                results[index] = rejected(index, error)
+                continue
+            for product_id, quantity in needed.items():
+                products[product_id].quantity_healthy -= quantity
+            accepted.append((index, data, needed))
+
+        if accepted:
+            write_sales(accepted, seller, results)
+            bump_data_version(Product, Customer)
+
+    return results
+
+
+def check_sale(data, needed, products, customers):
+    if data['customer'] not in customers:
+        return {'customer': [f"Mijoz #{data['customer']} topilmadi."]}
+    missing = [product_id for product_id in needed if product_id not in products]
+    if missing:
+        return {'items': [f"Mahsulot #{product_id} topilmadi." for product_id in missing]}
+    for product_id in sorted(needed):
+        product = products[product_id]
+        if product.quantity_healthy < needed[product_id]:
+            return {'error': f"'{product.name}' mahsuloti omborda yetarli emas. Qoldiq: {product.quantity_healthy}"}
+    return None
+
+
+def write_sales(accepted, seller, results):
+    """ Qabul qilingan sotuvlar va ularning barcha ta'sirlarini ommaviy yozadi. """
+    sales = []
+    for _, data, _ in accepted:
+        total_amount, item_count = lines_totals(data['items'])
+        sales.append(Sale(customer_id=data['customer'], seller=seller, total_amount=total_amount, item_count=item_count))
+    sales = Sale.objects.bulk_create(sales)
+
+    items = [
+        [
+            SaleItem(sale=sale, product_id=item['product'], quantity=item['quantity'], price=item['price'])
+            for item in data['items']
+        ]
+        for sale, (_, data, _) in zip(sales, accepted)
+    ]
+    SaleItem.objects.bulk_create([item for sale_items in items for item in sale_items])
+
+    rollup = defaultdict(lambda: defaultdict(int))
+    stock, debt = defaultdict(int), defaultdict(int)
+    entries, movements = [], []
+    for sale, sale_items, (index, _, needed) in zip(sales, items, accepted):
+        total = sale.total_amount
+        debt[sale.customer_id] += total
+        merge_deltas(rollup, sale_deltas(sale, sale_items))
+        entries.append(sale_entry(sale, total))
+        for product_id, quantity in sorted(needed.items()):
+            stock[product_id] -= quantity
+            movements.append(movement(
+                product_id, StockMovement.TYPE_SALE, ReturnedProduct.CONDITION_HEALTHY, -quantity, 'sale', sale.pk
+            ))
+        results[index] = {'index': index, 'status': 'created', 'id': sale.pk, 'total': str(total)}
+
+    # Yig'ilgan farqlar har bir jadval uchun bitta UPDATE bilan qo'llanadi
+    bulk_increment(Product, {product_id: {'quantity_healthy': delta} for product_id, delta in stock.items()})
+    bulk_increment(Customer, {customer_id: {'debt': delta} for customer_id, delta in debt.items()})
+    apply_rollup_deltas(rollup)
+    CustomerLedgerEntry.objects.bulk_create(entries)
+    record_movements(movements)
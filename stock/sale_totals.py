@@ -0,0 +1,93 @@
+"""
+Sotuvning saqlangan jami summasi (`Sale.total_amount`) va qatorlar soni (`Sale.item_count`).
+
+Sotuv yaratilganda qiymatlar qatorlar bilan birga yoziladi; qatorlar keyin (admin orqali)
+o'zgartirilsa, `refresh_sale_totals` ularni bitta UPDATE bilan qayta hisoblaydi. Hisobotlar
+va mijoz hisobi qatorlarni qayta yig'maydi - shu ustunlarni o'qiydi.
+`sale_totals --backfill/--verify` buyrug'i butun jadvalni id bo'yicha bo'laklab tekshiradi.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Sale, SaleItem
+
+SALE_TOTALS_CHUNK_SIZE = 5000
+
+AMOUNT_FIELD = DecimalField(max_digits=14, decimal_places=2)
+ITEM_TOTAL = ExpressionWrapper(F('quantity') * F('price'), output_field=AMOUNT_FIELD)
+CENT = Decimal('0.01')
+
+
+def lines_totals(lines):
+    """ Yaratilayotgan sotuv qatorlari ({'quantity', 'price', ...} ro'yxati) uchun (jami summa, qatorlar soni). """
+    return sum((line['quantity'] * line['price'] for line in lines), Decimal('0')), len(lines)
+
+
+def _items_subquery(expression, output_field):
+    items = SaleItem.objects.filter(sale=OuterRef('pk')).order_by().values('sale')
+    return Coalesce(Subquery(items.annotate(value=expression).values('value')), Value(0), output_field=output_field)
+
+
+def totals_expressions():
+    """ UPDATE uchun: qiymatlar bazaning o'zida, sotuv qatorlaridan hisoblanadi. """
+    return {
+        'total_amount': _items_subquery(Sum(ITEM_TOTAL), AMOUNT_FIELD),
+        'item_count': _items_subquery(Count('id'), IntegerField()),
+    }
+
+
+def refresh_sale_totals(sale_ids):
+    """ Ko'rsatilgan sotuvlarning qiymatlarini qatorlaridan qayta hisoblaydi (bitta UPDATE). """
+    return Sale.objects.filter(pk__in=list(sale_ids)).update(**totals_expressions())
+
+
+# --- Butun jadval bo'yicha --- #
+
+def sale_chunks(chunk_size=SALE_TOTALS_CHUNK_SIZE):
+    """ Sotuvlarni id bo'yicha keyset usulida bo'laklaydi: [(id, jami summa, qatorlar soni), ...]. """
+    last_id = 0
+    while True:
+        chunk = list(
+            Sale.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'total_amount', 'item_count')[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1][0]
+
+
+def backfill_sale_totals(chunk_size=SALE_TOTALS_CHUNK_SIZE, progress=None):
+    """ Har bir bo'lak alohida tranzaksiyada yangilanadi - uzun qulflar bo'lmaydi. """
+    updated = 0
+    for chunk in sale_chunks(chunk_size):
+        with transaction.atomic():
+            updated += Sale.objects.filter(pk__gte=chunk[0][0], pk__lte=chunk[-1][0]).update(**totals_expressions())
+        if progress:
+            progress(updated)
+    return updated
+
+
+def verify_sale_totals(chunk_size=SALE_TOTALS_CHUNK_SIZE, progress=None):
+    """
+    Saqlangan qiymatlarni qatorlar bilan solishtiradi (bo'lak uchun ikki so'rov). Natija:
+    tekshirilgan sotuvlar soni va farqlar [(id, (saqlangan summa, soni), (qatorlar bo'yicha summa, soni)), ...].
+    """
+    checked, mismatches = 0, []
+    for chunk in sale_chunks(chunk_size):
+        actual = {
+            row['sale']: (Decimal(row['total'] or 0).quantize(CENT), row['count'])
+            for row in SaleItem.objects.filter(sale__gte=chunk[0][0], sale__lte=chunk[-1][0])
+            .values('sale').annotate(total=Sum(ITEM_TOTAL), count=Count('id')).order_by()
+        }
+        for sale_id, total_amount, item_count in chunk:
+            expected = actual.get(sale_id, (Decimal('0.00'), 0))
+            if (Decimal(total_amount).quantize(CENT), item_count) != expected:
+                mismatches.append((sale_id, (total_amount, item_count), expected))
+        checked += len(chunk)
+        if progress:
+            progress(checked, len(mismatches))
+    return checked, mismatches
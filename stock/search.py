@@ -0,0 +1,144 @@
+"""
+Mahsulotlarni nomi, brendi va kategoriyasi bo'yicha qidirish (prefiks va xatoli yozuvga chidamli).
+
+PostgreSQL'da `pg_trgm` kengaytmasi va `lower(name || ' ' || brand || ' ' || category)`
+ifodasidagi GIN trigram indeksi (0016 migratsiyasi) ishlatiladi: `%>` (word similarity) va
+`LIKE '%...%'` shartlari shu indeks orqali bajariladi. Boshqa bazalarda (SQLite) xuddi shu
+hujjatlar uchun xotirada trigram indeksi quriladi; u katalog versiyasi o'zgarganda qayta quriladi.
+
+Tartib ikkala holatda bir xil: nomi so'rov bilan boshlanadiganlar, so'rovni to'liq o'z ichiga
+olganlar, so'ng trigram o'xshashligi bo'yicha.
+"""
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.db import connection
+
+from .cache import get_catalogue_version
+from .models import Product
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+# Xotiradagi indeks uchun eng kichik o'xshashlik (PostgreSQL'da pg_trgm.word_similarity_threshold)
+SEARCH_MIN_SIMILARITY = 0.5
+
+WORD_RE = re.compile(r'\w+')
+# Qidiruv hujjati shu maydonlardan tuziladi - ular o'zgarganda katalog versiyasi ham o'zgaradi
+CATALOGUE_FIELDS = ('name', 'brand', 'category')
+
+
+def normalize_query(query):
+    return ' '.join(str(query or '').lower().split())
+
+
+def catalogue_values(product):
+    return tuple(getattr(product, field) for field in CATALOGUE_FIELDS)
+
+
+def search_products(query, limit=SEARCH_DEFAULT_LIMIT):
+    """ Eng mos `limit` ta mahsulot id'si (tartiblangan). """
+    query = normalize_query(query)
+    if not query:
+        return []
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(query, limit)
+    return product_index().search(query, limit)
+
+
+# --- PostgreSQL --- #
+
+SEARCH_DOCUMENT_SQL = "lower(name || ' ' || brand || ' ' || category)"
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _search_postgresql(query, limit):
+    table = connection.ops.quote_name(Product._meta.db_table)
+    document = SEARCH_DOCUMENT_SQL
+    contains = f'%{_like_escape(query)}%'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id FROM {table} "
+            f"WHERE {document} %%> %s OR {document} LIKE %s "
+            f"ORDER BY lower(name) LIKE %s DESC, {document} LIKE %s DESC, "
+            f"word_similarity(%s, {document}) DESC, name, id "
+            f"LIMIT %s",
+            [query, contains, f'{_like_escape(query)}%', contains, query, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+# --- Xotiradagi indeks (PostgreSQL bo'lmagan bazalar uchun) --- #
+
+def trigrams(text):
+    """ pg_trgm kabi: har bir so'z oldidan ikki, ortidan bitta bo'sh joy bilan 3 harfli bo'laklarga bo'linadi. """
+    result = set()
+    for word in WORD_RE.findall(text):
+        padded = f'  {word} '
+        result.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return result
+
+
+class ProductSearchIndex:
+    """ Trigram -> mahsulotlar teskari indeksi va har bir mahsulotning qidiruv matni. """
+
+    def __init__(self, rows):
+        self.documents = {}
+        self.postings = defaultdict(list)
+        for pk, name, brand, category in rows:
+            name = normalize_query(name)
+            document = normalize_query(f'{name} {brand} {category}')
+            self.documents[pk] = (name, document)
+            for trigram in trigrams(document):
+                self.postings[trigram].append(pk)
+
+    @classmethod
+    def build(cls):
+        return cls(Product.objects.values_list('pk', *CATALOGUE_FIELDS).iterator())
+
+    def search(self, query, limit):
+        query_trigrams = trigrams(query)
+        hits = Counter()
+        for trigram in query_trigrams:
+            hits.update(self.postings.get(trigram, ()))
+
+        scores = {}
+        if query_trigrams:
+            minimum = SEARCH_MIN_SIMILARITY * len(query_trigrams)
+            scores = {pk: count / len(query_trigrams) for pk, count in hits.items() if count >= minimum}
+        # So'z o'rtasidagi bo'laklar o'xshashlik chegarasidan o'tmaydi - ular matn ichidan qidiriladi.
+        # So'rovda kamida 3 harfli so'z bo'lsa, uni o'z ichiga olgan hujjat shu so'zning ichki trigramiga
+        # ega bo'ladi - faqat trigram nomzodlari tekshiriladi. Faqat qisqa so'zlarda hamma hujjatlar ko'riladi
+        if any(len(word) >= 3 for word in WORD_RE.findall(query)):
+            candidates = hits.keys()
+        else:
+            candidates = self.documents.keys()
+        for pk in candidates:
+            if pk not in scores and query in self.documents[pk][1]:
+                scores[pk] = hits.get(pk, 0) / len(query_trigrams) if query_trigrams else 0
+
+        def rank(pk):
+            name, document = self.documents[pk]
+            return (not name.startswith(query), query not in document, -scores[pk], name, pk)
+
+        return sorted(scores, key=rank)[:limit]
+
+
+_index_lock = threading.Lock()
+_index = {'version': None, 'index': None}
+
+
+def product_index():
+    """
+    Katalogning (nom, brend, kategoriya) joriy versiyasi uchun indeks; versiya o'zgargan bo'lsa, qayta
+    quriladi. Sotuv, kirim va qaytarishlar faqat qoldiqni o'zgartiradi - ular indeksni eskirtirmaydi.
+    """
+    version = get_catalogue_version()
+    with _index_lock:
+        if _index['version'] != version:
+            _index['index'] = ProductSearchIndex.build()
+            _index['version'] = version
+        return _index['index']
@@ -0,0 +1,364 @@
+"""
+Sinov va quvvatni baholash uchun katta hajmdagi sun'iy ma'lumot yaratish (`manage.py seed_data`).
+
+Yozuvlar ommaviy yuklanadi: PostgreSQL'da `COPY ... FROM STDIN`, boshqa bazalarda bo'laklangan
+`bulk_create`. Id'lar oldindan ajratiladi (jadvaldagi eng katta id'dan keyin), shuning uchun
+sotuv qatorlari sotuvlarga qo'shimcha so'rovsiz bog'lanadi; oxirida ketma-ketliklar (sequence)
+to'g'rilanadi. Seeding paytida jadvallarga boshqa yozuvchilar bo'lmasligi kerak.
+
+Yakunda ma'lumotlar izchil bo'ladi:
+- `Customer.debt` = sotuvlar summasi - to'lovlar summasi;
+- `Product.quantity_healthy` = kirimlar - sotilgan + sog'lom qaytarishlar,
+  `Product.quantity_defective` = brak qaytarishlar; yakuniy qoldiq ombor harakatlariga
+  "boshlang'ich qoldiq" sifatida yoziladi.
+Kunlik yig'ma va mijoz hisobi (ledger) ham qayta quriladi, so'ng ma'lumot versiyasi o'zgartiriladi
+(dashboard keshi va qidiruv indeksi eskirgan deb belgilanadi).
+"""
+import csv
+import io
+import math
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.models import Group, User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .ledger import rebuild_ledger
+from .models import Customer, GoodsReceipt, Payment, Product, ReturnedProduct, Sale, SaleItem, customer_dedupe_key
+from .movements import open_balances
+from .rollups import rebuild_rollup
+
+SEED_DEFAULTS = {
+    'sales': 100000,
+    'customers': None,             # standart: sotuvlar / 50
+    'products': None,              # standart: sotuvlar / 100 (20..5000)
+    'sellers': 5,
+    'days': 365,                   # tarix uzunligi (bugun bilan tugaydi)
+    'basket_mean': 2.5,            # chekdagi o'rtacha mahsulot turlari soni
+    'max_quantity': 5,             # bitta qatordagi eng ko'p dona
+    'seasonality': 0.3,            # yillik mavsumiylik amplitudasi (0 - tekis)
+    'weekend_factor': 0.6,         # dam olish kunlari savdo ulushi
+    'seller_skew': 1.0,            # sotuvchilar orasidagi notekislik (Zipf darajasi)
+    'product_skew': 1.1,           # mahsulot ommabopligi notekisligi (Zipf darajasi)
+    'payment_ratio': 0.8,          # sotuvlarning o'rtacha qancha qismi to'langan
+    'return_rate': 0.02,           # qaytariladigan sotuv qatorlari ulushi
+    'defect_rate': 0.25,           # qaytarishlardan brak ulushi
+    'receipts_per_product': 4,
+    'leftover_min': 0,             # sotuvlardan keyin omborda qoladigan qoldiq oralig'i
+    'leftover_max': 200,
+    'seed': 42,
+    'chunk_size': 10000,
+    'rebuild_derived': True,
+}
+
+SALE_STATUS_WEIGHTS = {
+    'yuborildi': 70, 'yigildi': 8, 'omborga_yuborildi': 6, 'yaratildi': 6,
+    'bron_qilindi': 3, 'bron_yuborildi': 3, 'bron_bekor_qilindi': 2, 'buyurtma_bekor_qilindi': 2,
+}
+FIRST_NAMES = ['Aziz', 'Bobur', 'Dilshod', 'Jasur', 'Kamola', 'Laylo', 'Nodir', 'Otabek', 'Sardor', 'Zarina']
+LAST_NAMES = ['Karimov', 'Rahimov', 'Tursunov', 'Yusupov', 'Aliyev', 'Saidov', 'Qodirov', 'Ergashev']
+CITIES = ['Toshkent', 'Samarqand', 'Buxoro', 'Andijon', 'Namangan', "Farg'ona", 'Qarshi', 'Nukus']
+BRANDS = ['Artel', 'Akfa', 'Imzo', 'Bekabad', 'Knauf', 'Ceresit', 'Grohe', 'Vitra', 'Kerama', 'Legrand']
+CATEGORIES = ['Eshik', 'Deraza', 'Kafel', 'Profil', 'Bo\'yoq', 'Santexnika', 'Elektr', 'Quruq qorishma']
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """ `auto_now_add` maydonlarini vaqtincha o'chiradi, shunda tarixiy sanalarni yozish mumkin. """
+    fields = [model._meta.get_field('created_at') for model in models]
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+class BulkLoader:
+    """
+    Bitta jadvalga qatorlarni bo'lib-bo'lib yozadi. `fields` - model maydonlarining attname'lari
+    (masalan `sale_id`), qatorlar esa shu tartibdagi tuple'lar.
+    """
+
+    def __init__(self, model, fields, chunk_size):
+        self.model = model
+        self.fields = fields
+        self.chunk_size = chunk_size
+        self.use_copy = connection.vendor == 'postgresql'
+        self.rows = []
+        self.written = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.use_copy:
+            self._copy()
+        else:
+            self.model.objects.bulk_create([self.model(**dict(zip(self.fields, row))) for row in self.rows])
+        self.written += len(self.rows)
+        self.rows = []
+
+    def _copy(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in self.rows:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+
+        quote = connection.ops.quote_name
+        opts = self.model._meta
+        columns = ', '.join(quote(opts.get_field(name).column) for name in self.fields)
+        sql = f"COPY {quote(opts.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        with connection.cursor() as cursor:
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, 'copy_expert'):  # psycopg2
+                raw_cursor.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with raw_cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+
+def _next_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+def _zipf_weights(count, skew):
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+def _money(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def _reset_sequences(models):
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def _sellers(count):
+    group, _ = Group.objects.get_or_create(name='Sotuvchilar')
+    sellers = []
+    for index in range(count):
+        user, created = User.objects.get_or_create(
+            username=f"seed-sotuvchi-{index + 1}",
+            defaults={'first_name': FIRST_NAMES[index % len(FIRST_NAMES)], 'last_name': LAST_NAMES[index % len(LAST_NAMES)]},
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+            user.groups.add(group)
+        sellers.append(user.pk)
+    return sellers
+
+
+def seed_data(progress=None, **options):
+    """
+    Sun'iy tarix yaratadi va qancha yozuv yozilganini qaytaradi. Parametrlar va standart
+    qiymatlar - `SEED_DEFAULTS`. `progress(bosqich, bajarildi, jami)` - ixtiyoriy.
+    """
+    config = {**SEED_DEFAULTS, **{key: value for key, value in options.items() if value is not None}}
+    progress = progress or (lambda stage, done, total: None)
+    rng = random.Random(config['seed'])
+    sales_total = config['sales']
+    customer_count = config['customers'] or max(10, sales_total // 50)
+    product_count = config['products'] or min(max(20, sales_total // 100), 5000)
+    chunk_size = config['chunk_size']
+    days = config['days']
+
+    today = timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+    now = timezone.now()
+
+    def moment(day_offset):
+        day = first_day + timedelta(days=day_offset)
+        start = timezone.make_aware(datetime.combine(day, time(9)))
+        return min(start + timedelta(seconds=rng.randrange(10 * 60 * 60)), now)  # ish vaqti 9:00-19:00
+
+    day_weights = list(accumulate(
+        (1 + config['seasonality'] * math.sin(2 * math.pi * (first_day + timedelta(days=offset)).timetuple().tm_yday / 365.25))
+        * (config['weekend_factor'] if (first_day + timedelta(days=offset)).weekday() >= 5 else 1)
+        for offset in range(days)
+    ))
+    day_offsets = range(days)
+    status_values = list(SALE_STATUS_WEIGHTS)
+    status_weights = list(accumulate(SALE_STATUS_WEIGHTS.values()))
+
+    counts = {}
+    with transaction.atomic(), explicit_timestamps(Sale, Payment, GoodsReceipt, ReturnedProduct):
+        seller_ids = _sellers(config['sellers'])
+        seller_weights = _zipf_weights(len(seller_ids), config['seller_skew'])
+
+        # --- Mijozlar va mahsulotlar ---
+        customer_start = _next_id(Customer)
+        customer_ids = list(range(customer_start, customer_start + customer_count))
+        loader = BulkLoader(Customer, ['id', 'full_name', 'phone_number', 'address', 'debt', 'dedupe_key'], chunk_size)
+        for customer_id in customer_ids:
+            full_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {customer_id}"
+            phone_number = f"+99890{customer_id % 10 ** 7:07d}"
+            loader.add((
+                customer_id,
+                full_name,
+                phone_number,
+                f"{rng.choice(CITIES)}, {rng.randint(1, 120)}-uy",
+                '0.00',
+                customer_dedupe_key(full_name, phone_number),
+            ))
+        loader.flush()
+        counts['customers'] = loader.written
+        progress('customers', customer_count, customer_count)
+
+        product_start = _next_id(Product)
+        product_ids = list(range(product_start, product_start + product_count))
+        product_prices = [rng.randrange(500, 200000) for _ in product_ids]  # tiyin/sentlarda
+        loader = BulkLoader(
+            Product, ['id', 'brand', 'category', 'name', 'price', 'quantity_healthy', 'quantity_defective'], chunk_size
+        )
+        for product_id, price in zip(product_ids, product_prices):
+            category = rng.choice(CATEGORIES)
+            loader.add((product_id, rng.choice(BRANDS), category, f"{category} {product_id:07d}", _money(price), 0, 0))
+        loader.flush()
+        counts['products'] = loader.written
+        progress('products', product_count, product_count)
+
+        product_indexes = list(range(product_count))
+        rng.shuffle(product_indexes)  # ommabop mahsulotlar id bo'yicha ketma-ket bo'lmasin
+        product_weights = _zipf_weights(product_count, config['product_skew'])
+
+        # --- Sotuvlar, qatorlar va qaytarishlar ---
+        sold = [0] * product_count
+        returned_healthy = [0] * product_count
+        returned_defective = [0] * product_count
+        debts = [0] * customer_count  # sentlarda
+
+        sale_loader = BulkLoader(
+            Sale, ['id', 'customer_id', 'seller_id', 'created_at', 'status', 'total_amount', 'item_count'], chunk_size
+        )
+        item_loader = BulkLoader(SaleItem, ['id', 'sale_id', 'product_id', 'quantity', 'price'], chunk_size)
+        return_loader = BulkLoader(
+            ReturnedProduct,
+            ['customer_id', 'product_id', 'quantity', 'condition', 'reason', 'returned_at', 'recorded_by_id', 'created_at'],
+            chunk_size,
+        )
+        sale_id = _next_id(Sale)
+        item_id = _next_id(SaleItem)
+        basket_extra = max(config['basket_mean'] - 1, 0)
+        max_basket = min(product_count, 20)
+
+        done = 0
+        while done < sales_total:
+            chunk = min(chunk_size, sales_total - done)
+            chosen_days = rng.choices(day_offsets, cum_weights=day_weights, k=chunk)
+            chosen_sellers = rng.choices(seller_ids, cum_weights=seller_weights, k=chunk)
+            chosen_statuses = rng.choices(status_values, cum_weights=status_weights, k=chunk)
+            for day_offset, seller_id, sale_status in zip(chosen_days, chosen_sellers, chosen_statuses):
+                customer_index = rng.randrange(customer_count)
+                created_at = moment(day_offset)
+
+                basket = 1 + (int(rng.expovariate(1 / basket_extra)) if basket_extra else 0)
+                picks = set(rng.choices(product_indexes, cum_weights=product_weights, k=min(basket, max_basket)))
+                sale_total = 0  # sentlarda
+                for product_index in picks:
+                    quantity = rng.randint(1, config['max_quantity'])
+                    price = product_prices[product_index]
+                    item_loader.add((item_id, sale_id, product_ids[product_index], quantity, _money(price)))
+                    item_id += 1
+                    sold[product_index] += quantity
+                    sale_total += quantity * price
+
+                    if rng.random() < config['return_rate']:
+                        returned = rng.randint(1, quantity)
+                        defective = rng.random() < config['defect_rate']
+                        if defective:
+                            returned_defective[product_index] += returned
+                        else:
+                            returned_healthy[product_index] += returned
+                        returned_at = min(created_at + timedelta(days=rng.randint(0, 30)), now)
+                        return_loader.add((
+                            customer_ids[customer_index], product_ids[product_index], returned,
+                            ReturnedProduct.CONDITION_DEFECTIVE if defective else ReturnedProduct.CONDITION_HEALTHY,
+                            'Brak' if defective else '', timezone.localdate(returned_at), seller_id, returned_at,
+                        ))
+                debts[customer_index] += sale_total
+                sale_loader.add((
+                    sale_id, customer_ids[customer_index], seller_id, created_at, sale_status,
+                    _money(sale_total), len(picks),
+                ))
+                sale_id += 1
+            done += chunk
+            progress('sales', done, sales_total)
+        sale_loader.flush()
+        item_loader.flush()
+        return_loader.flush()
+        counts.update(sales=sale_loader.written, sale_items=item_loader.written, returns=return_loader.written)
+
+        # --- To'lovlar: har bir mijoz sotuvlarining bir qismini to'lagan ---
+        payment_loader = BulkLoader(Payment, ['customer_id', 'amount', 'created_at'], chunk_size)
+        ratio = config['payment_ratio']
+        for customer_index, customer_id in enumerate(customer_ids):
+            owed = debts[customer_index]
+            paid = int(owed * min(1.0, max(0.0, rng.uniform(ratio - 0.2, ratio + 0.2))))
+            parts = max(1, min(50, paid // 100000))
+            for part in range(parts):
+                amount = paid // parts + (paid % parts if part == 0 else 0)
+                if amount <= 0:
+                    continue
+                payment_loader.add((customer_id, _money(amount), moment(rng.randrange(days))))
+                debts[customer_index] -= amount
+        payment_loader.flush()
+        counts['payments'] = payment_loader.written
+        progress('payments', customer_count, customer_count)
+
+        # --- Kirimlar: sotilgan (sog'lom qaytganlardan tashqari) + omborda qolgan miqdor ---
+        receipt_loader = BulkLoader(GoodsReceipt, ['product_id', 'quantity', 'created_at'], chunk_size)
+        stock_healthy = []
+        for product_index, product_id in enumerate(product_ids):
+            leftover = rng.randint(config['leftover_min'], config['leftover_max'])
+            received = max(0, sold[product_index] - returned_healthy[product_index]) + leftover
+            stock_healthy.append(received - sold[product_index] + returned_healthy[product_index])
+            parts = max(1, min(config['receipts_per_product'], received))
+            for part in range(parts):
+                quantity = received // parts + (received % parts if part == 0 else 0)
+                if quantity > 0:
+                    receipt_loader.add((product_id, quantity, moment(rng.randrange(days))))
+        receipt_loader.flush()
+        counts['receipts'] = receipt_loader.written
+        progress('receipts', product_count, product_count)
+
+        # --- Yakuniy qoldiqlar va qarzlar ---
+        Customer.objects.bulk_update(
+            [Customer(pk=customer_id, debt=_money(debt)) for customer_id, debt in zip(customer_ids, debts)],
+            ['debt'], batch_size=chunk_size,
+        )
+        Product.objects.bulk_update(
+            [
+                Product(pk=product_id, quantity_healthy=healthy, quantity_defective=defective)
+                for product_id, healthy, defective in zip(product_ids, stock_healthy, returned_defective)
+            ],
+            ['quantity_healthy', 'quantity_defective'], batch_size=chunk_size,
+        )
+        if product_ids:
+            open_balances(Product.objects.filter(pk__gte=product_ids[0], pk__lte=product_ids[-1]))
+        _reset_sequences([Customer, Product, Sale, SaleItem])
+
+    if config['rebuild_derived']:
+        progress('rollup', 0, 1)
+        rebuild_rollup()
+        progress('ledger', 0, 1)
+        rebuild_ledger()
+    # Mahsulot/mijoz ETag'lari, qidiruv katalogi va dashboard keshi - hammasi eskirdi
+    bump_data_version()
+    return counts
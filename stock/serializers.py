@@ -1,8 +1,21 @@
+from datetime import timedelta
+
 from rest_framework import serializers
 from django.contrib.auth.models import User, Group
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from .models import (
-    Product, Customer, Sale, SaleItem, Payment, GoodsReceipt, ReturnedProduct
+    Product, Customer, Sale, SaleItem, Payment, GoodsReceipt, ReturnedProduct, Job
 )
+from .analytics import DEFAULT_PERIOD_DAYS, INTERVALS, TREND_MAX_BUCKETS, bucket_periods
+from .filters import SaleFilter
+from .jobs import JOB_PARAMS
+from .permissions import GROUPS_CLAIM, group_names
+
+SALE_BATCH_MAX_SIZE = 500  # Bitta so'rovdagi sotuvlar soni chegarasi
 
 # --- ASOSIY MODELLAR UCHUN ---
 class ProductSerializer(serializers.ModelSerializer):
@@ -14,7 +27,7 @@ class ProductSerializer(serializers.ModelSerializer):
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
-        fields = '__all__'
+        exclude = ('dedupe_key',)  # ichki qidiruv kaliti, API'da ko'rsatilmaydi
 
 
 # --- FOYDALANUVCHILARNI BOSHQARISH UCHUN ---
@@ -75,6 +88,33 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """ Token'ga foydalanuvchi guruhlarini qo'shadi - ruxsatlar tekshiruvi bazaga murojaat qilmaydi. """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[GROUPS_CLAIM] = group_names(user)
+        return token
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Yangi access token'dagi guruhlarni bazadan qayta o'qiydi: guruh o'zgarishlari
+    keyingi yangilashda (ko'pi bilan ACCESS_TOKEN_LIFETIME ichida) kuchga kiradi.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user_id = access.get(jwt_settings.USER_ID_CLAIM)
+        access[GROUPS_CLAIM] = sorted(
+            Group.objects.filter(**{f'user__{jwt_settings.USER_ID_FIELD}': user_id}).values_list('name', flat=True)
+        )
+        data['access'] = str(access)
+        return data
+
+
 # --- SOTUVLAR UCHUN ---
 class ProductForSaleItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -105,8 +145,54 @@ class SaleSerializer(serializers.ModelSerializer):
         fields = ('id', 'customer', 'seller', 'created_at', 'items')
 
 
+class BatchSaleItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+
+
+class BatchSaleSerializer(serializers.Serializer):
+    """ Paketdagi bitta sotuv. Id'lar bazadan bittalab emas, butun paket uchun birga tekshiriladi. """
+    customer = serializers.IntegerField(min_value=1)
+    items = BatchSaleItemSerializer(many=True, allow_empty=False)
+
+
+class SaleBatchSerializer(serializers.Serializer):
+    # Har bir sotuv alohida tekshiriladi - bittasidagi xato qolganlarini to'xtatmaydi
+    sales = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=SALE_BATCH_MAX_SIZE)
+
+
+class SalesTrendQuerySerializer(serializers.Serializer):
+    """ `dashboard-stats/trends/` parametrlari; sana berilmasa, bugungacha bo'lgan standart davr olinadi. """
+    interval = serializers.ChoiceField(choices=INTERVALS, default='day')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        interval = attrs['interval']
+        end_date = attrs.setdefault('end_date', timezone.localdate())
+        start_date = attrs.setdefault('start_date', end_date - timedelta(days=DEFAULT_PERIOD_DAYS[interval] - 1))
+        if start_date > end_date:
+            raise serializers.ValidationError({'start_date': "Boshlanish sanasi tugash sanasidan keyin bo'lmasligi kerak."})
+        if len(bucket_periods(interval, start_date, end_date)) > TREND_MAX_BUCKETS:
+            raise serializers.ValidationError(
+                {'interval': f"Davrlar soni {TREND_MAX_BUCKETS} tadan oshmasligi kerak - kattaroq interval tanlang."}
+            )
+        return attrs
+
+
+class SparseFieldsetMixin:
+    """ `fields=[...]` berilsa, serializer faqat shu maydonlarni chiqaradi (`?fields=` uchun). """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 # --- SHU QISM O'ZGARTIRILDI ---
-class SalesListSerializer(serializers.ModelSerializer):
+class SalesListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """ Barcha sotuvlar ro'yxatini chiroyli ko'rsatish uchun maxsus serializer """
     customer = CustomerSerializer()
     seller = UserSerializer()
@@ -114,10 +200,19 @@ class SalesListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Sale  # to'g'rilandi (avval xato bilan User edi)
-        fields = ('id', 'customer', 'seller', 'status', 'created_at', 'items')  # 'items' qo'shildi
+        fields = ('id', 'customer', 'seller', 'status', 'created_at', 'total_amount', 'item_count', 'items')  # 'items' qo'shildi
 # --------------------------------
 
 
+class SaleSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """ Ro'yxat uchun yengil ko'rinish: ichma-ich serializer'larsiz, jami summa sotuvning o'zidan. """
+    customer_name = serializers.CharField(source='customer.full_name', read_only=True)
+
+    class Meta:
+        model = Sale
+        fields = ('id', 'created_at', 'status', 'customer', 'customer_name', 'seller', 'total_amount', 'item_count')
+
+
 class SaleStatusUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sale
@@ -170,3 +265,52 @@ class ReturnedProductSerializer(serializers.ModelSerializer):
         if value <= 0:
             raise serializers.ValidationError("Miqdor musbat bo'lishi kerak.")
         return value
+
+
+# --- FON VAZIFALARI UCHUN ---
+class JobSerializer(serializers.ModelSerializer):
+    percent = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'kind', 'status', 'params', 'progress', 'total', 'percent',
+            'result', 'error', 'attempts', 'created_at', 'started_at', 'finished_at', 'download_url',
+        )
+        read_only_fields = fields
+
+    def get_percent(self, obj):
+        if obj.status == Job.STATUS_SUCCEEDED:
+            return 100
+        if not obj.total:
+            return 0
+        return min(100, round(obj.progress * 100 / obj.total))
+
+    def get_download_url(self, obj):
+        if not obj.result_file:
+            return None
+        request = self.context.get('request')
+        url = reverse('job-download', args=[obj.id])
+        return request.build_absolute_uri(url) if request else url
+
+
+class JobCreateSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(source='input_file', required=False, write_only=True)
+
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'file')
+
+    def validate(self, attrs):
+        kind = attrs['kind']
+        if kind in Job.IMPORT_KINDS and not attrs.get('input_file'):
+            raise serializers.ValidationError({'file': "Import uchun fayl yuborilishi shart."})
+
+        params = {key: self.initial_data[key] for key in JOB_PARAMS[kind] if key in self.initial_data}
+        if kind == Job.KIND_SALE_EXPORT:
+            sale_filter = SaleFilter(params, queryset=Sale.objects.none())
+            if not sale_filter.is_valid():
+                raise serializers.ValidationError(sale_filter.errors)
+        attrs['params'] = params
+        return attrs
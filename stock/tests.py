@@ -1,10 +1,42 @@
-from django.contrib.auth.models import User
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipIf
+
+import pandas as pd
+from django.contrib.auth.models import Group, User
+from django.db.models import F, Sum
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.contrib import admin
+from django.core.management import CommandError, call_command
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from .models import Customer, Product
+from .admin import SaleItemAdmin
+from .benchmarks import SCENARIOS, generate_dataset, run_benchmark
+from .cache import bump_data_version, get_catalogue_version, get_data_version, get_table_version
+from .columnar import COLUMNAR_DATASETS, export_dataset, pa
+from .filters import ReturnedProductFilter, SaleFilter
+from .jobs import requeue_stale_jobs
+from .models import (
+    Customer, CustomerBalanceCheckpoint, CustomerLedgerEntry, DailySalesRollup, GoodsReceipt, Job, Notification, Payment,
+    Product, ReturnedProduct, Sale, SaleItem, StockMovement,
+)
+from .imports import upsert_customers
+from .movements import create_snapshots, stock_levels, verify_stock
+from .sale_totals import refresh_sale_totals, verify_sale_totals
+from .notifications import dispatch_notifications
+from .pagination import IdCursorPagination, SaleCursorPagination
+from .search import product_index
+from .seeding import seed_data
 
 
 class ReturnedProductAPITest(TestCase):
@@ -130,3 +162,1294 @@ class ProductAPITest(TestCase):
         product.refresh_from_db()
         self.assertEqual(product.quantity_healthy, 8)
         self.assertEqual(product.quantity_defective, 5)
+
+
+class SaleExportAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.user)
+
+        customer = Customer.objects.create(full_name='Export Customer', phone_number='1', address='A')
+        product = Product.objects.create(brand='B', category='C', name='Export Product', price=10)
+        for quantity in (1, 2, 3):
+            sale = Sale.objects.create(customer=customer, seller=self.user)
+            SaleItem.objects.create(sale=sale, product=product, quantity=quantity, price=10)
+
+    def test_csv_export_streams_every_item(self):
+        # exists() + bitta JOIN'li so'rov, sotuvlar soniga bog'liq emas
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('sale-export'), {'format': 'csv'})
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        lines = content.decode('utf-8-sig').strip().splitlines()
+        self.assertEqual(lines[0], 'Chek ID,Sana,Mijoz,Sotuvchi,Mahsulot,Soni,Narxi,Qator Summasi,Status')
+        self.assertEqual(len(lines), 4)
+        self.assertIn('Export Customer,seller,Export Product,3,10.00,30.00,yaratildi', lines[1])
+
+    def test_xlsx_export_is_default(self):
+        response = self.client.get(reverse('sale-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('sotuvlar_tarixi.xlsx', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))
+
+    def test_empty_export_returns_404(self):
+        response = self.client.get(reverse('sale-export'), {'format': 'csv', 'status': 'yuborildi'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_format_follows_accept_header_or_query(self):
+        response = self.client.get(reverse('product-export'), HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('Accept', response['Vary'])
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[:2], ['brand,category,name,price,quantity_healthy,quantity_defective', 'B,C,Export Product,10.00,0,0'])
+
+        response = self.client.get(reverse('customer-export'), {'format': 'csv'})
+        self.assertIn('mijozlar.csv', response['Content-Disposition'])
+        response = self.client.get(reverse('customer-export'))
+        self.assertIn('mijozlar.xlsx', response['Content-Disposition'])
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Har bir ro'yxat endpointi qatorlar sonidan qat'i nazar belgilangan miqdordagi
+    so'rovdan oshmasligini tekshiradi (N+1 muammosi qaytmasligi uchun).
+    """
+    BUDGETS = {
+        'sales-list': 3,            # sotuvlar + sotuvchi guruhlari + mahsulot qatorlari
+        'product-list': 2,          # ETag uchun jadval versiyasi (DatabaseCache) + mahsulotlar
+        'customer-list': 2,         # ETag uchun jadval versiyasi (DatabaseCache) + mijozlar
+        'returnedproduct-list': 2,  # qaytarishlar + qayd etgan foydalanuvchi guruhlari
+        'user-list': 2,             # foydalanuvchilar + guruhlar
+        'group-list': 1,
+        'job-list': 1,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='budget-admin', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.seed(3)
+        # Versiya kalitlari birinchi murojaatda yaratiladi - byudjet barqaror holat uchun
+        get_table_version(Product)
+        get_table_version(Customer)
+
+    def seed(self, count):
+        groups = [Group.objects.get_or_create(name=name)[0] for name in ('Sotuvchilar', 'Omborchilar')]
+        for index in range(count):
+            seller = User.objects.create_user(username=f'budget-seller-{Sale.objects.count()}-{index}')
+            seller.groups.set(groups)
+            customer = Customer.objects.create(full_name=f'Customer {index}', phone_number=str(index), address='A')
+            product = Product.objects.create(brand='B', category='C', name=f'Product {index}', price=5, quantity_healthy=100)
+            sale = Sale.objects.create(customer=customer, seller=seller)
+            for quantity in (1, 2):
+                SaleItem.objects.create(sale=sale, product=product, quantity=quantity, price=5)
+            ReturnedProduct.objects.create(
+                customer=customer, product=product, quantity=1,
+                condition=ReturnedProduct.CONDITION_HEALTHY, recorded_by=seller
+            )
+
+    def assert_budgets(self):
+        for url_name, budget in self.BUDGETS.items():
+            with self.subTest(url_name=url_name), self.assertNumQueries(budget):
+                response = self.client.get(reverse(url_name))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_endpoints_stay_within_budget(self):
+        self.assert_budgets()
+
+    def test_budget_does_not_grow_with_rows(self):
+        self.seed(5)
+        self.assert_budgets()
+
+    def test_sale_detail_within_budget(self):
+        sale = Sale.objects.first()
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('sale-detail', args=[sale.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['items']), 2)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='pager', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.user)
+
+        customer = Customer.objects.create(full_name='Pager Customer', phone_number='1', address='A')
+        self.sales = [Sale.objects.create(customer=customer, seller=self.user) for _ in range(7)]
+        # Bir xil vaqtdagi sotuvlar ham tushib qolmasligi va takrorlanmasligi kerak
+        Sale.objects.filter(id__in=[sale.id for sale in self.sales[:4]]).update(created_at=self.sales[0].created_at)
+
+    def test_sales_pages_cover_every_row_once_in_order(self):
+        url = reverse('sales-list') + '?page_size=3'
+        seen = []
+        while url:
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        expected = list(Sale.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_capped(self):
+        for index in range(3):
+            Customer.objects.create(full_name=f'Extra {index}', phone_number='2', address='B')
+
+        with mock.patch.object(IdCursorPagination, 'max_page_size', 2):
+            response = self.client.get(reverse('customer-list'), {'page_size': 100000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse('sales-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor_values_return_404(self):
+        pagination = SaleCursorPagination()
+        for position in (['abc', 1], ['2026-01-01T00:00:00Z', 'x'], [None, None]):
+            response = self.client.get(reverse('sales-list'), {'cursor': pagination.encode_cursor(position)})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+
+def make_excel_upload(rows, name='import.xlsx'):
+    output = BytesIO()
+    pd.DataFrame(rows).to_excel(output, index=False)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
+class ProductImportAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='importer', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.user)
+
+        Product.objects.create(brand='B', category='C', name='Existing', price=10, quantity_healthy=1)
+        Product.objects.create(brand='B', category='C', name='Same', price=5, quantity_healthy=2)
+        self.rows = [
+            {'name': 'Existing', 'brand': 'B', 'category': 'C', 'price': 12.5, 'quantity_healthy': 4},
+            {'name': 'Same', 'brand': 'B', 'category': 'C', 'price': 5, 'quantity_healthy': 2},
+            {'name': 'New', 'brand': 'N', 'category': 'C', 'price': 3, 'quantity_healthy': 7},
+            {'name': 'New', 'brand': 'N', 'category': 'C', 'price': 4, 'quantity_healthy': 8},
+        ]
+
+    def test_bulk_upsert_creates_updates_and_skips_unchanged(self):
+        response = self.client.post(reverse('product-import'), {'file': make_excel_upload(self.rows)}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['unchanged']), (1, 1, 1))
+        self.assertIn('rows_per_second', response.data)
+
+        existing = Product.objects.get(name='Existing')
+        self.assertEqual((existing.price, existing.quantity_healthy), (Decimal('12.50'), 4))
+        new = Product.objects.get(name='New')
+        self.assertEqual((new.price, new.quantity_healthy), (Decimal('4.00'), 8))
+
+    def test_dry_run_writes_nothing(self):
+        response = self.client.post(
+            reverse('product-import'), {'file': make_excel_upload(self.rows), 'dry_run': 'true'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['dry_run'])
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['unchanged']), (1, 1, 1))
+        self.assertFalse(Product.objects.filter(name='New').exists())
+        self.assertEqual(Product.objects.get(name='Existing').quantity_healthy, 1)
+
+    def test_invalid_row_rolls_back_whole_import(self):
+        rows = self.rows + [{'name': 'Broken', 'brand': 'B', 'category': 'C', 'price': 'abc', 'quantity_healthy': 1}]
+        response = self.client.post(reverse('product-import'), {'file': make_excel_upload(rows)}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Product.objects.filter(name='New').exists())
+        self.assertEqual(Product.objects.get(name='Existing').quantity_healthy, 1)
+
+    def test_csv_file_is_detected_by_content(self):
+        content = '\ufeffname;brand;category;price;quantity_healthy\nExisting;B;C;12.5;4\nNew;N;C;4;\n'
+        upload = SimpleUploadedFile('mahsulotlar.xlsx', content.encode('utf-8'), content_type='application/octet-stream')
+        response = self.client.post(reverse('product-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual(Product.objects.get(name='Existing').price, Decimal('12.50'))
+        self.assertEqual(Product.objects.get(name='New').quantity_healthy, 0)
+
+        upload = SimpleUploadedFile('mahsulotlar.csv', b'name,brand\nX,B\n', content_type='text/csv')
+        response = self.client.post(reverse('product-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("'price'", response.data['error'])
+
+
+class JobAPITest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='job-user', password='testpass')
+        self.client.force_authenticate(self.user)
+
+    def run_worker(self):
+        call_command('run_jobs', processes=0, once=True, stdout=StringIO())
+
+    def test_export_job_runs_in_background_and_is_downloadable(self):
+        Product.objects.create(brand='B', category='C', name='Queued Product', price=3)
+
+        response = self.client.post(reverse('job-list'), {'kind': Job.KIND_PRODUCT_EXPORT, 'format': 'csv'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['id']
+        self.assertEqual(response.data['status'], Job.STATUS_PENDING)
+
+        self.run_worker()
+
+        detail = self.client.get(reverse('job-detail', args=[job_id]))
+        self.assertEqual(detail.data['status'], Job.STATUS_SUCCEEDED)
+        self.assertEqual(detail.data['percent'], 100)
+
+        download = self.client.get(reverse('job-download', args=[job_id]))
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertIn('Queued Product', b''.join(download.streaming_content).decode('utf-8-sig'))
+
+    def test_import_job_requires_file_and_applies_rows(self):
+        response = self.client.post(reverse('job-list'), {'kind': Job.KIND_PRODUCT_IMPORT}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        upload = make_excel_upload([{'name': 'From Job', 'price': 2, 'quantity_healthy': 5}])
+        response = self.client.post(
+            reverse('job-list'), {'kind': Job.KIND_PRODUCT_IMPORT, 'file': upload}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        self.run_worker()
+
+        job = Job.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result['created'], 1)
+        self.assertEqual((job.progress, job.total), (1, 1))
+        self.assertTrue(Product.objects.filter(name='From Job', quantity_healthy=5).exists())
+
+    def test_failed_job_keeps_error(self):
+        upload = make_excel_upload([{'name': 'No price column'}])
+        response = self.client.post(
+            reverse('job-list'), {'kind': Job.KIND_PRODUCT_IMPORT, 'file': upload}, format='multipart'
+        )
+        self.run_worker()
+
+        job = Job.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn("'price' ustuni topilmadi", job.error)
+
+    def test_stale_running_job_is_requeued(self):
+        job = Job.objects.create(
+            kind=Job.KIND_CUSTOMER_EXPORT,
+            status=Job.STATUS_RUNNING,
+            attempts=1,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        requeue_stale_jobs(lease_seconds=60, max_attempts=3)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+
+    def test_users_only_see_their_own_jobs(self):
+        other = User.objects.create_user(username='other-job-user')
+        Job.objects.create(kind=Job.KIND_CUSTOMER_EXPORT, created_by=other)
+        response = self.client.get(reverse('job-list'))
+        self.assertEqual(response.data['results'], [])
+
+
+class DashboardRollupTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='dash-admin', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.user)
+
+        self.customer = Customer.objects.create(full_name='Dash Customer', phone_number='1', address='A')
+        self.other_customer = Customer.objects.create(full_name='Other Customer', phone_number='2', address='B')
+        self.door = Product.objects.create(brand='B', category='C', name='Door', price=10, quantity_healthy=100)
+        self.window = Product.objects.create(brand='B', category='C', name='Window', price=4, quantity_healthy=100)
+
+    def create_sale(self, customer, items):
+        payload = {
+            'customer': customer.id,
+            'items': [{'product': product.id, 'quantity': quantity, 'price': price} for product, quantity, price in items],
+        }
+        response = self.client.post(reverse('sale-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def seed_activity(self):
+        self.create_sale(self.customer, [(self.door, 2, 10), (self.window, 5, 4)])
+        self.create_sale(self.customer, [(self.door, 1, 10)])
+        self.create_sale(self.other_customer, [(self.window, 3, 4)])
+        response = self.client.post(reverse('payment-create'), {'customer': self.customer.id, 'amount': 15}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('returnedproduct-list'), {
+            'customer': self.customer.id, 'product': self.door.id, 'quantity': 1,
+            'condition': 'defective', 'returned_at': timezone.localdate().isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def rollup_snapshot(self):
+        return sorted(
+            DailySalesRollup.objects.values('day', 'customer', 'seller', 'product').annotate(
+                amount=Sum('sales_amount'), quantity=Sum('sales_quantity'), count=Sum('sales_count'),
+                payments=Sum('payments_amount'), healthy=Sum('returns_healthy_quantity'),
+                defective=Sum('returns_defective_quantity'),
+            ).values_list('day', 'customer', 'seller', 'product', 'amount', 'quantity', 'count', 'payments', 'healthy', 'defective'),
+            key=str,
+        )
+
+    def test_dashboard_reads_incrementally_maintained_rollup(self):
+        self.seed_activity()
+
+        response = self.client.get(reverse('dashboard-stats'))
+        cards = response.data['stats_cards']
+        self.assertEqual(cards['total_sales_amount'], Decimal('62.00'))
+        self.assertEqual(cards['total_sales_count'], 3)
+        self.assertEqual(cards['total_payments'], Decimal('15.00'))
+        self.assertEqual(cards['defective_returns_quantity'], 1)
+        self.assertEqual(cards['today_returns_quantity'], 1)
+        self.assertEqual(response.data['sales_by_seller'][0]['sales_count'], 3)
+        self.assertEqual(response.data['top_products'][0], {'name': 'Window', 'total_sold': 8})
+
+        response = self.client.get(reverse('dashboard-stats'), {'customer': self.customer.id})
+        self.assertEqual(response.data['stats_cards']['total_sales_amount'], Decimal('50.00'))
+        self.assertEqual(response.data['stats_cards']['total_sales_count'], 2)
+
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        response = self.client.get(reverse('dashboard-stats'), {'start_date': tomorrow})
+        self.assertEqual(response.data['stats_cards']['total_sales_count'], 0)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self.seed_activity()
+        return_id = ReturnedProduct.objects.get().id
+        response = self.client.patch(
+            reverse('returnedproduct-detail', args=[return_id]), {'condition': 'healthy', 'quantity': 2}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        incremental = self.rollup_snapshot()
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+        self.assertEqual(self.rollup_snapshot(), incremental)
+
+
+class DashboardCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='cache-admin', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.customer = Customer.objects.create(full_name='Cache Customer', phone_number='1', address='A', debt=100)
+
+    def test_repeated_requests_hit_cache_with_normalized_params(self):
+        first = self.client.get(reverse('dashboard-stats'), {'customer': self.customer.id})
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(reverse('dashboard-stats'), {'customer': f' 0{self.customer.id}'})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        # Keshdan javob berilganda faqat versiya va natija kalitlari o'qiladi - agregat so'rovlar ham, yozuv ham yo'q
+        self.assertTrue(all('stock_cache' in query['sql'] or 'SAVEPOINT' in query['sql'] for query in queries))
+        self.assertEqual(sum('stock_cache' in query['sql'] for query in queries), 2)
+        self.assertEqual(second.data, first.data)
+
+    def test_write_invalidates_cached_result(self):
+        # Hisoblagichlar jarayon bo'yicha - oldingi testlardagi so'rovlar ham kirgan
+        initial = self.client.get(reverse('dashboard-cache-stats')).data
+        before = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(before.data['stats_cards']['total_payments'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('payment-create'), {'customer': self.customer.id, 'amount': 40}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        after = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(after['X-Cache'], 'MISS')
+        self.assertEqual(after.data['stats_cards']['total_payments'], Decimal('40.00'))
+
+        stats = self.client.get(reverse('dashboard-cache-stats')).data
+        self.assertEqual((stats['hits'] - initial['hits'], stats['misses'] - initial['misses']), (0, 2))
+
+    def test_bulk_rebuilds_invalidate_cached_result(self):
+        self.client.get(reverse('dashboard-stats'))
+        for command, args in (('rebuild_sales_rollup', ()), ('customer_ledger', ('--rebuild',))):
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command(command, *args, stdout=StringIO())
+            response = self.client.get(reverse('dashboard-stats'))
+            self.assertEqual(response['X-Cache'], 'MISS', command)
+
+
+class CustomerLedgerTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='ledger-admin', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.customer = Customer.objects.create(full_name='Ledger Customer', phone_number='1', address='A')
+        self.product = Product.objects.create(brand='B', category='C', name='Door', price=10, quantity_healthy=100)
+
+    def create_sale(self, quantity, price):
+        payload = {'customer': self.customer.id, 'items': [{'product': self.product.id, 'quantity': quantity, 'price': price}]}
+        response = self.client.post(reverse('sale-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def create_payment(self, amount):
+        response = self.client.post(reverse('payment-create'), {'customer': self.customer.id, 'amount': amount}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def move_history_back(self, days):
+        moment = timezone.now() - timedelta(days=days)
+        Sale.objects.update(created_at=moment)
+        Payment.objects.update(created_at=moment)
+        CustomerLedgerEntry.objects.update(created_at=moment)
+
+    def reconciliation(self):
+        today = timezone.localdate().isoformat()
+        url = reverse('customer-reconciliation', args=[self.customer.id])
+        return self.client.get(url, {'start_date': today, 'end_date': today}).data
+
+    def test_reconciliation_reads_ledger_with_checkpoint(self):
+        for _ in range(3):
+            self.create_sale(2, 10)
+        self.create_payment(15)
+        self.move_history_back(10)
+        self.assertEqual(CustomerLedgerEntry.objects.filter(customer=self.customer).count(), 4)
+
+        call_command('customer_ledger', checkpoint=True, as_of=(timezone.localdate() - timedelta(days=5)).isoformat(), stdout=StringIO())
+        self.assertEqual(CustomerBalanceCheckpoint.objects.get(customer=self.customer).balance, Decimal('45.00'))
+
+        self.create_sale(1, 10)
+        self.create_payment(5)
+
+        with self.assertNumQueries(4):  # mijoz, checkpoint, checkpoint'dan keyingi delta, davr yozuvlari
+            data = self.reconciliation()
+        self.assertEqual(data['starting_balance'], Decimal('45.00'))
+        self.assertEqual(data['total_debit'], Decimal('10.00'))
+        self.assertEqual(data['total_credit'], Decimal('5.00'))
+        self.assertEqual(data['ending_balance'], Decimal('50.00'))
+        self.assertEqual([row['type'] for row in data['transactions']], ['Sotuv', "To'lov"])
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.debt, data['ending_balance'])
+
+    def test_rebuild_matches_incrementally_written_ledger(self):
+        self.create_sale(2, 10)
+        self.create_payment(5)
+        before = sorted(CustomerLedgerEntry.objects.values_list('entry_type', 'sale', 'payment', 'debit', 'credit'), key=str)
+
+        call_command('customer_ledger', rebuild=True, stdout=StringIO())
+        after = sorted(CustomerLedgerEntry.objects.values_list('entry_type', 'sale', 'payment', 'debit', 'credit'), key=str)
+        self.assertEqual(before, after)
+
+
+class SaleStockDecrementTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='stock-admin', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.customer = Customer.objects.create(full_name='Stock Customer', phone_number='1', address='A')
+        self.door = Product.objects.create(brand='B', category='C', name='Door', price=10, quantity_healthy=5)
+        self.window = Product.objects.create(brand='B', category='C', name='Window', price=4, quantity_healthy=5)
+
+    def create_sale(self, items):
+        payload = {
+            'customer': self.customer.id,
+            'items': [{'product': product.id, 'quantity': quantity, 'price': price} for product, quantity, price in items],
+        }
+        return self.client.post(reverse('sale-create'), payload, format='json')
+
+    def test_sale_decrements_stock_and_debt(self):
+        response = self.create_sale([(self.door, 2, 10), (self.window, 1, 4), (self.door, 1, 10)])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.door.refresh_from_db()
+        self.window.refresh_from_db()
+        self.customer.refresh_from_db()
+        self.assertEqual((self.door.quantity_healthy, self.window.quantity_healthy), (2, 4))
+        self.assertEqual(self.customer.debt, Decimal('34.00'))
+        self.assertEqual(SaleItem.objects.count(), 3)
+
+    def test_repeated_lines_cannot_oversell(self):
+        # Har bir qator alohida qoldiqqa sig'adi, lekin jami qoldiqdan oshadi
+        response = self.create_sale([(self.window, 1, 4), (self.door, 3, 10), (self.door, 3, 10)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Qoldiq: 5", str(response.data))
+
+        self.door.refresh_from_db()
+        self.window.refresh_from_db()
+        self.customer.refresh_from_db()
+        self.assertEqual((self.door.quantity_healthy, self.window.quantity_healthy), (5, 5))
+        self.assertEqual(self.customer.debt, 0)
+        self.assertFalse(Sale.objects.exists())
+
+
+class BenchmarkHarnessTest(TestCase):
+    def test_dataset_is_consistent_and_every_scenario_succeeds(self):
+        generate_dataset(sales=60, seed=7)
+
+        sold = SaleItem.objects.aggregate(total=Sum(F('quantity') * F('price')))['total']
+        paid = Payment.objects.aggregate(total=Sum('amount'))['total'] or 0
+        # SQLite SUM'ni float'da hisoblaydi - tiyingacha yaxlitlab solishtiramiz
+        self.assertEqual(Customer.objects.aggregate(total=Sum('debt'))['total'].quantize(Decimal('0.01')), (sold - paid).quantize(Decimal('0.01')))
+        self.assertEqual(CustomerLedgerEntry.objects.count(), Sale.objects.count() + Payment.objects.count())
+
+        results = run_benchmark(iterations=2, warmup=0, seed=7)
+        self.assertEqual(set(results), set(SCENARIOS))
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertGreater(result['queries_max'], 0, name)
+
+
+class SeedDataTest(TestCase):
+    def test_seeded_history_is_consistent(self):
+        catalogue_version = get_catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('seed_data', sales=300, products=25, customers=12, return_rate=0.2, interactive=False, stdout=StringIO())
+        self.assertNotEqual(get_catalogue_version(), catalogue_version)
+
+        self.assertEqual(Sale.objects.count(), 300)
+        self.assertTrue(ReturnedProduct.objects.exists())
+        self.assertFalse(Sale.objects.filter(created_at__gt=timezone.now()).exists())
+
+        line_total = F('quantity') * F('price')
+        for customer in Customer.objects.all():
+            sold = SaleItem.objects.filter(sale__customer=customer).aggregate(total=Sum(line_total))['total'] or 0
+            paid = Payment.objects.filter(customer=customer).aggregate(total=Sum('amount'))['total'] or 0
+            self.assertEqual(customer.debt, Decimal(sold - paid).quantize(Decimal('0.01')))
+
+        for product in Product.objects.all():
+            received = GoodsReceipt.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            sold = SaleItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            returns = ReturnedProduct.objects.filter(product=product)
+            healthy = returns.filter(condition='healthy').aggregate(total=Sum('quantity'))['total'] or 0
+            defective = returns.filter(condition='defective').aggregate(total=Sum('quantity'))['total'] or 0
+            self.assertEqual(product.quantity_healthy, received - sold + healthy)
+            self.assertEqual(product.quantity_defective, defective)
+        self.assertEqual(verify_stock(), (25, []))
+        self.assertEqual(verify_sale_totals(), (300, []))
+
+        # Ketma-ketliklar to'g'rilangan: oddiy yozuvlar id to'qnashuvisiz qo'shiladi
+        Sale.objects.create(customer=Customer.objects.first(), seller=User.objects.first())
+        self.assertEqual(CustomerLedgerEntry.objects.count(), 300 + Payment.objects.count())
+
+
+class QueryPlanTest(TestCase):
+    """
+    Asosiy so'rovlar indeks orqali bajarilishini EXPLAIN bilan tekshiradi. PostgreSQL'da
+    statistika yig'ilgach seq scan o'chiriladi: indeks ishlatib bo'lmasa, reja baribir Seq Scan bo'ladi.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_data(sales=400, customers=20, products=30, return_rate=0.1)
+        cls.customer = Customer.objects.order_by('id').first()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), plan)
+        table = queryset.model._meta.db_table
+        self.assertNotIn(f'Seq Scan on {table}', plan)
+        self.assertNotRegex(plan, rf'SCAN {table}(?! USING)')
+
+    def test_sales_list_queries(self):
+        sales = Sale.objects.order_by('-created_at', '-id')
+        self.assertUsesIndex(sales[:101], 'stock_sale_created_idx')
+        self.assertUsesIndex(SaleFilter({'customer': self.customer.pk}, queryset=sales).qs[:101], 'stock_sale_cust_created_idx')
+        self.assertUsesIndex(SaleFilter({'status': 'yigildi'}, queryset=sales).qs[:101], 'stock_sale_status_created_idx')
+        if connection.vendor == 'postgresql':
+            open_indexes = ('stock_sale_open_created_idx',)
+        else:
+            # SQLite parametrli shartda qisman indeksni tanlamaydi - status indeksi bo'yicha qidiradi
+            open_indexes = ('stock_sale_status_created_idx', 'stock_sale_created_idx')
+        self.assertUsesIndex(SaleFilter({'open': 'true'}, queryset=sales).qs[:101], *open_indexes)
+        start = timezone.localdate() - timedelta(days=7)
+        self.assertUsesIndex(SaleFilter({'start_date': start.isoformat()}, queryset=sales).qs[:101], 'stock_sale_created_idx')
+
+    def test_sale_items_prefetch(self):
+        sale_ids = list(Sale.objects.values_list('id', flat=True)[:50])
+        self.assertUsesIndex(SaleItem.objects.filter(sale_id__in=sale_ids), 'stock_saleitem_sale_prod_idx')
+
+    def test_returns_list_queries(self):
+        returns = ReturnedProduct.objects.order_by('-returned_at', '-id')
+        self.assertUsesIndex(returns[:101], 'stock_return_returned_idx')
+        params = {'condition': 'defective', 'start_date': (timezone.localdate() - timedelta(days=30)).isoformat()}
+        self.assertUsesIndex(ReturnedProductFilter(params, queryset=returns).qs[:101], 'stock_return_cond_returned_idx')
+        self.assertUsesIndex(ReturnedProductFilter({'customer': self.customer.pk}, queryset=returns).qs[:101], 'stock_return_cust_returned_idx')
+
+    def test_customer_history_queries(self):
+        start = timezone.now() - timedelta(days=30)
+        self.assertUsesIndex(Payment.objects.filter(customer=self.customer, created_at__gte=start), 'stock_payment_cust_created_idx')
+        ledger = CustomerLedgerEntry.objects.filter(customer=self.customer, created_at__gte=start).order_by('created_at', 'id')
+        self.assertUsesIndex(ledger, 'stock_ledger_cust_created_idx')
+
+    def test_dashboard_and_import_lookups(self):
+        start = timezone.localdate() - timedelta(days=30)
+        self.assertUsesIndex(DailySalesRollup.objects.filter(day__gte=start, day__lte=timezone.localdate()), 'stock_rollup_day_cust_idx')
+        self.assertUsesIndex(DailySalesRollup.objects.filter(customer=self.customer, day__gte=start), 'stock_rollup_cust_day_idx')
+        self.assertUsesIndex(Product.objects.filter(name__in=['Eshik 0000001', 'Kafel 0000002']), 'stock_product_name_idx')
+
+
+class TokenGroupClaimsTest(TestCase):
+    """ Ruxsatlar JWT'dagi `groups` claim'idan tekshiriladi - guruhlar jadvaliga so'rov yo'q. """
+
+    def setUp(self):
+        self.accountants = Group.objects.create(name='Buxgalterlar')
+        self.user = User.objects.create_user(username='accountant', password='testpass')
+        self.user.groups.add(self.accountants)
+        self.customer = Customer.objects.create(full_name='Debtor', phone_number='1', address='A', debt=100)
+        self.client = APIClient()
+        response = self.client.post(
+            reverse('token_obtain_pair'), {'username': 'accountant', 'password': 'testpass'}, format='json'
+        )
+        self.refresh = response.data['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def pay(self):
+        return self.client.post(
+            reverse('payment-create'), {'customer': self.customer.id, 'amount': '10.00'}, format='json'
+        )
+
+    def test_permission_check_does_not_query_groups(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.pay()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse([query['sql'] for query in queries if 'auth_user_groups' in query['sql']])
+
+    def test_refresh_reloads_groups(self):
+        self.user.groups.remove(self.accountants)
+        response = self.client.post(reverse('token_refresh'), {'refresh': self.refresh}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.pay().status_code, status.HTTP_403_FORBIDDEN)
+
+
+class NotificationOutboxTest(TestCase):
+    def setUp(self):
+        sellers = Group.objects.create(name='Sotuvchilar')
+        warehouse = Group.objects.create(name='Omborchilar')
+        self.seller = User.objects.create_user(username='outbox-seller')
+        self.seller.groups.add(sellers)
+        for index in range(2):
+            keeper = User.objects.create_user(username=f'keeper-{index}', email=f'keeper{index}@example.com')
+            keeper.groups.add(warehouse)
+        customer = Customer.objects.create(full_name='Outbox Customer', phone_number='1', address='A')
+        self.sales = [Sale.objects.create(customer=customer, seller=self.seller) for _ in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def change_status(self, sale):
+        url = reverse('sale-update-status', args=[sale.id])
+        response = self.client.patch(url, {'status': 'omborga_yuborildi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_status_change_queues_instead_of_sending(self):
+        self.change_status(self.sales[0])
+        self.assertEqual(len(mail.outbox), 0)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.audience, 'Omborchilar')
+        self.assertIn(f"#{self.sales[0].id}", notification.subject)
+
+    def test_dispatch_batches_per_recipient(self):
+        for sale in self.sales:
+            self.change_status(sale)
+        result = dispatch_notifications()
+        self.assertEqual((result['emails'], result['sent']), (2, 4))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['keeper0@example.com', 'keeper1@example.com'])
+        self.assertTrue(all(f"#{sale.id}" in mail.outbox[0].body for sale in self.sales))
+        self.assertFalse(Notification.objects.exclude(status=Notification.STATUS_SENT).exists())
+        self.assertEqual(dispatch_notifications()['claimed'], 0)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.change_status(self.sales[0])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('smtp down')):
+            result = dispatch_notifications()
+        self.assertEqual((result['retry'], result['sent']), (2, 0))
+        pending = Notification.objects.filter(status=Notification.STATUS_PENDING)
+        self.assertEqual(pending.count(), 2)
+        self.assertTrue(all(row.next_attempt_at > timezone.now() and row.last_error == 'smtp down' for row in pending))
+        self.assertEqual(dispatch_notifications()['claimed'], 0)  # kutish vaqti hali o'tmagan
+
+        pending.update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatch_notifications()['sent'], 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+
+class StockMovementTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='stock-admin', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.customer = Customer.objects.create(full_name='Stock Customer', phone_number='1', address='A')
+        response = self.client.post(reverse('product-list'), {
+            'brand': 'B', 'category': 'C', 'name': 'Tracked', 'price': '5.00', 'quantity_healthy': 10,
+        }, format='json')
+        self.product = Product.objects.get(pk=response.data['id'])
+
+    def create_return(self, quantity, condition='healthy'):
+        response = self.client.post(reverse('returnedproduct-list'), {
+            'customer': self.customer.id, 'product': self.product.id, 'quantity': quantity,
+            'condition': condition, 'returned_at': '2025-01-01',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def test_every_change_is_recorded(self):
+        self.client.post(reverse('receipt-create'), {'product': self.product.id, 'quantity': 5}, format='json')
+        self.client.post(reverse('sale-create'), {
+            'customer': self.customer.id, 'items': [{'product': self.product.id, 'quantity': 4, 'price': '5.00'}],
+        }, format='json')
+        return_id = self.create_return(2)
+        self.client.patch(reverse('returnedproduct-detail', args=[return_id]), {'condition': 'defective'}, format='json')
+        self.client.post(reverse('product-transfer', args=[self.product.id]), {
+            'from_condition': 'defective', 'to_condition': 'healthy', 'quantity': 1,
+        }, format='json')
+        self.client.patch(reverse('product-detail', args=[self.product.id]), {'quantity_healthy': 20}, format='json')
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.quantity_healthy, self.product.quantity_defective), (20, 1))
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('movement_type', 'condition', 'delta')),
+            [
+                ('opening', 'healthy', 10), ('receipt', 'healthy', 5), ('sale', 'healthy', -4),
+                ('return', 'healthy', 2), ('return', 'defective', 2), ('return', 'healthy', -2),
+                ('transfer', 'defective', -1), ('transfer', 'healthy', 1), ('adjustment', 'healthy', 8),
+            ]
+        )
+        self.assertEqual(verify_stock(), (1, []))
+
+    def test_reversing_return_does_not_clamp_stock(self):
+        return_id = self.create_return(3, condition='defective')
+        Product.objects.filter(pk=self.product.pk).update(quantity_defective=1)  # brak allaqachon hisobdan chiqarilgan
+
+        response = self.client.delete(reverse('returnedproduct-detail', args=[return_id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(ReturnedProduct.objects.filter(pk=return_id).exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity_defective, 1)
+        checked, mismatches = verify_stock()
+        self.assertEqual(mismatches, [(self.product.id, (10, 1), (10, 3))])
+
+    def test_snapshots_rebuild_current_and_past_levels(self):
+        StockMovement.objects.update(created_at=timezone.now() - timedelta(days=3))
+        as_of = timezone.now() - timedelta(days=1)
+        self.assertEqual(create_snapshots(as_of), 1)
+        self.create_return(2)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(stock_levels([self.product.id]), {self.product.id: (12, 0)})
+        self.assertEqual(stock_levels([self.product.id], at=as_of), {self.product.id: (10, 0)})
+        self.assertEqual(stock_levels([self.product.id], at=as_of - timedelta(days=3)), {self.product.id: (0, 0)})
+        self.assertEqual(verify_stock(chunk_size=1), (1, []))
+
+
+class SaleBatchCreateTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create_user(username='batch-other', password='testpass')
+        self.admin = User.objects.create_user(username='batch-admin', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.customers = [
+            Customer.objects.create(full_name=f'Batch {index}', phone_number=str(index), address='A') for index in range(3)
+        ]
+        self.products = [
+            Product.objects.create(brand='B', category='C', name=f'Batch P{index}', price=5, quantity_healthy=5)
+            for index in range(3)
+        ]
+
+    def sale(self, customer, *lines):
+        return {
+            'customer': customer.id,
+            'items': [{'product': product.id, 'quantity': quantity, 'price': '2.50'} for product, quantity in lines],
+        }
+
+    def post(self, sales):
+        return self.client.post(reverse('sale-batch-create'), {'sales': sales}, format='json')
+
+    def test_sales_are_applied_in_order_with_per_sale_results(self):
+        first, second, third = self.products
+        response = self.post([
+            self.sale(self.customers[0], (first, 3), (second, 1)),
+            self.sale(self.customers[1], (first, 3)),                 # qoldiq 2 - rad etiladi
+            self.sale(self.customers[0], (first, 2), (third, 4)),
+            {'customer': 999999, 'items': [{'product': first.id, 'quantity': 1, 'price': '1.00'}]},
+            {'customer': self.customers[2].id, 'items': []},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['rejected']), (2, 3))
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'rejected', 'created', 'rejected', 'rejected'])
+        self.assertIn('yetarli emas', results[1]['errors']['error'])
+        self.assertIn('customer', results[3]['errors'])
+        self.assertIn('items', results[4]['errors'])
+
+        self.assertEqual(
+            [Product.objects.get(pk=product.pk).quantity_healthy for product in self.products], [0, 4, 1]
+        )
+        self.customers[0].refresh_from_db()
+        self.assertEqual(self.customers[0].debt, Decimal('25.00'))
+        self.assertEqual(Sale.objects.count(), 2)
+        self.assertEqual(list(Sale.objects.values_list('seller', flat=True).distinct()), [self.admin.id])
+        self.assertEqual(CustomerLedgerEntry.objects.filter(customer=self.customers[0]).count(), 2)
+        rollup = DailySalesRollup.objects.aggregate(amount=Sum('sales_amount'), count=Sum('sales_count'))
+        self.assertEqual((Decimal(rollup['amount']).quantize(Decimal('0.01')), rollup['count']), (Decimal('25.00'), 2))
+        self.assertEqual(StockMovement.objects.filter(movement_type='sale').aggregate(total=Sum('delta'))['total'], -10)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        for product in self.products:
+            Product.objects.filter(pk=product.pk).update(quantity_healthy=1000)
+
+        def queries_for(size):
+            sales = [self.sale(self.customers[index % 3], (self.products[index % 3], 1)) for index in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(sales)
+            self.assertEqual(response.data['created'], size)
+            return len(queries)
+
+        self.assertEqual(queries_for(3), queries_for(30))
+        # Ikkinchi paket mavjud yig'ma qatorlarini oshiradi (bulk_increment)
+        self.assertEqual(DailySalesRollup.objects.aggregate(count=Sum('sales_count'))['count'], 33)
+        self.assertEqual(
+            [Product.objects.get(pk=product.pk).quantity_healthy for product in self.products], [989, 989, 989]
+        )
+
+    def test_batch_size_is_limited(self):
+        response = self.post([self.sale(self.customers[0], (self.products[0], 1))] * 501)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PaymentImportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.accountant = User.objects.create_user(username='buxgalter', password='testpass')
+        self.accountant.groups.add(Group.objects.create(name='Buxgalterlar'))
+        self.client.force_authenticate(self.accountant)
+        self.ali = Customer.objects.create(full_name='Ali Valiyev', phone_number='+998 90 111-22-33', address='A', debt=100)
+        self.vali = Customer.objects.create(full_name='Vali Aliyev', phone_number='998901234567', address='B', debt=50)
+
+    def upload(self, content, name='statement.csv', **data):
+        data['file'] = SimpleUploadedFile(name, content)
+        return self.client.post(reverse('payment-import'), data, format='multipart')
+
+    def test_lines_are_matched_and_rejected_rows_reported(self):
+        content = (
+            "customer_id,phone_number,full_name,amount\n"
+            f"{self.ali.id},,,40\n"
+            ",998901112233,,\"1 000,50\"\n"           # 3: qarzdan oshadi
+            ",,vali  aliyev,20.25\n"
+            "999999,,,5\n"                            # 5: mijoz yo'q
+            f"{self.vali.id},,,abc\n"                 # 6: noto'g'ri summa
+            ",+998 90 111 22 33,,60\n"
+            ",,,10\n"                                 # 8: mijoz ko'rsatilmagan
+            f"{self.vali.id},,,29.755\n"              # 9: 2 xonadan ko'p kasr
+        ).encode()
+        response = self.upload(content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data['rows'], response.data['created'], response.data['rejected'], response.data['total_amount']),
+            (8, 3, 5, '120.25'),
+        )
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 5, 6, 8, 9])
+        self.assertIn('oshib ketadi', response.data['errors'][0]['errors'][0])
+
+        self.ali.refresh_from_db()
+        self.vali.refresh_from_db()
+        self.assertEqual((self.ali.debt, self.vali.debt), (Decimal('0.00'), Decimal('29.75')))
+        self.assertEqual(Payment.objects.count(), 3)
+        self.assertEqual(CustomerLedgerEntry.objects.filter(entry_type=CustomerLedgerEntry.ENTRY_PAYMENT).count(), 3)
+        rollup = DailySalesRollup.objects.aggregate(amount=Sum('payments_amount'), count=Sum('payments_count'))
+        self.assertEqual((Decimal(rollup['amount']).quantize(Decimal('0.01')), rollup['count']), (Decimal('120.25'), 3))
+
+    def test_xlsx_dry_run_and_constant_query_count(self):
+        def workbook(rows):
+            output = BytesIO()
+            pd.DataFrame(rows, columns=['phone_number', 'amount']).to_excel(output, index=False)
+            return output.getvalue()
+
+        response = self.upload(workbook([['998901234567', 10]]), name='statement.xlsx', dry_run='true')
+        self.assertEqual((response.data['created'], response.data['rejected']), (1, 0))
+        self.assertFalse(Payment.objects.exists())
+
+        def queries_for(count):
+            content = workbook([['998901234567', '0.01']] * count)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.upload(content, name='statement.xlsx')
+            self.assertEqual(response.data['created'], count)
+            return len(queries)
+
+        self.assertEqual(queries_for(2), queries_for(20))
+        self.vali.refresh_from_db()
+        self.assertEqual(self.vali.debt, Decimal('49.78'))
+
+    def test_unsupported_file_is_rejected(self):
+        response = self.upload(b'amount\n1\n', name='statement.txt')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.upload(b'amount\n1\n')
+        self.assertIn('mijoz ustuni', response.data['error'])
+
+
+class ProductSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='search-user', password='testpass'))
+        for name, brand, category in [
+            ('Samsung Galaxy A54', 'Samsung', 'Telefon'),
+            ('Galaxy Buds', 'Samsung', 'Quloqchin'),
+            ('iPhone 15', 'Apple', 'Telefon'),
+            ('Redmi Note 13', 'Xiaomi', 'Telefon'),
+        ]:
+            Product.objects.create(name=name, brand=brand, category=category, price=10)
+        # Xotiradagi indeks ma'lumot versiyasi o'zgarganda qayta quriladi
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version()
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('product-search'), {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['name'] for product in response.data]
+
+    def test_prefix_matches_rank_first_and_typos_are_tolerated(self):
+        self.assertEqual(self.search('galaxy'), ['Galaxy Buds', 'Samsung Galaxy A54'])
+        self.assertEqual(self.search('  SAMS  '), ['Samsung Galaxy A54', 'Galaxy Buds'])
+        self.assertEqual(self.search('samsnug'), ['Galaxy Buds', 'Samsung Galaxy A54'])
+        self.assertEqual(self.search('telefon', limit=2), ['iPhone 15', 'Redmi Note 13'])
+        self.assertEqual(self.search('note 1'), ['Redmi Note 13'])
+        self.assertEqual(self.search('nokia'), [])
+
+    def test_index_follows_data_version_and_query_is_required(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_authenticate(User.objects.create_user(username='search-admin', is_staff=True))
+            self.client.post(reverse('product-list'), {
+                'name': 'Nokia 3310', 'brand': 'Nokia', 'category': 'Telefon', 'price': '20.00',
+            }, format='json')
+        self.assertEqual(self.search('nokia'), ['Nokia 3310'])
+        response = self.client.get(reverse('product-search'), {'q': ' '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_is_rebuilt_only_for_catalogue_changes(self):
+        self.assertEqual(sorted(self.search('alax')), ['Galaxy Buds', 'Samsung Galaxy A54'])
+        index = product_index()
+        self.client.force_authenticate(User.objects.create_user(username='search-manager', is_staff=True))
+        product = Product.objects.get(name='Galaxy Buds')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('receipt-create'), {'product': product.id, 'quantity': 3}, format='json')
+            self.client.patch(reverse('product-detail', args=[product.id]), {'price': '12.00'}, format='json')
+        self.assertIs(product_index(), index)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('product-detail', args=[product.id]), {'name': 'Galaxy Buds Pro'}, format='json')
+        self.assertIsNot(product_index(), index)
+        self.assertEqual(self.search('buds pro'), ['Galaxy Buds Pro'])
+
+
+class TableVersionETagTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='etag-admin', password='testpass', is_staff=True))
+        self.product = Product.objects.create(name='ETag P', brand='B', category='C', price=10, quantity_healthy=5)
+        self.customer = Customer.objects.create(full_name='ETag C', phone_number='1', address='A', debt=20)
+
+    def test_unchanged_table_returns_304_without_reading_rows(self):
+        for url in (
+            reverse('product-list'), reverse('customer-list'),
+            reverse('product-detail', args=[self.product.pk]), reverse('product-price', args=[self.product.pk]),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response['ETag']
+            self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+            # Faqat versiya o'qiladi (DatabaseCache) - asosiy so'rov va serializer ishlamaydi
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+        self.assertNotEqual(
+            self.client.get(reverse('product-detail', args=[self.product.pk]))['ETag'],
+            self.client.get(reverse('product-price', args=[self.product.pk]))['ETag'],
+        )
+
+    def test_writes_change_only_the_tables_they_touch(self):
+        products_etag = self.client.get(reverse('product-list'))['ETag']
+        customers_etag = self.client.get(reverse('customer-list'))['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('payment-create'), {'customer': self.customer.id, 'amount': '5.00'}, format='json')
+        self.assertEqual(self.client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=products_etag).status_code, 304)
+        response = self.client.get(reverse('customer-list'), HTTP_IF_NONE_MATCH=customers_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['debt'], '15.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('receipt-create'), {'product': self.product.id, 'quantity': 3}, format='json')
+        response = self.client.get(reverse('product-detail', args=[self.product.pk]), HTTP_IF_NONE_MATCH=products_etag)
+        self.assertEqual(response.data['quantity_healthy'], 8)
+        response = self.client.get(reverse('product-price', args=[999999]))
+        self.assertEqual((response.status_code, response.data), (404, {'error': 'Mahsulot topilmadi'}))
+
+
+class SalesListFieldsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='fields-admin', password='testpass', is_staff=True))
+        self.customer = Customer.objects.create(full_name='Fields Customer', phone_number='1', address='A')
+        product = Product.objects.create(brand='B', category='C', name='Fields P', price=5, quantity_healthy=100)
+        for quantities in ((1, 2), (3,), ()):
+            sale = Sale.objects.create(customer=self.customer, seller=User.objects.first())
+            for quantity in quantities:
+                SaleItem.objects.create(sale=sale, product=product, quantity=quantity, price='2.50')
+            refresh_sale_totals([sale.pk])
+
+    def get(self, **params):
+        return self.client.get(reverse('sales-list'), params)
+
+    def test_summary_computes_totals_in_one_query(self):
+        for size in (3, 13):
+            with self.assertNumQueries(1):
+                response = self.get(view='summary')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), size)
+            for _ in range(10):
+                Sale.objects.create(customer=self.customer, seller=User.objects.first())
+
+        rows = sorted(self.get(view='summary').data['results'], key=lambda row: row['id'])[:3]
+        self.assertEqual(
+            [(row['total_amount'], row['item_count'], row['customer_name']) for row in rows],
+            [('7.50', 2, 'Fields Customer'), ('7.50', 1, 'Fields Customer'), ('0.00', 0, 'Fields Customer')],
+        )
+        self.assertEqual(
+            set(rows[0]), {'id', 'created_at', 'status', 'customer', 'customer_name', 'seller', 'total_amount', 'item_count'}
+        )
+
+    def test_sparse_fieldsets_skip_unrequested_relations(self):
+        with self.assertNumQueries(1):
+            response = self.get(fields='id,status')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status'})
+
+        with self.assertNumQueries(1):
+            response = self.get(view='summary', fields='id,total_amount')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'total_amount'})
+
+        with self.assertNumQueries(2):  # sotuvlar + mahsulot qatorlari
+            response = self.get(fields='id,items')
+        self.assertEqual(len(response.data['results'][-1]['items']), 2)
+
+        response = self.get(fields='id,address')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('address', response.data['fields'])
+
+
+class SaleTotalsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='totals-admin', password='testpass', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.customer = Customer.objects.create(full_name='Totals Customer', phone_number='1', address='A')
+        self.products = [
+            Product.objects.create(brand='B', category='C', name=f'Totals P{index}', price=5, quantity_healthy=100)
+            for index in range(2)
+        ]
+
+    def lines(self, *quantities):
+        return [
+            {'product': product.id, 'quantity': quantity, 'price': '2.50'}
+            for product, quantity in zip(self.products, quantities)
+        ]
+
+    def test_created_sales_store_totals_and_admin_edits_refresh_them(self):
+        response = self.client.post(reverse('sale-create'), {'customer': self.customer.id, 'items': self.lines(2, 3)}, format='json')
+        sale = Sale.objects.get(pk=response.data['id'])
+        self.assertEqual((sale.total_amount, sale.item_count), (Decimal('12.50'), 2))
+        self.client.post(reverse('sale-batch-create'), {'sales': [
+            {'customer': self.customer.id, 'items': self.lines(1)},
+            {'customer': self.customer.id, 'items': self.lines(4, 4)},
+        ]}, format='json')
+        self.assertEqual(
+            list(Sale.objects.exclude(pk=sale.pk).order_by('pk').values_list('total_amount', 'item_count')),
+            [(Decimal('2.50'), 1), (Decimal('20.00'), 2)],
+        )
+
+        item = sale.items.order_by('pk').first()
+        item.quantity = 10
+        request = mock.Mock(user=self.admin)
+        SaleItemAdmin(SaleItem, admin.site).save_model(request, item, form=None, change=True)
+        sale.refresh_from_db()
+        self.assertEqual((sale.total_amount, sale.item_count), (Decimal('32.50'), 2))
+        self.assertEqual(CustomerLedgerEntry.objects.get(sale=sale).debit, Decimal('32.50'))
+        self.assertEqual(verify_sale_totals(), (3, []))
+
+    def test_command_reports_and_backfills_drift(self):
+        self.client.post(reverse('sale-create'), {'customer': self.customer.id, 'items': self.lines(2, 3)}, format='json')
+        Sale.objects.update(total_amount=0, item_count=0)
+
+        with self.assertRaisesMessage(CommandError, '1 tasida'):
+            call_command('sale_totals', verify=True, stdout=StringIO())
+        output = StringIO()
+        data_version = get_data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('sale_totals', backfill=True, verify=True, chunk_size=1, stdout=output)
+        self.assertEqual(list(Sale.objects.values_list('total_amount', 'item_count')), [(Decimal('12.50'), 2)])
+        self.assertNotEqual(get_data_version(), data_version)
+        self.assertIn('rebuild_sales_rollup', output.getvalue())
+
+
+class DashboardTrendsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='trends-admin', password='testpass', is_staff=True)
+        self.other_seller = User.objects.create_user(username='trends-seller', password='testpass')
+        self.client.force_authenticate(self.admin)
+        self.customer = Customer.objects.create(full_name='Trends Customer', phone_number='1', address='A')
+        self.other_customer = Customer.objects.create(full_name='Trends Other', phone_number='2', address='B')
+        self.product = Product.objects.create(brand='B', category='C', name='Trends P', price=5, quantity_healthy=100)
+        self.today = timezone.localdate()
+
+        self.sale(self.customer, self.admin, '10.50', days_ago=0)
+        self.sale(self.customer, self.admin, '4.25', days_ago=0, status='yuborildi')
+        self.sale(self.other_customer, self.other_seller, '7.00', days_ago=3)
+        DailySalesRollup.objects.create(day=self.today - timedelta(days=1), customer=self.customer, payments_amount='3.30')
+        DailySalesRollup.objects.create(day=self.today - timedelta(days=3), customer=self.other_customer, payments_amount='1.00')
+        DailySalesRollup.objects.create(
+            day=self.today, customer=self.customer, product=self.product,
+            returns_healthy_quantity=2, returns_defective_quantity=1,
+        )
+
+    def sale(self, customer, seller, amount, days_ago, status='yaratildi'):
+        sale = Sale.objects.create(customer=customer, seller=seller, status=status, total_amount=amount, item_count=1)
+        Sale.objects.filter(pk=sale.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+
+    def get(self, days=5, **params):
+        start_date = (self.today - timedelta(days=days - 1)).isoformat()
+        return self.client.get(reverse('dashboard-trends'), {'start_date': start_date, 'end_date': self.today.isoformat(), **params})
+
+    def test_daily_series_fills_empty_buckets_in_constant_queries(self):
+        with self.assertNumQueries(2):
+            response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        buckets = {row['period']: row for row in response.data['buckets']}
+        self.assertEqual(len(buckets), 5)
+        self.assertEqual(buckets[self.today.isoformat()], {
+            'period': self.today.isoformat(), 'sales_amount': '14.75', 'sales_count': 2,
+            'payments_amount': '0.00', 'returns_quantity': 3,
+        })
+        self.assertEqual(buckets[(self.today - timedelta(days=1)).isoformat()]['payments_amount'], '3.30')
+        self.assertEqual(buckets[(self.today - timedelta(days=2)).isoformat()]['sales_count'], 0)
+        self.assertEqual(buckets[(self.today - timedelta(days=3)).isoformat()]['sales_amount'], '7.00')
+
+        with self.assertNumQueries(2):
+            response = self.get(days=365)
+        self.assertEqual(len(response.data['buckets']), 365)
+
+        response = self.get(days=60, interval='month')
+        self.assertEqual(response.data['buckets'][0]['period'], (self.today - timedelta(days=59)).replace(day=1).isoformat())
+        self.assertEqual(sum(int(row['sales_count']) for row in response.data['buckets']), 3)
+
+    def test_sale_filters_and_validation(self):
+        rows = self.get(customer=self.customer.id, status='yaratildi').data['buckets']
+        self.assertEqual(sum(row['sales_count'] for row in rows), 1)
+        self.assertEqual(sum(Decimal(row['payments_amount']) for row in rows), Decimal('3.30'))
+
+        rows = self.get(seller=self.other_seller.id).data['buckets']
+        self.assertEqual([row['sales_amount'] for row in rows if row['sales_count']], ['7.00'])
+
+        self.assertEqual(self.get(interval='year').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(days=1500).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(seller='x').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ColumnarExportTest(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='columnar-seller', password='testpass')
+        self.customer = Customer.objects.create(full_name='Columnar Customer', phone_number='1', address='A')
+        self.product = Product.objects.create(brand='B', category='C', name='Columnar P', price=5, quantity_healthy=100)
+        self.moments = [
+            timezone.make_aware(timezone.datetime(2026, 1, 30, 12)),
+            timezone.make_aware(timezone.datetime(2026, 1, 31, 23)),
+            timezone.make_aware(timezone.datetime(2026, 2, 1, 8)),
+            timezone.make_aware(timezone.datetime(2026, 3, 5, 9)),
+        ]
+        for moment in self.moments:
+            sale = Sale.objects.create(customer=self.customer, seller=self.seller, total_amount='5.00', item_count=2)
+            SaleItem.objects.create(sale=sale, product=self.product, quantity=1, price='2.00')
+            SaleItem.objects.create(sale=sale, product=self.product, quantity=1, price='3.00')
+            payment = Payment.objects.create(customer=self.customer, amount='1.50')
+            Sale.objects.filter(pk=sale.pk).update(created_at=moment)
+            Payment.objects.filter(pk=payment.pk).update(created_at=moment)
+        self.until = timezone.make_aware(timezone.datetime(2026, 4, 1))
+
+    def test_batches_follow_keyset_chunks_and_month_partitions(self):
+        batches = list(COLUMNAR_DATASETS['payments'].batches(None, self.until, batch_size=3))
+        self.assertEqual([(month, len(columns['id'])) for month, columns in batches], [
+            ('2026-01', 2), ('2026-02', 1), ('2026-03', 1),
+        ])
+        self.assertEqual(batches[0][1]['amount'], [Decimal('1.50')] * 2)
+
+        since = self.moments[2]
+        with self.assertNumQueries(3):  # sotuvlar bo'lagi + qatorlar, so'ng bo'sh bo'lak
+            batches = list(COLUMNAR_DATASETS['sale_items'].batches(since, self.until, batch_size=2))
+        self.assertEqual([(month, len(columns['id'])) for month, columns in batches], [('2026-02', 2), ('2026-03', 2)])
+        self.assertEqual(batches[0][1]['price'], [Decimal('2.00'), Decimal('3.00')])
+
+    @skipIf(pa is None, "pyarrow o'rnatilmagan")
+    def test_incremental_export_writes_only_new_rows(self):
+        import pyarrow.parquet as pq
+
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        first = export_dataset(output, 'sales', until=self.moments[3])
+        self.assertEqual(first['rows'], 3)
+        self.assertEqual(pq.read_table(f'{output}/sales/month=2026-01').num_rows, 2)
+
+        second = export_dataset(output, 'sales', until=self.until)
+        self.assertEqual((second['rows'], second['since']), (1, self.moments[3]))
+        self.assertEqual(pq.read_table(f'{output}/sales').num_rows, 4)
+
+
+class CustomerImportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='customer-importer', password='testpass', is_staff=True))
+        self.existing = Customer.objects.create(full_name='Ali  Valiyev', phone_number='+998 90 123-45-67', address='Toshkent', debt=50)
+        Customer.objects.create(full_name='Ali Valiyev', phone_number='+998 91 000-00-00', address='Samarqand')
+
+    def test_import_dedupes_on_normalized_phone_and_name(self):
+        self.assertEqual(self.existing.dedupe_key, '998901234567|ali valiyev')
+        rows = [
+            {'full_name': 'ali valiyev', 'phone_number': 901234567, 'address': 'Chilonzor'},
+            {'full_name': 'Vali Aliyev', 'phone_number': '93 555 44 33', 'debt': 10},
+            {'full_name': 'Vali  Aliyev', 'phone_number': '+998935554433', 'debt': 12},
+            {'full_name': '', 'phone_number': '1'},
+        ]
+        response = self.client.post(reverse('customer-import'), {'file': make_excel_upload(rows)}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ('rows', 'created', 'updated', 'skipped', 'duplicates')},
+            {'rows': 4, 'created': 1, 'updated': 1, 'skipped': 1, 'duplicates': 1},
+        )
+
+        self.existing.refresh_from_db()
+        # Faylda qarz ustuni bo'sh bo'lgani uchun qarz o'zgarmaydi
+        self.assertEqual((self.existing.address, self.existing.debt), ('Chilonzor', Decimal('50.00')))
+        created = Customer.objects.get(dedupe_key='998935554433|vali aliyev')
+        self.assertEqual((created.full_name, created.debt), ('Vali Aliyev', Decimal('12.00')))
+        self.assertEqual(Customer.objects.count(), 3)
+
+        # Qayta import: hech narsa yaratilmaydi
+        response = self.client.post(reverse('customer-import'), {'file': make_excel_upload(rows)}, format='multipart')
+        self.assertEqual((response.data['created'], response.data['unchanged']), (0, 2))
+
+    def test_chunks_use_constant_queries_and_see_earlier_chunks(self):
+        rows = [{'full_name': f'Mijoz {index % 3}', 'phone_number': f'90{index % 3:07d}'} for index in range(9)]
+        # Har bir bo'lak: mavjudlarni olish + INSERT/UPDATE; atomic uchun savepoint'lar
+        with CaptureQueriesContext(connection) as queries:
+            result = upsert_customers(rows, chunk_size=3)
+        self.assertEqual((result['created'], result['unchanged'], result['duplicates']), (3, 6, 0))
+        self.assertLessEqual(len(queries), 3 * 3 + 2)
+        self.assertEqual(Customer.objects.filter(full_name__startswith='Mijoz').count(), 3)
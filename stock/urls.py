@@ -1,18 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    UserViewSet, GroupListView, CurrentUserAPIView, ReturnedProductViewSet,
-    ProductListAPIView, ProductDetailAPIView, ProductTransferAPIView, ProductExportAPIView, ProductImportAPIView, ProductPriceAPIView,
+    UserViewSet, GroupListView, CurrentUserAPIView, ReturnedProductViewSet, JobViewSet,
+    ProductListAPIView, ProductSearchAPIView, ProductDetailAPIView, ProductTransferAPIView, ProductExportAPIView, ProductImportAPIView, ProductPriceAPIView,
     CustomerListAPIView, CustomerExportAPIView, CustomerImportAPIView, CustomerReconciliationAPIView,
-    SalesListAPIView, SaleDetailAPIView, SaleExportAPIView, SaleCreateAPIView, SaleStatusUpdateAPIView,
-    PaymentCreateAPIView, GoodsReceiptCreateAPIView,
-    DashboardStatsAPIView
+    SalesListAPIView, SaleDetailAPIView, SaleExportAPIView, SaleCreateAPIView, SaleBatchCreateAPIView, SaleStatusUpdateAPIView,
+    PaymentCreateAPIView, PaymentImportAPIView, GoodsReceiptCreateAPIView,
+    DashboardStatsAPIView, DashboardTrendsAPIView, DashboardCacheStatsAPIView
 )
 
 # 1. "Kombayn"lar (ViewSet'lar) uchun router
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'returns', ReturnedProductViewSet, basename='returnedproduct')
+router.register(r'jobs', JobViewSet, basename='job')
 
 # 2. "Kurak"lar (oddiy View'lar) uchun standart ro'yxat
 urlpatterns = [
@@ -24,9 +25,12 @@ urlpatterns = [
 
     # Dashboard
     path('dashboard-stats/', DashboardStatsAPIView.as_view(), name='dashboard-stats'),
+    path('dashboard-stats/trends/', DashboardTrendsAPIView.as_view(), name='dashboard-trends'),
+    path('dashboard-stats/cache/', DashboardCacheStatsAPIView.as_view(), name='dashboard-cache-stats'),
 
     # Mahsulotlar
     path('products/', ProductListAPIView.as_view(), name='product-list'),
+    path('products/search/', ProductSearchAPIView.as_view(), name='product-search'),
     path('products/<int:pk>/', ProductDetailAPIView.as_view(), name='product-detail'),
     path('products/export/', ProductExportAPIView.as_view(), name='product-export'),
     path('products/import/', ProductImportAPIView.as_view(), name='product-import'),
@@ -45,9 +49,11 @@ urlpatterns = [
     path('sales/<int:pk>/update-status/', SaleStatusUpdateAPIView.as_view(), name='sale-update-status'),
     path('sales/export/', SaleExportAPIView.as_view(), name='sale-export'),
     path('sales/create/', SaleCreateAPIView.as_view(), name='sale-create'),
+    path('sales/batch/', SaleBatchCreateAPIView.as_view(), name='sale-batch-create'),
 
     # To'lovlar
     path('payments/create/', PaymentCreateAPIView.as_view(), name='payment-create'),
+    path('payments/import/', PaymentImportAPIView.as_view(), name='payment-import'),
 
     # Tovar kirimi
     path('receipts/create/', GoodsReceiptCreateAPIView.as_view(), name='receipt-create'),
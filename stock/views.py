@@ -2,25 +2,50 @@
 
 from django.db import transaction
 from django.contrib.auth.models import User
-from django.http import HttpResponse
-import pandas as pd
-from io import BytesIO
-from django.db.models import Sum, Count, F, Q
+from django.http import Http404, StreamingHttpResponse, FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.db.models import Sum, F, Q, Prefetch
 from django.utils import timezone
 from datetime import timedelta
 # --- O'zgartirilgan importlar ---
 from rest_framework import generics, status, serializers  # <-- serializers to‘liq import qilindi
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework import viewsets
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework import viewsets, mixins
+from rest_framework.decorators import action
+from rest_framework.settings import api_settings
 # --------------------------------
 from django.contrib.auth.models import Group
-from .permissions import IsAdminUser, IsProductManager
+from .permissions import IsAdminUser, IsProductManager, in_group
 from .serializers import UserListSerializer, UserCreateSerializer, GroupSerializer, UserSerializer
 from .serializers import SaleStatusUpdateSerializer # <-- Importlarga qo'shing
-from .models import Product, Customer, Sale, SaleItem, Payment, GoodsReceipt, ReturnedProduct
+from .models import (
+    Product, Customer, Sale, SaleItem, Payment, ReturnedProduct, Job, DailySalesRollup, StockMovement
+)
 from .filters import SaleFilter, ReturnedProductFilter
+from .renderers import CSVRenderer, XLSXRenderer
+from .imports import (
+    PRODUCT_REQUIRED_COLUMNS, CUSTOMER_REQUIRED_COLUMNS, ImportFileError,
+    read_import_rows, bulk_upsert_products, upsert_customers
+)
+from .rollups import record_sale, record_payment, record_return
+from .ledger import record_sale_entry, record_payment_entry, balance_before, entries_between
+from .notifications import queue_group_notification
+from .sale_batch import create_sale_batch
+from .sale_totals import lines_totals
+from .payment_import import import_payments
+from .analytics import sales_trend
+from .search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, catalogue_values, normalize_query, search_products
+from .movements import QUANTITY_FIELDS, change_stock, movement, quantity_change_movements, record_movements, transfer_stock
+from .cache import (
+    bump_data_version, table_etag, dashboard_cache_key, get_cached_dashboard, set_cached_dashboard, dashboard_cache_stats
+)
+from .pagination import IdCursorPagination, SaleCursorPagination, ReturnedProductCursorPagination, JobCursorPagination
+from .exports import (
+    PRODUCT_EXPORT_HEADERS, CUSTOMER_EXPORT_HEADERS, SALE_EXPORT_HEADERS, CSV_CONTENT_TYPE, XLSX_CONTENT_TYPE,
+    product_export_rows, customer_export_rows, sale_export_rows, stream_csv, write_xlsx
+)
 from .serializers import UserUpdateSerializer
 from .permissions import IsSotuvchi, IsOmborchi, IsBuxgalter
 from rest_framework.permissions import IsAuthenticated # Bu ham kerak bo'ladi
@@ -28,32 +53,153 @@ from .serializers import (
     ProductSerializer,
     CustomerSerializer,
     SaleSerializer,
+    SaleBatchSerializer,
     PaymentSerializer,
     GoodsReceiptSerializer,
     SalesListSerializer,
-    ReturnedProductSerializer
+    SaleSummarySerializer,
+    SalesTrendQuerySerializer,
+    ReturnedProductSerializer,
+    JobSerializer,
+    JobCreateSerializer
 )
 
+def sales_with_details(fields=None):
+    """
+    SalesListSerializer uchun kerakli barcha bog'liq ma'lumotlarni (mijoz, sotuvchi va uning
+    guruhlari, mahsulot qatorlari) sotuvlar soniga bog'liq bo'lmagan, o'zgarmas sondagi so'rovlarda oladi.
+    `fields` berilsa, faqat shu maydonlar uchun kerakli jadvallar o'qiladi.
+    """
+    fields = set(SalesListSerializer.Meta.fields if fields is None else fields)
+    queryset = Sale.objects.all()
+    related = [name for name in ('customer', 'seller') if name in fields]
+    if related:
+        queryset = queryset.select_related(*related)
+    if 'seller' in fields:
+        queryset = queryset.prefetch_related('seller__groups')
+    if 'items' in fields:
+        queryset = queryset.prefetch_related(Prefetch('items', queryset=SaleItem.objects.select_related('product')))
+    return queryset
+
+
+def sale_summaries(fields=None):
+    """
+    SaleSummarySerializer uchun so'rov: faqat kerakli ustunlar, mijoz ismi JOIN orqali. Jami summa
+    va qatorlar soni sotuvning o'zida saqlanadi - sotuv qatorlari o'qilmaydi.
+    """
+    fields = set(SaleSummarySerializer.Meta.fields if fields is None else fields)
+    # Keyset sahifalash created_at va id'ni o'qiydi - ular har doim olinadi
+    columns = ['id', 'created_at', *(
+        name for name in ('status', 'customer', 'seller', 'total_amount', 'item_count') if name in fields
+    )]
+    queryset = Sale.objects.all()
+    if 'customer_name' in fields:
+        queryset = queryset.select_related('customer')
+        columns.append('customer__full_name')
+    return queryset.only(*columns)
+
+
+class TableVersionETagMixin:
+    """
+    GET javobiga `etag_models` jadvallari versiyasidan tuzilgan kuchli ETag qo'yadi. So'rovdagi
+    `If-None-Match` mos kelsa, ruxsatlar tekshirilgach, serializer va asosiy so'rovsiz 304 qaytadi.
+    """
+    etag_models = ()
+    etag_prefix = ''
+
+    def get_etag(self, request, *args, **kwargs):
+        # Bir URL turli formatda (JSON, browsable API) qaytishi mumkin - format ham ETag'ga kiradi
+        return table_etag(self.etag_models, self.etag_prefix, *kwargs.values(), request.accepted_renderer.format)
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Klient har safar tekshiradi (no-cache), lekin o'zgarmagan javobni qayta yuklamaydi
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+
 # --- MAHSULOTLAR, MIJOZLAR, NARXLAR RO‘YXATI --- #
-class ProductListAPIView(generics.ListCreateAPIView):
+class ProductListAPIView(TableVersionETagMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = IdCursorPagination
+    etag_models = (Product,)
+    etag_prefix = 'products'
 
     def get_permissions(self):
         if self.request.method == 'GET':
             return [IsAuthenticated()]
         return [IsProductManager()]
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        product = serializer.save()
+        record_movements(quantity_change_movements(product, 0, 0, StockMovement.TYPE_OPENING))
+        bump_data_version(Product, catalogue=True)
+
+
+class ProductSearchAPIView(APIView):
+    """
+    `?q=` bo'yicha nomi, brendi va kategoriyasi mos keladigan mahsulotlar (eng mosi birinchi).
+    Sahifalanmaydi - faqat `limit` ta (standart 20, ko'pi bilan 50) natija qaytadi.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '')
+        if not normalize_query(query):
+            return Response({"error": "'q' parametri bo'sh."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"error": "'limit' butun son bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), SEARCH_MAX_LIMIT)
+
+        ids = search_products(query, limit)
+        products = Product.objects.in_bulk(ids)
+        results = [products[pk] for pk in ids if pk in products]
+        return Response(ProductSerializer(results, many=True).data)
 
-class ProductDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+
+class ProductDetailAPIView(TableVersionETagMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    etag_models = (Product,)
+    etag_prefix = 'product'
 
     def get_permissions(self):
         if self.request.method == 'GET':
             return [IsAuthenticated()]
         return [IsProductManager()]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in ('PUT', 'PATCH'):
+            # Qoldiq farqi harakat sifatida yoziladi - o'qish va yozish orasida parallel sotuv kirmasin
+            queryset = queryset.select_for_update()
+        return queryset
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        old_healthy, old_defective = serializer.instance.quantity_healthy, serializer.instance.quantity_defective
+        old_catalogue = catalogue_values(serializer.instance)
+        product = serializer.save()
+        record_movements(quantity_change_movements(product, old_healthy, old_defective, StockMovement.TYPE_ADJUSTMENT))
+        bump_data_version(Product, catalogue=catalogue_values(product) != old_catalogue)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_data_version(Product, catalogue=True)
+
 
 class ProductTransferAPIView(APIView):
     permission_classes = [IsProductManager]
@@ -80,35 +226,35 @@ class ProductTransferAPIView(APIView):
         if quantity <= 0:
             return Response({'error': "Miqdor 0 dan katta bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
 
-        from_field = 'quantity_healthy' if from_condition == ReturnedProduct.CONDITION_HEALTHY else 'quantity_defective'
-        to_field = 'quantity_defective' if to_condition == ReturnedProduct.CONDITION_DEFECTIVE else 'quantity_healthy'
-
         with transaction.atomic():
-            current_from = getattr(product, from_field, 0) or 0
-            if current_from < quantity:
+            if not transfer_stock(product.pk, from_condition, to_condition, quantity):
                 return Response({'error': "Ko'chirish uchun yetarli qoldiq mavjud emas."}, status=status.HTTP_400_BAD_REQUEST)
+            bump_data_version(Product)
 
-            setattr(product, from_field, current_from - quantity)
-            current_to = getattr(product, to_field, 0) or 0
-            setattr(product, to_field, current_to + quantity)
-            product.save(update_fields=[from_field, to_field])
-
+        product.refresh_from_db()
         return Response(ProductSerializer(product).data, status=status.HTTP_200_OK)
 
 
-class CustomerListAPIView(generics.ListAPIView):
+class CustomerListAPIView(TableVersionETagMixin, generics.ListAPIView):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    pagination_class = IdCursorPagination
     permission_classes = [IsAuthenticated] # Tizimga kirgan hamma ko'ra olsin
+    etag_models = (Customer,)
+    etag_prefix = 'customers'
 
 
-class ProductPriceAPIView(APIView):
-    def get(self, request, pk):
+class ProductPriceAPIView(TableVersionETagMixin, generics.RetrieveAPIView):
+    queryset = Product.objects.only('id', 'price')
+    etag_models = (Product,)
+    etag_prefix = 'product-price'
+
+    def retrieve(self, request, *args, **kwargs):
         try:
-            product = Product.objects.get(pk=pk)
-            return Response({'price': product.price})
-        except Product.DoesNotExist:
+            product = self.get_object()
+        except Http404:
             return Response({'error': 'Mahsulot topilmadi'}, status=404)
+        return Response({'price': product.price})
 
 
 # --- SOTUV YARATISH VIEW --- #
@@ -131,32 +277,72 @@ class SaleCreateAPIView(generics.CreateAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        sale = Sale.objects.create(customer=customer, seller=default_seller)
-        total_debt_increase = 0
+        total_amount, item_count = lines_totals(items_data)
+        sale = Sale.objects.create(
+            customer=customer, seller=default_seller, total_amount=total_amount, item_count=item_count
+        )
 
+        # Bir mahsulot bir necha qatorda kelsa, umumiy miqdor bo'yicha tekshiramiz
+        needed = {}
         for item_data in items_data:
             product = item_data['product']
-            quantity = item_data['quantity']
-            price = item_data['price']
-
-            if product.quantity_healthy < quantity:
+            needed[product.pk] = needed.get(product.pk, 0) + item_data['quantity']
+
+        # Qoldiq shartli UPDATE bilan kamaytiriladi: tekshirish va yozish bitta atomar amal,
+        # shuning uchun parallel sotuvlar bir xil qoldiqni ikki marta sota olmaydi.
+        # Mahsulotlar id tartibida yangilanadi - qatorlar qulfi doim bir xil tartibda olinadi (deadlock bo'lmaydi).
+        for product_id in sorted(needed):
+            updated = Product.objects.filter(pk=product_id, quantity_healthy__gte=needed[product_id]).update(
+                quantity_healthy=F('quantity_healthy') - needed[product_id]
+            )
+            if not updated:
+                product = Product.objects.only('name', 'quantity_healthy').get(pk=product_id)
                 raise serializers.ValidationError(
                     {'error': f"'{product.name}' mahsuloti omborda yetarli emas. Qoldiq: {product.quantity_healthy}"}
                 )
 
-            SaleItem.objects.create(sale=sale, product=product, quantity=quantity, price=price)
-            product.quantity_healthy -= quantity
-            product.save()
-            total_debt_increase += price * quantity
+        record_movements([
+            movement(product_id, StockMovement.TYPE_SALE, ReturnedProduct.CONDITION_HEALTHY, -quantity, 'sale', sale.pk)
+            for product_id, quantity in sorted(needed.items())
+        ])
 
-        customer.debt += total_debt_increase
-        customer.save()
+        sale_items = SaleItem.objects.bulk_create([
+            SaleItem(sale=sale, product=item_data['product'], quantity=item_data['quantity'], price=item_data['price'])
+            for item_data in items_data
+        ])
+
+        Customer.objects.filter(pk=customer.pk).update(debt=F('debt') + sale.total_amount)
+        record_sale(sale, sale_items)
+        record_sale_entry(sale, sale.total_amount)
+        bump_data_version(Product, Customer)
 
         response_serializer = SaleSerializer(sale)
         headers = self.get_success_headers(response_serializer.data)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
+# --- SOTUVLARNI PAKET BO'LIB YARATISH --- #
+class SaleBatchCreateAPIView(APIView):
+    """
+    Offline terminallar yig'ib qo'ygan sotuvlarni bitta so'rovda qabul qiladi:
+    {"sales": [{"customer": 1, "items": [{"product": 2, "quantity": 1, "price": "10.00"}]}, ...]}.
+    Sotuvlar yuborilgan tartibda qo'llanadi; har biri uchun natija (yaratildi/rad etildi) qaytadi.
+    """
+    permission_classes = [IsAdminUser | IsSotuvchi]
+
+    def post(self, request, *args, **kwargs):
+        serializer = SaleBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Paketdagi sotuvlar so'rovni yuborgan sotuvchi nomidan yoziladi
+        results = create_sale_batch(serializer.validated_data['sales'], request.user)
+        created = sum(result['status'] == 'created' for result in results)
+        return Response(
+            {'created': created, 'rejected': len(results) - created, 'results': results},
+            status=status.HTTP_200_OK,
+        )
+
+
 # --- TO‘LOV YARATISH VIEW --- #
 class PaymentCreateAPIView(generics.CreateAPIView):
     queryset = Payment.objects.all() # queryset qo'shish yaxshi amaliyot
@@ -179,11 +365,41 @@ class PaymentCreateAPIView(generics.CreateAPIView):
         self.perform_create(serializer)
         customer.debt -= amount
         customer.save()
+        record_payment(serializer.instance)
+        record_payment_entry(serializer.instance)
+        bump_data_version(Customer)
 
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
+class PaymentImportAPIView(APIView):
+    """
+    Bank ko'chirmasidagi (CSV/XLSX) to'lovlarni bitta tranzaksiyada saqlaydi. Ustunlar: `amount`
+    va mijoz (`customer_id`, `phone_number` yoki `full_name`). Rad etilgan qatorlar `errors` da
+    qaytadi, qolganlari saqlanadi; `dry_run=true` bo'lsa, faqat tekshiriladi.
+    """
+    parser_classes = (MultiPartParser, FormParser)
+    permission_classes = [IsAdminUser | IsBuxgalter]
+
+    def post(self, request, *args, **kwargs):
+        if 'file' not in request.FILES:
+            return Response({"error": "Fayl topilmadi. 'file' ni tanlang."}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        try:
+            result = import_payments(request.FILES['file'], dry_run=dry_run)
+        except ImportFileError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": f"Xatolik: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Tekshiruv yakunlandi (dry run)." if dry_run else "Import yakunlandi.",
+            **result,
+        })
+
+
 # --- YUK KIRIMI VIEW --- #
 class GoodsReceiptCreateAPIView(generics.CreateAPIView):
     serializer_class = GoodsReceiptSerializer
@@ -198,8 +414,11 @@ class GoodsReceiptCreateAPIView(generics.CreateAPIView):
         quantity = serializer.validated_data['quantity']
 
         self.perform_create(serializer)
-        product.quantity_healthy += quantity
-        product.save()
+        change_stock(
+            product.pk, ReturnedProduct.CONDITION_HEALTHY, quantity, StockMovement.TYPE_RECEIPT,
+            'receipt', serializer.instance.pk,
+        )
+        bump_data_version(Product)
 
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -207,37 +426,89 @@ class GoodsReceiptCreateAPIView(generics.CreateAPIView):
 
 # --- SOTUVLAR RO‘YXATI VIEW --- #
 class SalesListAPIView(generics.ListAPIView):
-    queryset = Sale.objects.all().order_by('-created_at')
-    serializer_class = SalesListSerializer
+    """
+    Sotuvlar ro'yxati. `?view=summary` - yengil ko'rinish (id, sana, status, mijoz ismi, jami summa,
+    qatorlar soni), ichma-ich serializer'larsiz. `?fields=id,status,...` ikkala ko'rinishda ham
+    faqat kerakli maydonlarni qaytaradi - so'ralmagan bog'liq jadvallar o'qilmaydi.
+    """
     filterset_class = SaleFilter
+    pagination_class = SaleCursorPagination
 
+    def is_summary(self):
+        return self.request.query_params.get('view') == 'summary'
 
-# --- MAHSULOTLARNI EXPORT QILISH --- #
-class ProductExportAPIView(APIView):
-    def get(self, request, *args, **kwargs):
-        products = Product.objects.all().values(
-            'brand', 'category', 'name', 'price', 'quantity_healthy', 'quantity_defective'
-        )
-        if not products:
-            return Response({"message": "Eksport uchun mahsulotlar mavjud emas."}, status=status.HTTP_404_NOT_FOUND)
+    def get_serializer_class(self):
+        return SaleSummarySerializer if self.is_summary() else SalesListSerializer
+
+    def requested_fields(self):
+        """ `?fields=` dagi maydonlar (tekshirilgan) yoki None - barcha maydonlar. """
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        fields = [name.strip() for name in raw.split(',') if name.strip()]
+        allowed = self.get_serializer_class().Meta.fields
+        unknown = [name for name in fields if name not in allowed]
+        if unknown or not fields:
+            raise serializers.ValidationError({
+                'fields': f"Noma'lum maydon(lar): {', '.join(unknown)}. Mumkin: {', '.join(allowed)}."
+            })
+        return fields
 
-        df = pd.DataFrame(list(products))
-        output = BytesIO()
+    def get_queryset(self):
+        fields = self.requested_fields()
+        queryset = sale_summaries(fields) if self.is_summary() else sales_with_details(fields)
+        return queryset.order_by('-created_at')
 
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Mahsulotlar')
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
 
-        output.seek(0)
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="mahsulotlar.xlsx"'
+
+# --- MAHSULOTLARNI EXPORT QILISH --- #
+class FileExportMixin:
+    """
+    Eksport formati DRF kontent muzokarasi orqali tanlanadi: `?format=csv` yoki `Accept: text/csv` -
+    birinchi baytlar darhol yuboriladigan oqimli CSV, aks holda (standart) write-only XLSX.
+    """
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [XLSXRenderer, CSVRenderer]
+    export_headers = None
+    export_filename = None
+    export_sheet_name = None
+
+    def export_response(self, rows):
+        if self.request.accepted_renderer.format == 'csv':
+            response = StreamingHttpResponse(stream_csv(self.export_headers, rows), content_type=CSV_CONTENT_TYPE)
+            response['Content-Disposition'] = f'attachment; filename="{self.export_filename}.csv"'
+        else:
+            output = write_xlsx(self.export_headers, rows, sheet_name=self.export_sheet_name)
+            response = FileResponse(
+                output,
+                as_attachment=True,
+                filename=f'{self.export_filename}.xlsx',
+                content_type=XLSX_CONTENT_TYPE
+            )
+        patch_vary_headers(response, ('Accept',))
         return response
 
 
+class ProductExportAPIView(FileExportMixin, APIView):
+    export_headers = PRODUCT_EXPORT_HEADERS
+    export_filename = 'mahsulotlar'
+    export_sheet_name = 'Mahsulotlar'
+
+    def get(self, request, *args, **kwargs):
+        if not Product.objects.exists():
+            return Response({"message": "Eksport uchun mahsulotlar mavjud emas."}, status=status.HTTP_404_NOT_FOUND)
+        return self.export_response(product_export_rows())
+
+
 # --- MAHSULOT IMPORT VIEW --- #
 class ProductImportAPIView(APIView):
+    """
+    Mahsulotlarni Excel yoki CSV fayldan `name` bo'yicha ommaviy (bulk) qo'shadi/yangilaydi.
+    Format fayl mazmunidan aniqlanadi. `dry_run=true` yuborilsa, bazaga hech narsa yozilmaydi -
+    faqat natija sonlari qaytadi.
+    """
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request, *args, **kwargs):
@@ -245,66 +516,39 @@ class ProductImportAPIView(APIView):
             return Response({"error": "Fayl topilmadi. 'file' ni tanlang."}, status=status.HTTP_400_BAD_REQUEST)
 
         file_obj = request.FILES['file']
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
         try:
-            df = pd.read_excel(file_obj)
-            created_count, updated_count = 0, 0
-
-            required_columns = ['name', 'price', 'quantity_healthy']
-            for col in required_columns:
-                if col not in df.columns:
-                    return Response({"error": f"Excel faylda '{col}' ustuni topilmadi."},
-                                    status=status.HTTP_400_BAD_REQUEST)
-
-            for _, row in df.iterrows():
-                product, created = Product.objects.update_or_create(
-                    name=row['name'],
-                    defaults={
-                        'brand': row.get('brand', ''),
-                        'category': row.get('category', ''),
-                        'price': row.get('price', 0),
-                        'quantity_healthy': row.get('quantity_healthy', 0),
-                        'quantity_defective': row.get('quantity_defective', 0),
-                    }
-                )
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
+            rows = read_import_rows(file_obj, PRODUCT_REQUIRED_COLUMNS)
+            result = bulk_upsert_products(rows, dry_run=dry_run)
+            if not dry_run:
+                bump_data_version(Product, catalogue=True)
 
             return Response({
-                "message": "Import muvaffaqiyatli.",
-                "created": created_count,
-                "updated": updated_count
+                "message": "Tekshiruv yakunlandi (dry run)." if dry_run else "Import muvaffaqiyatli.",
+                **result,
             })
 
+        except ImportFileError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": f"Xatolik: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
 
 # --- MIJOZ EXPORT VIEW --- #
-class CustomerExportAPIView(APIView):
+class CustomerExportAPIView(FileExportMixin, APIView):
+    export_headers = CUSTOMER_EXPORT_HEADERS
+    export_filename = 'mijozlar'
+    export_sheet_name = 'Mijozlar'
+
     def get(self, request, *args, **kwargs):
-        customers = Customer.objects.all().values('full_name', 'phone_number', 'address', 'debt')
-        if not customers:
+        if not Customer.objects.exists():
             return Response({"message": "Eksport uchun mijozlar mavjud emas."}, status=status.HTTP_404_NOT_FOUND)
-
-        df = pd.DataFrame(list(customers))
-        output = BytesIO()
-
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Mijozlar')
-
-        output.seek(0)
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="mijozlar.xlsx"'
-        return response
+        return self.export_response(customer_export_rows())
 
 
 # --- MIJOZ IMPORT VIEW --- #
 class CustomerImportAPIView(APIView):
+    """ Mijozlarni Excel yoki CSV fayldan import qiladi (format fayl mazmunidan aniqlanadi). """
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request, *args, **kwargs):
@@ -313,41 +557,30 @@ class CustomerImportAPIView(APIView):
 
         file_obj = request.FILES['file']
         try:
-            df = pd.read_excel(file_obj)
-
-            required_columns = ['full_name', 'phone_number']
-            for col in required_columns:
-                if col not in df.columns:
-                    return Response({"error": f"Excel faylda '{col}' ustuni topilmadi."},
-                                    status=status.HTTP_400_BAD_REQUEST)
-
-            created_count, updated_count = 0, 0
-            for _, row in df.iterrows():
-                customer, created = Customer.objects.update_or_create(
-                    full_name=row['full_name'],
-                    defaults={
-                        'phone_number': row.get('phone_number', ''),
-                        'address': row.get('address', ''),
-                        'debt': row.get('debt', 0),
-                    }
-                )
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
+            rows = read_import_rows(file_obj, CUSTOMER_REQUIRED_COLUMNS)
+            result = upsert_customers(rows)
+            bump_data_version(Customer)
 
             return Response({
                 "message": "Import muvaffaqiyatli.",
-                "created": created_count,
-                "updated": updated_count
+                **result,
             })
 
+        except ImportFileError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": f"Xatolik: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
 
 # --- SOTUVLARNI EXPORT QILISH --- #
-class SaleExportAPIView(APIView):
+class SaleExportAPIView(FileExportMixin, APIView):
+    """
+    Sotuvlarni qatorma-qator oqim (stream) ko'rinishida eksport qiladi (CSV yoki XLSX).
+    """
+    export_headers = SALE_EXPORT_HEADERS
+    export_filename = 'sotuvlar_tarixi'
+    export_sheet_name = 'Sotuvlar'
+
     def get(self, request, *args, **kwargs):
         queryset = Sale.objects.all().order_by('-created_at')
         filter = SaleFilter(request.GET, queryset=queryset)
@@ -356,39 +589,12 @@ class SaleExportAPIView(APIView):
         if not filtered_queryset.exists():
             return Response({"message": "Eksport uchun ma'lumot topilmadi."}, status=status.HTTP_404_NOT_FOUND)
 
-        data_for_excel = []
-        for sale in filtered_queryset:
-            for item in sale.items.all():
-                data_for_excel.append({
-                    'Chek ID': sale.id,
-                    'Sana': sale.created_at.strftime('%Y-%m-%d %H:%M'),
-                    'Mijoz': sale.customer.full_name,
-                    'Sotuvchi': sale.seller.username,
-                    'Mahsulot': item.product.name,
-                    'Soni': item.quantity,
-                    'Narxi': item.price,
-                    'Qator Summasi': item.quantity * item.price,
-                    'Status': sale.status,
-                })
-
-        df = pd.DataFrame(data_for_excel)
-        output = BytesIO()
-
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Sotuvlar')
-
-        output.seek(0)
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="sotuvlar_tarixi.xlsx"'
-        return response
+        return self.export_response(sale_export_rows(filtered_queryset))
 
 
 # --- SOTUV DETAIL VIEW --- #
 class SaleDetailAPIView(generics.RetrieveAPIView):
-    queryset = Sale.objects.all()
+    queryset = sales_with_details()
     serializer_class = SalesListSerializer
 
 
@@ -414,7 +620,7 @@ class SaleStatusUpdateAPIView(APIView):  # <-- generics.UpdateAPIView'dan APIVie
     def patch(self, request, pk, *args, **kwargs):
         # 1. URL'dan kelgan 'pk' bo'yicha sotuvni topishga harakat qilamiz
         try:
-            sale_instance = Sale.objects.get(pk=pk)
+            sale_instance = Sale.objects.select_related('customer').get(pk=pk)
         except Sale.DoesNotExist:
             return Response({"error": "Sotuv topilmadi"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -430,51 +636,44 @@ class SaleStatusUpdateAPIView(APIView):  # <-- generics.UpdateAPIView'dan APIVie
         requested_status = serializer.validated_data.get('status', previous_status)
         user = request.user
 
-        if not self._is_status_change_allowed(user, requested_status):
+        if not self._is_status_change_allowed(request, requested_status):
             return Response(
                 {"error": "Sizda bu statusga o'zgartirish uchun ruxsat yo'q."},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        serializer.save()
-
-        if self._is_seller(user) and requested_status != previous_status:
-            self._notify_warehouse_about_status_change(sale_instance, user, requested_status)
+        # Status va bildirishnoma bitta tranzaksiyada yoziladi
+        with transaction.atomic():
+            serializer.save()
+            if self._is_seller(request) and requested_status != previous_status:
+                self._notify_warehouse_about_status_change(sale_instance, user, requested_status)
 
         # 4. Muvaffaqiyatli javobni qaytaramiz
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    def _is_seller(self, user):
-        return user.groups.filter(name='Sotuvchilar').exists()
+    def _is_seller(self, request):
+        return in_group(request, 'Sotuvchilar')
 
-    def _is_warehouse(self, user):
-        return user.groups.filter(name='Omborchilar').exists()
+    def _is_warehouse(self, request):
+        return in_group(request, 'Omborchilar')
 
-    def _is_status_change_allowed(self, user, status_value):
-        if user.is_staff:
+    def _is_status_change_allowed(self, request, status_value):
+        if request.user.is_staff:
             return True  # Administrator barcha statuslarni o'zgartira oladi.
 
-        if self._is_seller(user):
+        if self._is_seller(request):
             return status_value in self.SELLER_ALLOWED_STATUSES
 
-        if self._is_warehouse(user):
+        if self._is_warehouse(request):
             return status_value in self.WAREHOUSE_ALLOWED_STATUSES
 
         return False
 
     def _notify_warehouse_about_status_change(self, sale, actor, new_status):
         """
-        Sotuvchi statusni o'zgartirganda Omborchilar guruhiga xabar yuboramiz.
-        Xabar e-mail orqali jo'natiladi; agar email topilmasa, server logiga yozib qo'yamiz.
+        Sotuvchi statusni o'zgartirganda Omborchilar guruhiga xabar navbatga qo'yiladi (outbox).
+        Xatni `dispatch_notifications` ishchisi yuboradi - so'rov pochta serverini kutmaydi.
         """
-        from django.core.mail import send_mail
-
-        warehouse_group = Group.objects.filter(name='Omborchilar').first()
-        if not warehouse_group:
-            print(f"[NOTIFICATION] Omborchilar guruhi topilmadi. Sotuv #{sale.id} statusi {new_status} ga o'zgartirildi.")
-            return
-
-        recipient_emails = list(warehouse_group.user_set.exclude(email='').values_list('email', flat=True))
         subject = f"Sotuv #{sale.id} status o'zgarishi"
         message = (
             "Salom!\n\n"
@@ -482,34 +681,29 @@ class SaleStatusUpdateAPIView(APIView):  # <-- generics.UpdateAPIView'dan APIVie
             f"statusini \"{sale.get_status_display()}\" ga o'zgartirdi.\n"
             "Iltimos, buyurtmani ko'rib chiqing.\n\nRahmat."
         )
-
-        if recipient_emails:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=None,
-                recipient_list=recipient_emails,
-                fail_silently=True,
-            )
-        else:
-            print(f"[NOTIFICATION] Omborchilar uchun email topilmadi. {message}")
+        queue_group_notification('Omborchilar', subject, message)
 
 
 # views.py fayli ichida FAQAT SHU KLASSNI ALMASHTIRING
 
 
 class ReturnedProductViewSet(viewsets.ModelViewSet):
-    queryset = ReturnedProduct.objects.select_related('customer', 'product', 'recorded_by').order_by('-returned_at', '-id')
+    queryset = ReturnedProduct.objects.select_related(
+        'customer', 'product', 'recorded_by'
+    ).prefetch_related('recorded_by__groups').order_by('-returned_at', '-id')
     serializer_class = ReturnedProductSerializer
     permission_classes = [IsAdminUser | IsOmborchi | IsSotuvchi | IsBuxgalter]
     filterset_class = ReturnedProductFilter
+    pagination_class = ReturnedProductCursorPagination
 
     def perform_create(self, serializer):
         with transaction.atomic():
             instance = serializer.save(
                 recorded_by=self.request.user if self.request.user.is_authenticated else None
             )
-            self._apply_stock(instance.product, instance.quantity, instance.condition, add=True)
+            self._apply_stock(instance, [(instance.product, instance.condition, instance.quantity)])
+            record_return(instance)
+            bump_data_version(Product)
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -517,6 +711,10 @@ class ReturnedProductViewSet(viewsets.ModelViewSet):
         old_product = instance.product
         old_quantity = instance.quantity
         old_condition = instance.condition
+        old_return = ReturnedProduct(
+            customer_id=instance.customer_id, product_id=instance.product_id, quantity=old_quantity,
+            condition=old_condition, returned_at=instance.returned_at
+        )
 
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
@@ -524,92 +722,121 @@ class ReturnedProductViewSet(viewsets.ModelViewSet):
         with transaction.atomic():
             self.perform_update(serializer)
             updated_instance = serializer.instance
-            self._apply_stock(old_product, old_quantity, old_condition, add=False)
-            self._apply_stock(updated_instance.product, updated_instance.quantity, updated_instance.condition, add=True)
+            self._apply_stock(updated_instance, [
+                (old_product, old_condition, -old_quantity),
+                (updated_instance.product, updated_instance.condition, updated_instance.quantity),
+            ])
+            record_return(old_return, sign=-1)
+            record_return(updated_instance)
+            bump_data_version(Product)
 
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         with transaction.atomic():
-            self._apply_stock(instance.product, instance.quantity, instance.condition, add=False)
+            self._apply_stock(instance, [(instance.product, instance.condition, -instance.quantity)])
+            record_return(instance, sign=-1)
             self.perform_destroy(instance)
+            bump_data_version(Product)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def _apply_stock(self, product, quantity, condition, add=True):
-        field_name = 'quantity_healthy' if condition == ReturnedProduct.CONDITION_HEALTHY else 'quantity_defective'
-        current_value = getattr(product, field_name, 0) or 0
-        quantity = int(quantity)
-        if add:
-            new_value = current_value + quantity
-        else:
-            new_value = current_value - quantity
-            if new_value < 0:
-                new_value = 0
-        setattr(product, field_name, new_value)
-        product.save(update_fields=[field_name])
+    def _apply_stock(self, returned, changes):
+        """
+        `changes` - (mahsulot, holat, miqdor) ro'yxati; bir mahsulot/holat bo'yicha farqlar
+        jamlanib qo'llanadi. Qoldiq yetmasa (qaytgan mahsulot allaqachon sotilgan), xatolik
+        qaytadi va tranzaksiya bekor bo'ladi - qoldiq nolga "qirqilmaydi".
+        """
+        deltas = {}
+        for product, condition, quantity in changes:
+            deltas[(product.pk, condition)] = deltas.get((product.pk, condition), 0) + int(quantity)
+
+        for (product_id, condition), delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            if not change_stock(product_id, condition, delta, StockMovement.TYPE_RETURN, 'return', returned.pk):
+                product = Product.objects.only('name', QUANTITY_FIELDS[condition]).get(pk=product_id)
+                raise serializers.ValidationError({
+                    'error': f"'{product.name}' mahsulotining qoldig'i yetarli emas "
+                             f"(qoldiq: {getattr(product, QUANTITY_FIELDS[condition])}, kerak: {-delta})."
+                })
 
 class DashboardStatsAPIView(APIView):
+    """
+    Dashboard ko'rsatkichlari. Sotuv, to'lov va qaytarishlar xom jadvallardan emas,
+    kunlik yig'ma (DailySalesRollup) jadvalidan hisoblanadi - javob vaqti tarix uzunligiga bog'liq emas.
+    """
     def get(self, request, *args, **kwargs):
         # 1. Filtrlarni URL parametrlaridan olamiz
         customer_id = request.query_params.get('customer')
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
+        today = timezone.localdate()
 
-        # 2. Asosiy so'rovlar uchun boshlang'ich "queryset"larni tayyorlaymiz
-        sales_queryset = Sale.objects.all()
-        payments_queryset = Payment.objects.all()
+        # Avval keshdan qidiramiz: kalitda ma'lumot versiyasi bor, yozuvdan keyin eski natija qaytmaydi
+        cache_key = dashboard_cache_key(customer_id, start_date, end_date, today)
+        data = get_cached_dashboard(cache_key)
+        cache_status = 'HIT'
+        if data is None:
+            cache_status = 'MISS'
+            data = self.build_stats(customer_id, start_date, end_date, today)
+            set_cached_dashboard(cache_key, data)
+
+        response = Response(data)
+        response['X-Cache'] = cache_status
+        return response
+
+    def build_stats(self, customer_id, start_date, end_date, today):
+        # 2. Yig'ma jadval qatorlarini filtrlaymiz (kunlar bo'yicha, end_date ham kiradi)
+        rollup_queryset = DailySalesRollup.objects.all()
 
-        # 3. Filtrlarni qo'llaymiz
         if customer_id:
-            sales_queryset = sales_queryset.filter(customer_id=customer_id)
-            payments_queryset = payments_queryset.filter(customer_id=customer_id)
+            rollup_queryset = rollup_queryset.filter(customer_id=customer_id)
 
         if start_date:
-            sales_queryset = sales_queryset.filter(created_at__gte=start_date)
-            payments_queryset = payments_queryset.filter(created_at__gte=start_date)
+            rollup_queryset = rollup_queryset.filter(day__gte=start_date)
 
         if end_date:
-            # Kun oxirigacha bo'lgan vaqtni olish uchun
-            end_date_dt = timezone.datetime.strptime(end_date, "%Y-%m-%d").date() + timedelta(days=1)
-            sales_queryset = sales_queryset.filter(created_at__lt=end_date_dt)
-            payments_queryset = payments_queryset.filter(created_at__lt=end_date_dt)
-
-        # 4. Filtrlangan ma'lumotlar asosida hisob-kitoblarni bajaramiz
-        filtered_sale_items = SaleItem.objects.filter(sale__in=sales_queryset)
+            rollup_queryset = rollup_queryset.filter(day__lte=end_date)
 
-        total_sales_amount = filtered_sale_items.aggregate(total=Sum(F('quantity') * F('price')))['total'] or 0
-        total_sales_count = sales_queryset.count()
-        total_payments = payments_queryset.aggregate(total=Sum('amount'))['total'] or 0
+        # 3. Filtrlangan ma'lumotlar asosida hisob-kitoblarni bitta so'rovda bajaramiz
+        totals = rollup_queryset.aggregate(
+            sales_amount=Sum('sales_amount'),
+            sales_count=Sum('sales_count'),
+            payments=Sum('payments_amount'),
+        )
+        total_sales_amount = totals['sales_amount'] or 0
+        total_sales_count = totals['sales_count'] or 0
+        total_payments = totals['payments'] or 0
         average_check = total_sales_amount / total_sales_count if total_sales_count > 0 else 0
 
-        # 5. Global (filtrlanmaydigan) statistikalar
+        # 4. Global (filtrlanmaydigan) statistikalar
         total_customer_debt = Customer.objects.aggregate(total=Sum('debt'))['total'] or 0
         total_customers_count = Customer.objects.count()
         total_products_count = Product.objects.count()
 
-        today = timezone.localdate()
-
-        returns_aggregates = ReturnedProduct.objects.aggregate(
-            total_quantity=Sum('quantity'),
-            healthy_quantity=Sum('quantity', filter=Q(condition=ReturnedProduct.CONDITION_HEALTHY)),
-            defective_quantity=Sum('quantity', filter=Q(condition=ReturnedProduct.CONDITION_DEFECTIVE)),
-            today_quantity=Sum('quantity', filter=Q(returned_at=today))
+        returns_aggregates = DailySalesRollup.objects.filter(product__isnull=False, seller__isnull=True).aggregate(
+            healthy_quantity=Sum('returns_healthy_quantity'),
+            defective_quantity=Sum('returns_defective_quantity'),
+            today_healthy=Sum('returns_healthy_quantity', filter=Q(day=today)),
+            today_defective=Sum('returns_defective_quantity', filter=Q(day=today)),
         )
 
-        total_returns_quantity = returns_aggregates['total_quantity'] or 0
         healthy_returns_quantity = returns_aggregates['healthy_quantity'] or 0
         defective_returns_quantity = returns_aggregates['defective_quantity'] or 0
-        today_returns_quantity = returns_aggregates['today_quantity'] or 0
-
-        # 6. Grafiklar uchun ma'lumotlarni ham filtrlangan queryset asosida hisoblaymiz
-        sales_by_seller = User.objects.filter(sale__in=sales_queryset).annotate(
-            total_amount=Sum(F('sale__items__quantity') * F('sale__items__price')),
-            sales_count=Count('sale')
+        total_returns_quantity = healthy_returns_quantity + defective_returns_quantity
+        today_returns_quantity = (returns_aggregates['today_healthy'] or 0) + (returns_aggregates['today_defective'] or 0)
+
+        # 5. Grafiklar uchun ma'lumotlarni ham filtrlangan yig'ma asosida hisoblaymiz
+        sales_by_seller = rollup_queryset.filter(seller__isnull=False).values('seller').annotate(
+            username=F('seller__username'),
+            total_amount=Sum('sales_amount'),
+            sales_count=Sum('sales_count')
         ).filter(sales_count__gt=0).order_by('-total_amount').values('username', 'total_amount', 'sales_count')
 
-        top_products = Product.objects.filter(saleitem__in=filtered_sale_items).annotate(
-            total_sold=Sum('saleitem__quantity')
+        top_products = rollup_queryset.filter(seller__isnull=False, product__isnull=False).values('product').annotate(
+            name=F('product__name'),
+            total_sold=Sum('sales_quantity')
         ).filter(total_sold__gt=0).order_by('-total_sold')[:5].values('name', 'total_sold')
 
         data = {
@@ -629,7 +856,51 @@ class DashboardStatsAPIView(APIView):
             'sales_by_seller': list(sales_by_seller),
             'top_products': list(top_products),
         }
-        return Response(data)
+        return data
+
+
+class DashboardTrendsAPIView(APIView):
+    """
+    Grafiklar uchun vaqt qatorlari: sotuv summasi va soni, to'lovlar va qaytarishlar
+    kun/hafta/oy bo'yicha (?interval=day|week|month&start_date=&end_date=). Bo'sh davrlar nol bilan keladi.
+
+    Sotuvlar SaleFilter'ning customer/seller/status/open filtrlari bilan filtrlanadi; to'lov va
+    qaytarishlar sotuvchi va statusga bog'liq emas - ularga faqat `customer` qo'llanadi.
+    """
+    permission_classes = [IsAuthenticated]
+    sale_filter_params = ('customer', 'seller', 'status', 'open')
+
+    def get(self, request, *args, **kwargs):
+        query = SalesTrendQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        # Sana chegaralari bu yerda kun bo'yicha hisoblanadi, SaleFilter'ning start_date/end_date'i ishlatilmaydi
+        filter_data = {name: request.query_params[name] for name in self.sale_filter_params if name in request.query_params}
+        sale_filter = SaleFilter(filter_data, queryset=Sale.objects.all())
+        if not sale_filter.is_valid():
+            raise serializers.ValidationError(sale_filter.errors)
+
+        rollup = DailySalesRollup.objects.all()
+        customer = sale_filter.form.cleaned_data.get('customer')
+        if customer:
+            rollup = rollup.filter(customer=customer)
+
+        buckets = sales_trend(sale_filter.qs, rollup, params['interval'], params['start_date'], params['end_date'])
+        return Response({
+            'interval': params['interval'],
+            'start_date': params['start_date'],
+            'end_date': params['end_date'],
+            'buckets': buckets,
+        })
+
+
+class DashboardCacheStatsAPIView(APIView):
+    """ Dashboard keshining hit/miss hisoblagichlari (javob bergan jarayon bo'yicha) va joriy ma'lumot versiyasi. """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(dashboard_cache_stats())
     
 # views.py faylining OXIRIGA qo'shing
 
@@ -649,48 +920,41 @@ class CustomerReconciliationAPIView(APIView):
 
         start_date = timezone.datetime.strptime(start_date_str, "%Y-%m-%d").date()
         end_date = timezone.datetime.strptime(end_date_str, "%Y-%m-%d").date() + timedelta(days=1)
+        period_start = timezone.make_aware(timezone.datetime.combine(start_date, timezone.datetime.min.time()))
+        period_end = timezone.make_aware(timezone.datetime.combine(end_date, timezone.datetime.min.time()))
 
-        # 2. Boshlang'ich qoldiqni hisoblash (davr boshigacha bo'lgan barcha operatsiyalar)
-        sales_before = SaleItem.objects.filter(sale__customer=customer, sale__created_at__lt=start_date).aggregate(total=Sum(F('quantity') * F('price')))['total'] or 0
-        payments_before = Payment.objects.filter(customer=customer, created_at__lt=start_date).aggregate(total=Sum('amount'))['total'] or 0
-        starting_balance = sales_before - payments_before
-
-        # 3. Davr ichidagi barcha operatsiyalarni yig'amiz
-        sales_in_period = Sale.objects.filter(customer=customer, created_at__gte=start_date, created_at__lt=end_date)
-        payments_in_period = Payment.objects.filter(customer=customer, created_at__gte=start_date, created_at__lt=end_date)
+        # 2. Boshlang'ich qoldiq: oxirgi checkpoint + undan davr boshigacha bo'lgan yozuvlar
+        starting_balance = balance_before(customer.pk, period_start)
 
-        # 4. Operatsiyalarni bitta ro'yxatga birlashtirib, sana bo'yicha saralaymiz
+        # 3. Davr ichidagi operatsiyalar mijoz hisobidan tartiblangan holda bitta so'rovda olinadi
         transactions = []
         total_debit_in_period = 0
         total_credit_in_period = 0
 
-        for sale in sales_in_period:
-            sale_total = sale.items.aggregate(total=Sum(F('quantity') * F('price')))['total'] or 0
-            transactions.append({
-                "date": sale.created_at,
-                "type": "Sotuv",
-                "document": f"Chek #{sale.id}",
-                "debit": sale_total,
-                "credit": 0
-            })
-            total_debit_in_period += sale_total
-
-        for payment in payments_in_period:
-            transactions.append({
-                "date": payment.created_at,
-                "type": "To'lov",
-                "document": f"To'lov #{payment.id}",
-                "debit": 0,
-                "credit": payment.amount
-            })
-            total_credit_in_period += payment.amount
-
-        transactions.sort(key=lambda x: x['date']) # Sana bo'yicha saralash
+        for entry in entries_between(customer.pk, period_start, period_end):
+            if entry.entry_type == entry.ENTRY_SALE:
+                transactions.append({
+                    "date": entry.created_at,
+                    "type": "Sotuv",
+                    "document": f"Chek #{entry.sale_id}",
+                    "debit": entry.debit,
+                    "credit": 0
+                })
+                total_debit_in_period += entry.debit
+            else:
+                transactions.append({
+                    "date": entry.created_at,
+                    "type": "To'lov",
+                    "document": f"To'lov #{entry.payment_id}",
+                    "debit": 0,
+                    "credit": entry.credit
+                })
+                total_credit_in_period += entry.credit
 
-        # 5. Yakuniy qoldiqni hisoblash
+        # 4. Yakuniy qoldiqni hisoblash
         ending_balance = starting_balance + total_debit_in_period - total_credit_in_period
 
-        # 6. Javobni tayyorlaymiz
+        # 5. Javobni tayyorlaymiz
         data = {
             "customer": CustomerSerializer(customer).data,
             "period": {"start_date": start_date_str, "end_date": end_date_str},
@@ -712,8 +976,9 @@ class CurrentUserAPIView(APIView):
         return Response(serializer.data)
     
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all().order_by('id') # <-- Tartiblab olamiz
+    queryset = User.objects.prefetch_related('groups').order_by('id') # <-- Tartiblab olamiz
     permission_classes = [IsAdminUser]
+    pagination_class = IdCursorPagination
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -730,8 +995,8 @@ class GroupListView(APIView): # <-- genercis.ListAPIView'dan APIView'ga o'zgarti
     permission_classes = [IsAdminUser] # <-- Hozircha bu o'chiq tursin
 
     def get(self, request, *args, **kwargs):
-        # 1. Ma'lumotlar bazasidan BARCHA guruhlarni so'rab olamiz
-        groups = Group.objects.all()
+        # 1. Ma'lumotlar bazasidan BARCHA guruhlarni so'rab olamiz (bitta so'rov, print ham shu ro'yxatni ishlatadi)
+        groups = list(Group.objects.all())
 
         # 2. ENG MUHIM QISM: Topilgan natijani terminalga chiqaramiz
         print("BAZADAN TOPILGAN GURUHLAR:", groups)
@@ -741,4 +1006,40 @@ class GroupListView(APIView): # <-- genercis.ListAPIView'dan APIView'ga o'zgarti
 
         # 4. JSON javobni qaytaramiz
         return Response(serializer.data)
-    
+
+
+# --- FON VAZIFALARI (IMPORT/EKSPORT) --- #
+class JobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Import/eksportni fon vazifasi sifatida navbatga qo'yadi (POST -> 202 va vazifa id'si),
+    holati va progressini ko'rsatadi hamda tayyor natija faylini yuklab berish imkonini beradi.
+    Vazifalarni `python manage.py run_jobs` ishchisi bajaradi.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    pagination_class = JobCursorPagination
+
+    def get_queryset(self):
+        queryset = Job.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return JobCreateSerializer
+        return JobSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(created_by=request.user)
+        data = JobSerializer(job, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.STATUS_SUCCEEDED or not job.result_file:
+            return Response({"error": "Natija fayli hali tayyor emas."}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=job.result_file.name.rsplit('/', 1)[-1])